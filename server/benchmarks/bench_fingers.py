@@ -0,0 +1,62 @@
+"""
+Measures the cost of a routing decision (closest_preceding_finger) with a full table
+of 160 fingers, comparing the bisection over the finger index with the previous walk
+over every finger taking the lock once per entry.
+
+Run from the server directory:
+    python -m benchmarks.bench_fingers
+"""
+import logging
+import random
+import time
+
+from chord.finger_table import FingerTable
+from chord.health import health
+from chord.node_ref import NodeRef
+from chord.utils import is_in_interval
+
+RING_SIZES = [8, 64, 1024]
+QUERIES = 20000
+
+
+class FakeNode:
+    def __init__(self, ip: str) -> None:
+        self.ref = NodeRef(ip)
+        self.id = self.ref.id
+
+
+def walk_closest_preceding_finger(table: FingerTable, id: int) -> NodeRef:
+    logging.info(f'Encontrando dedo precedente más cercano a {id}')
+    for i in range(table.m - 1, -1, -1):
+        with table.finger_lock:
+            if table.finger[i] and is_in_interval(table.finger[i].id, table.node.id, id) and not health.is_suspect(table.finger[i].ip, table.finger[i].port):
+                logging.info(f"Dedo precedente más cercano encontrado en índice {i}: {table.finger[i].id}")
+                return table.finger[i]
+    return table.node.ref
+
+
+def build_table(ring_size: int) -> FingerTable:
+    refs = [NodeRef(f'10.{i // 65536}.{i // 256 % 256}.{i % 256}') for i in range(ring_size)]
+    table = FingerTable(FakeNode('10.255.255.255'))
+    for k in range(table.m):
+        start = (table.node.id + 2 ** k) % table.ring
+        table.set_finger(k, min(refs, key=lambda ref: (ref.id - start) % table.ring))
+    return table
+
+
+def bench(closest, table: FingerTable, ids) -> float:
+    start = time.perf_counter()
+    for id in ids:
+        closest(id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    for ring_size in RING_SIZES:
+        table = build_table(ring_size)
+        ids = [random.getrandbits(table.m) for _ in range(QUERIES)]
+        assert all(table.closest_preceding_finger(id).id == walk_closest_preceding_finger(table, id).id for id in ids[:1000])
+        new = bench(table.closest_preceding_finger, table, ids)
+        old = bench(lambda id: walk_closest_preceding_finger(table, id), table, ids)
+        print(f'{ring_size:>5} nodes, {len(table.index[0]):>3} distinct fingers: bisect {new:6.2f} us   walk {old:6.2f} us')
@@ -0,0 +1,59 @@
+"""
+Measures receive throughput of the framing layer for small and large frames,
+comparing the preallocated recv_into path with the previous `data += packet` loop.
+
+Run from the server directory:
+    python -m benchmarks.bench_framing
+"""
+import socket
+import struct
+import threading
+import time
+
+from chord.utils import send_message, recv_message
+
+SIZES = {'1 KB': 1024, '1 MB': 1024 * 1024, '64 MB': 64 * 1024 * 1024}
+TOTAL_BYTES = 256 * 1024 * 1024
+
+
+def concat_recvall(sock: socket.socket, n: int) -> bytes:
+    data = b''
+    while len(data) < n:
+        packet = sock.recv(n - len(data))
+        if not packet:
+            break
+        data += packet
+    return data
+
+
+def concat_recv_message(sock: socket.socket) -> bytes:
+    (msglen,) = struct.unpack('!I', concat_recvall(sock, 4))
+    return concat_recvall(sock, msglen)
+
+
+def bench(receive, size: int) -> float:
+    count = max(1, TOTAL_BYTES // size)
+    payload = b'x' * size
+    reader, writer = socket.socketpair()
+
+    def send():
+        for _ in range(count):
+            send_message(writer, payload)
+
+    sender = threading.Thread(target=send)
+    start = time.perf_counter()
+    sender.start()
+    for _ in range(count):
+        receive(reader)
+    elapsed = time.perf_counter() - start
+    sender.join()
+    reader.close()
+    writer.close()
+    return count * size / elapsed / (1024 * 1024)
+
+
+if __name__ == '__main__':
+    for label, size in SIZES.items():
+        new = bench(recv_message, size)
+        old = bench(concat_recv_message, size)
+        print(f'{label:>6}: recv_into {new:9.1f} MB/s   concat {old:9.1f} MB/s')
@@ -0,0 +1,42 @@
+"""
+Compares the encode/decode cost of the legacy text frames with the binary protocol.
+
+Run from the server directory:
+    python -m benchmarks.bench_protocol
+"""
+import timeit
+
+from chord.constants import STORE_KEY, RETRIEVE_KEY, SET_PARTITION
+from chord.protocol import decode_legacy, decode_message, encode_legacy, encode_message, text
+from chord.utils import encode_dict
+
+CASES = {
+    'RETRIEVE_KEY': (RETRIEVE_KEY, ['User/alice/Messages']),
+    'STORE_KEY': (STORE_KEY, ['User/alice/Messages', 'Q2hhaW4gb2YgbWVzc2FnZXM=' * 8, 1718000000, 1]),
+    'SET_PARTITION': (SET_PARTITION, [
+        encode_dict({f'Message/{i}': 'Zm9vYmFy' * 32 for i in range(2000)}),
+        encode_dict({f'Message/{i}': 1718000000 + i for i in range(2000)}),
+        encode_dict({}),
+    ]),
+}
+
+
+def bench(label: str, op: int, fields: list, number: int):
+    legacy = encode_legacy(op, fields)
+    binary = encode_message(op, fields)
+
+    results = {
+        'legacy encode': timeit.timeit(lambda: encode_legacy(op, fields), number=number),
+        'legacy decode': timeit.timeit(lambda: decode_legacy(legacy), number=number),
+        'binary encode': timeit.timeit(lambda: encode_message(op, fields), number=number),
+        'binary decode': timeit.timeit(lambda: [text(f) for f in decode_message(binary)[3]], number=number),
+    }
+
+    print(f'{label} ({len(legacy)} B legacy, {len(binary)} B binary)')
+    for name, seconds in results.items():
+        print(f'  {name:<14} {seconds * 1e6 / number:10.2f} us/op')
+
+
+if __name__ == '__main__':
+    for label, (op, fields) in CASES.items():
+        bench(label, op, fields, 2000 if op != SET_PARTITION else 50)
@@ -0,0 +1,86 @@
+"""
+Measures the throughput of the storage engines: the in-memory dictionary and the durable
+log-structured engine, for writes, reads, removals, a full scan with get_all and, for the
+log engine, recovery of the index when reopening it. It also times writing a snapshot of
+the in-memory engine and loading it back, as done on restart.
+
+Run from the server directory:
+    python -m benchmarks.bench_storage
+"""
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from chord.log_storage import LogStorage
+from chord.storage import Data, Storage
+
+KEYS = 20000
+VALUE_SIZE = 256
+
+
+def rate(count: int, seconds: float) -> str:
+    return f'{count / seconds:>10,.0f} ops/s'
+
+
+def report(name: str, results: dict):
+    print(f'{name:>7}: ' + '   '.join(f'{op} {value}' for op, value in results.items()))
+
+
+def bench(storage: Storage, keys, value: str) -> dict:
+    results = {}
+
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        storage.set(key, Data(value, i))
+    results['set'] = rate(len(keys), time.perf_counter() - start)
+
+    lookups = random.choices(keys, k=len(keys))
+    start = time.perf_counter()
+    for key in lookups:
+        storage.get(key)
+    results['get'] = rate(len(keys), time.perf_counter() - start)
+
+    removed = keys[::10]
+    start = time.perf_counter()
+    for i, key in enumerate(removed):
+        storage.remove(key, len(keys) + i)
+    results['remove'] = rate(len(removed), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    storage.get_all()
+    results['get_all'] = f'{(time.perf_counter() - start) * 1000:>10.1f} ms'
+    return results
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    keys = [f'User/{i}' for i in range(KEYS)]
+    value = 'x' * VALUE_SIZE
+
+    print(f'{KEYS} keys, values of {VALUE_SIZE} bytes')
+    memory = Storage()
+    report('memory', bench(memory, keys, value))
+
+    path = tempfile.mkdtemp()
+    try:
+        snapshot = os.path.join(path, 'memory.snap')
+        start = time.perf_counter()
+        size = memory.save_snapshot(snapshot)
+        print(f'snapshot write: {(time.perf_counter() - start) * 1000:.1f} ms, {size:,} bytes')
+        start = time.perf_counter()
+        Storage().load_snapshot(snapshot)
+        print(f'snapshot load: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        storage = LogStorage(os.path.join(path, 'log'))
+        results = bench(storage, keys, value)
+        storage.close()
+        report('log', results)
+
+        start = time.perf_counter()
+        LogStorage(os.path.join(path, 'log')).close()
+        print(f'recovery of the log: {(time.perf_counter() - start) * 1000:.1f} ms')
+    finally:
+        shutil.rmtree(path)
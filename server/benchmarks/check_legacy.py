@@ -0,0 +1,71 @@
+"""
+Checks that a node still talks to peers that predate the binary protocol. Those peers
+frame every message with a bare 4-byte length, speak the 'op|field' text protocol, serve
+a single request per connection and answer the operations they do not know, HELLO
+included, with an empty frame.
+
+A minimal peer of that kind serves on a local port and is called through NodeRef, which
+must negotiate the legacy protocol and get every answer without waiting for a timeout.
+
+Run from the server directory:
+    python -m benchmarks.check_legacy
+"""
+import logging
+import socket
+import struct
+import threading
+import time
+
+from chord.constants import ALIVE, PING, RETRIEVE_KEY, STORE_KEY, TRUE
+from chord.node_ref import NodeRef
+from config import SEPARATOR
+
+IP = '127.0.0.1'
+PORT = 18990
+
+
+def recv_frame(conn: socket.socket) -> bytes:
+    header = conn.recv(4, socket.MSG_WAITALL)
+    (length,) = struct.unpack('!I', header)
+    return conn.recv(length, socket.MSG_WAITALL) if length else b''
+
+
+def legacy_peer(server: socket.socket, store: dict):
+    """
+    Serves like the nodes before the binary protocol did: one request per connection.
+    """
+    while True:
+        conn, _ = server.accept()
+        with conn:
+            data = recv_frame(conn).decode('utf-8').split(SEPARATOR)
+            option = int(data[0])
+            response = ''
+            if option == PING:
+                response = ALIVE
+            elif option == STORE_KEY:
+                store[data[1]] = (data[2], int(data[3]))
+                response = str(TRUE)
+            elif option == RETRIEVE_KEY:
+                value, version = store.get(data[1], ('', 0))
+                response = f'{value}{SEPARATOR}{version}'
+            message = response.encode('utf-8')
+            conn.sendall(struct.pack('!I', len(message)) + message)
+
+
+if __name__ == '__main__':
+    logging.disable(logging.CRITICAL)
+    server = socket.create_server((IP, PORT))
+    threading.Thread(target=legacy_peer, args=(server, {}), daemon=True).start()
+
+    peer = NodeRef(IP, PORT)
+    start = time.perf_counter()
+    results = {'ping': peer.ping(), 'store': peer.store_key('User/alice', 'hello', 3)}
+    data = peer.retrieve_key('User/alice')
+    results['retrieve'] = (data.value, data.version) == ('hello', 3)
+    elapsed = time.perf_counter() - start
+
+    for name, ok in results.items():
+        print(f'{name:>8}: {"ok" if ok else "FAILED"}')
+    print(f'protocol version {peer.pool.acquire().version}, {elapsed * 1000:.1f} ms')
+    if not all(results.values()) or elapsed >= 1:
+        raise SystemExit('Legacy peer check failed')
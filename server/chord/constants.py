@@ -13,6 +13,18 @@ RESOLVE_DATA = 12
 RETRIEVE_KEY = 13
 STORE_KEY = 14
 DELETE_KEY = 15
+HELLO = 16
+BATCH = 17
+PARTITION_CHUNK = 18
+RESOLVE_CHUNK = 19
+TRANSFER_STATUS = 20
+GET_STATS = 21
+LOOKUP_STEP = 22
+FIND_RECURSIVE = 23
+LOOKUP_REPLY = 24
+GET_FINGERS = 25
+EXCHANGE_MEMBERS = 26
+GET_SNAPSHOT = 27
 
 FALSE = 0
 TRUE = 1
@@ -33,4 +45,91 @@ STABILIZE_FREQ = 10
 CHECK_PREDECESSOR_FREQ = 10
 CHECK_SUCCESSOR_FREQ = 10
 FIX_SUCCESSORS_FREQ = 15
-FIX_STORAGE_FREQ = 10
\ No newline at end of file
+FIX_STORAGE_FREQ = 10
+METRICS_DUMP_FREQ = 60
+
+SERVER_POOL_SIZE = 16
+SERVER_LONG_POOL_SIZE = 16
+# Operations that call other nodes and wait for them, or apply whole partitions; they run on
+# their own workers so they never take every worker the calls they make need to be answered.
+# Stores and removals join them when they carry the replication flag
+LONG_OPS = (FIND_ID_PREDECESSOR, FIND_ID_SUCCESSOR, NOTIFY, ELECTION, BATCH,
+            SET_PARTITION, RESOLVE_DATA, PARTITION_CHUNK, RESOLVE_CHUNK, GET_SNAPSHOT)
+SERVER_BACKLOG = 128
+
+RPC_TIMEOUT = 3
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+POOL_MAX_CONNECTIONS = 4
+POOL_MAX_IN_FLIGHT = 8
+POOL_IDLE_TIMEOUT = 30
+SERVER_IDLE_TIMEOUT = 120
+
+RPC_TIMEOUT_MIN = 0.25
+RTT_WINDOW = 128
+RTT_MIN_SAMPLES = 16
+RTT_TIMEOUT_PERCENTILE = 99
+RTT_TIMEOUT_FACTOR = 4
+
+HEALTH_FAILURE_THRESHOLD = 3
+HEALTH_OPEN_TIME = 5
+HEALTH_PROBE_FREQ = 1
+
+HEDGED_READS = True
+HEDGE_DELAY = None  # Seconds before hedging; None derives it from the primary's RETRIEVE_KEY round trips
+HEDGE_DELAY_PERCENTILE = 95
+HEDGE_DELAY_DEFAULT = 0.05
+HEDGE_DELAY_MIN = 0.002
+
+LOCATION_CACHE_SIZE = 1024
+LOCATION_CACHE_TTL = 30
+LOCATION_CACHE_CHANGE_TTL = 2  # Life of the cached owners while the ring is changing
+
+LOOKUP_ITERATIVE = 'iterative'
+LOOKUP_RECURSIVE = 'recursive'
+LOOKUP_ONE_HOP = 'one_hop'  # Full membership table on every node, for rings of tens of nodes
+LOOKUP_MODE = LOOKUP_ITERATIVE
+
+MEMBERSHIP_TTL = 60
+
+VIRTUAL_NODES = 1
+NODE_WEIGHT = 1.0  # Capacity of this node; with VIRTUAL_NODES > 1 it runs VIRTUAL_NODES * NODE_WEIGHT virtual nodes
+
+FINGER_BULK_REFRESH = True
+FINGER_ALTERNATES = 3
+
+PROXIMITY_ROUTING = True
+PROXIMITY_ALPHA = 0.2
+PROXIMITY_PROBES = 8
+
+MAINTENANCE_MIN_FACTOR = 0.2
+MAINTENANCE_MAX_FACTOR = 4
+MAINTENANCE_BACKOFF = 1.5
+MAINTENANCE_STABLE_ROUNDS = 3
+MAINTENANCE_JITTER = 0.1
+
+STORAGE_MEMORY = 'memory'
+STORAGE_LOG = 'log'  # Durable log-structured engine, see chord/log_storage.py
+STORAGE_ENGINE = STORAGE_MEMORY
+STORAGE_DIR = 'storage'
+LOG_SEGMENT_SIZE = 64 * 1024 * 1024
+LOG_FSYNC_INTERVAL = 0.05
+LOG_COMPACT_FREQ = 60
+LOG_COMPACT_RATIO = 0.5
+
+SNAPSHOTS = True
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_FREQ = 300
+SNAPSHOT_BOOTSTRAP = True  # Fetch the successor's snapshot when joining, before the incremental transfers
+SNAPSHOT_CHUNK_BYTES = 4 * 1024 * 1024
+
+COMPRESSION_THRESHOLD = 1024
+COMPRESSION_LEVEL = 1
+
+BATCH_WINDOW = 0.005
+BATCH_MAX_SIZE = 64
+
+STREAM_CHUNK_BYTES = 256 * 1024
+STREAM_WINDOW = 4
+STREAM_RETRIES = 3
+STREAM_RETRY_DELAY = 1
+STREAM_TRANSFER_TTL = 300
@@ -0,0 +1,97 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when the time budget of the current operation runs out.
+    """
+
+
+_local = threading.local()
+
+
+def current() -> Optional[float]:
+    """
+    Returns the deadline of the current thread.
+
+    Returns:
+        float: The monotonic time by which the current operation must finish, or None if it has no deadline.
+    """
+    return getattr(_local, 'deadline', None)
+
+
+def remaining() -> Optional[float]:
+    """
+    Returns the seconds left before the deadline of the current thread.
+
+    Returns:
+        float: The seconds left, zero or negative once the deadline passed, or None if there is no deadline.
+    """
+    deadline = current()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    """
+    Tells whether the deadline of the current thread has passed.
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check(what: str = 'la operación'):
+    """
+    Raises if the deadline of the current thread has passed. Called before every hop
+    of a lookup so an expired operation stops instead of contacting more nodes.
+
+    Args:
+        what (str): Description of the operation, used in the error message.
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed.
+    """
+    if expired():
+        raise DeadlineExceeded(f'Plazo agotado para {what}')
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Runs a block with a time budget. Scopes nest: a block never gets more time than the
+    scope around it, so every RPC sent inside inherits what is left of the outer budget.
+
+    Args:
+        seconds (float): The budget of the block, or None to keep the current deadline.
+    """
+    previous = current()
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        _local.deadline = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Wraps a function so it runs under the deadline of the calling thread, for work
+    handed over to another thread.
+
+    Args:
+        fn (Callable): The function to wrap.
+
+    Returns:
+        Callable: The wrapped function.
+    """
+    deadline = current()
+    if deadline is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        with deadline_scope(deadline - time.monotonic()):
+            return fn(*args, **kwargs)
+    return bound
@@ -3,10 +3,12 @@ import socket
 import time
 
 from chord.node_ref import NodeRef
-from chord.constants import ARE_YOU, EMPTY, YES_IM, DISCOVER_AND_JOIN_FREQ
+from chord.constants import ARE_YOU, EMPTY, YES_IM, DISCOVER_AND_JOIN_FREQ, SNAPSHOT_BOOTSTRAP
 from config import SEPARATOR, MULTICAST_GROUP, MULTICAST_PORT
 from chord.elector import Elector
 from chord.finger_table import FingerTable
+from chord.transport import stats as transport_stats
+from chord.protocol import compression_stats
 
 class Discoverer:
     """
@@ -57,6 +59,9 @@ class Discoverer:
             logging.info(f"Current node {self.node.id} connections:")
             logging.info(f"  Predecessor: {pred.id if pred else 'None'}")
             logging.info(f"  Successor: {succ.id if succ else 'None'}")
+            logging.info(f"  Connection pool: {transport_stats.snapshot()}")
+            logging.info(f"  Server operations: {self.node.server_stats.snapshot()}")
+            logging.info(f"  Compression: {compression_stats.snapshot()}")
 
         except Exception as e:
             logging.error(f"Error logging network status: {e}")
@@ -82,20 +87,31 @@ class Discoverer:
                 self.node.successors.clear()
                 self.node.successors.set(0, node.find_successor(self.node.id))
                 succ: NodeRef = self.node.successors.get(0)
+                self.finger.cache.clear()  # Owners resolved in the previous ring are no longer valid
 
                 # Update the finger table with the new successor at index 0
-                with self.finger.finger_lock:
-                    self.finger.finger[0] = succ
+                self.finger.set_finger(0, succ)
+                # The successor's fingers are a close guess of ours until the next refresh
+                self.finger.apply_hint(succ.get_fingers())
+                # Start from the successor's view of the ring when routing with the membership table
+                if self.node.membership.active:
+                    self.node.membership.merge(succ.exchange_members(self.node.membership.fields()))
 
                 # Set the leader in the elector as the one received
                 with self.elector.leader_lock:
                     self.elector.leader = leader
-                
-                # Notify the new successor about this node
-                succ.notify(self.node.ref)
-                
-                logging.info(f'Unido exitosamente al anillo de Chord a través del nodo {node.ip}.')
-                return True
+
+            # Load the successor's data in one bulk transfer, so the transfers started by
+            # notifying it only carry what changed since its snapshot. The transfer can be
+            # long, so it runs without holding the ring locks
+            if SNAPSHOT_BOOTSTRAP:
+                self.node.replicator.bootstrap(succ)
+
+            # Notify the new successor about this node
+            succ.notify(self.node.ref)
+
+            logging.info(f'Unido exitosamente al anillo de Chord a través del nodo {node.ip}.')
+            return True
         except Exception as e:
             # Log any errors encountered while trying to join the chord ring
             logging.error(f'Error mientras se unía al anillo de Chord: {e}')
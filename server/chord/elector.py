@@ -3,7 +3,7 @@ import threading
 import time
 from chord.timer import Timer
 from chord.node_ref import NodeRef
-from config import SEPARATOR
+from chord.deadline import expired
 from chord.constants import CHECK_LEADER_FREQ, CHECK_FOR_ELECTION_FREQ
 
 class Elector:
@@ -115,7 +115,7 @@ class Elector:
             leader_port: The port of the candidate leader.
 
         Returns:
-            str: The IP and port of the elected leader, or None if election fails.
+            NodeRef: The elected leader, or None if election fails.
         """
         new_leader = NodeRef(leader_ip, leader_port)
 
@@ -131,7 +131,11 @@ class Elector:
                 self.leader = new_leader
 
             logging.info(f"Líder electo: {new_leader.id} en {new_leader.ip}:{new_leader.port}")
-            return f'{new_leader.ip}{SEPARATOR}{new_leader.port}'
+            return new_leader
+
+        if expired():
+            logging.info('Plazo agotado antes de contactar al sucesor, elección de líder fallida.')
+            return None
 
         ok = succ.ping()
         if not ok:
@@ -149,7 +153,7 @@ class Elector:
             self.leader = new_leader
 
         logging.info(f"Líder electo: {new_leader.id} en {new_leader.ip}:{new_leader.port}")
-        return f'{new_leader.ip}{SEPARATOR}{new_leader.port}'
+        return new_leader
     
     def check_for_election(self):
         """
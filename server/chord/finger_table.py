@@ -1,9 +1,16 @@
+import bisect
 import logging
 import threading
-import time
-from chord.node_ref import NodeRef
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Set, Tuple
+from chord.node_ref import NodeRef, NoResponse
 from chord.utils import is_in_interval
-from chord.constants import FIX_FINGERS_FREQ
+from chord.deadline import check, remaining
+from chord.health import health
+from chord.location_cache import LocationCache
+from chord.transport import thread_rpcs
+from chord.constants import FALSE, TRUE, FINGER_BULK_REFRESH, FINGER_ALTERNATES, PROXIMITY_ROUTING, PROXIMITY_PROBES, RPC_TIMEOUT, LOOKUP_MODE, LOOKUP_RECURSIVE
 
 class FingerTable:
     """
@@ -15,6 +22,8 @@ class FingerTable:
         finger_lock (threading.RLock): A reentrant lock to ensure thread safety while modifying the finger table.
         finger (List[NodeRef]): The list of nodes representing the finger table.
         fix_next (int): The index of the next finger to fix.
+        alternates (List[List[NodeRef]]): Other nodes inside each finger's interval, closest first.
+        known (Dict[int, NodeRef]): Peers learned from lookups and hints, the candidates for alternates.
     """
 
     def __init__(self, node, m: int = 160) -> None:
@@ -30,6 +39,38 @@ class FingerTable:
         self.finger_lock = threading.RLock()  # Lock for thread-safe modifications to the finger table
         self.finger = [self.node.ref] * self.m  # Initialize finger table with the node reference
         self.fix_next = 0  # Finger table index to fix next
+        self.ring = 2 ** self.m
+        self.index: Tuple[List[int], List[NodeRef]] = ([], [])  # Distinct fingers and alternates sorted by ring offset
+        self.alternates: List[List[NodeRef]] = [[] for _ in range(self.m)]
+        self.known: Dict[int, NodeRef] = {}
+        self.cache = LocationCache()  # Owners of recently resolved ranges
+        self.lookups: Dict[str, Future] = {}  # Recursive lookups waiting for their answer
+        self.lookups_lock = threading.Lock()
+        self.lookup_stats = {'lookups': 0, 'steps': 0, 'recursive': 0, 'fallbacks': 0, 'one_hop': 0}
+
+    def set_finger(self, index: int, node: NodeRef):
+        """
+        Sets a finger, rebuilding the finger index if the finger points to a different node.
+
+        Args:
+            index (int): The index of the finger.
+            node (NodeRef): The node the finger points to.
+        """
+        with self.finger_lock:
+            previous = self.finger[index]
+            self.finger[index] = node
+            if previous is None or node is None or previous.id != node.id:
+                self.rebuild_index()
+
+    def rebuild_index(self):
+        """
+        Rebuilds the finger index: the distinct nodes in the finger table and their alternates,
+        sorted by their clockwise distance from this node. Must be called holding the finger lock.
+        """
+        distinct = {node.id: node for node in self.finger if node and node.id != self.node.id}
+        distinct.update((node.id, node) for nodes in self.alternates for node in nodes)
+        ordered = sorted(distinct.items(), key=lambda item: (item[0] - self.node.id) % self.ring)
+        self.index = ([(id - self.node.id) % self.ring for id, _ in ordered], [node for _, node in ordered])
 
     def find_predecessor(self, id: int) -> 'NodeRef':
         """
@@ -47,87 +88,424 @@ class FingerTable:
         succ: NodeRef = node.successors.get(0)
         first = True
         while not is_in_interval(id, node.id, succ.id):
+            check(f'encontrar el predecesor de {id}')
             if first:
                 first = False
                 node = node.finger.closest_preceding_finger(id)
             else:
                 node = node.closest_preceding_finger(id)
+            succ = node.succ if node.id != self.node.id else self.node.successors.get(0)
 
         logging.info(f"Predecesor encontrado: {node.ref.id if first else node.id}")
         return node.ref if first else node
 
-    def find_successor(self, id: int) -> 'NodeRef':
+    def find_successor(self, id: int, use_cache: bool = False, physical: bool = False) -> 'NodeRef':
         """
-        Finds the successor of a given id by first locating its predecessor.
+        Finds the successor of a given id, routing the query with one RPC per hop.
+        In LOOKUP_RECURSIVE mode the query is forwarded from node to node and the owner
+        answers this node directly, falling back to iterative routing if no answer arrives.
+        In LOOKUP_ONE_HOP mode, or with virtual nodes, the owner comes from the membership
+        table without any RPC once the table has converged.
 
         Args:
             id (int): The id for which to find the successor.
+            use_cache (bool): Whether the owner may come from the location cache. Ring
+                maintenance must see the live ring, so only key lookups use it.
+            physical (bool): Whether to find the next node instead of the owner of the id,
+                skipping virtual nodes, as ring maintenance does.
 
         Returns:
             NodeRef: The successor node for the given id.
         """
         logging.info(f'Encontrando sucesor del ID: {id}')
 
+        membership = self.node.membership
+        if membership.active and membership.converged:
+            owner = next(iter(membership.successors(id)), None) if physical else membership.lookup(id)
+            if owner is not None:
+                self.incr('one_hop')
+                logging.info(f"Sucesor encontrado en la tabla de membresía: {owner.id}")
+                return owner
+
+        if use_cache:
+            owner = self.cache.get(id)
+            if owner is not None:
+                logging.info(f"Sucesor encontrado en caché: {owner.id}")
+                return owner
+
+        self.incr('lookups')
+        result = None
+        if LOOKUP_MODE == LOOKUP_RECURSIVE:
+            result = self.find_successor_recursive(id)
+            if result is None:
+                self.incr('fallbacks')
+        if result is None:
+            result = self.find_successor_iterative(id)
+
+        owner, start = result
+        logging.info(f"Sucesor encontrado: {owner.id}")
+        if use_cache:
+            self.cache.put(start, owner)
+        return owner
+
+    def lookup_step(self, id: int) -> Tuple[bool, NodeRef]:
+        """
+        Runs one routing step of a lookup on this node.
+
+        Args:
+            id (int): The id being looked up.
+
+        Returns:
+            Tuple[bool, NodeRef]: True and the owner of the id if this node knows it,
+                otherwise False and the next node to ask.
+        """
+        with self.node.succ_lock:
+            succ = self.node.successors.get(0)
+        if succ.id == self.node.id or is_in_interval(id, self.node.id, succ.id):
+            return True, succ
+
+        node = self.closest_preceding_finger(id)
+        if node.id == self.node.id:
+            # No finger gets closer, walk the successor pointer instead
+            return False, succ
+        return False, node
+
+    def find_successor_iterative(self, id: int) -> Tuple[NodeRef, int]:
+        """
+        Finds the successor of an id asking every node on the path for its next step.
+
+        Args:
+            id (int): The id for which to find the successor.
+
+        Returns:
+            Tuple[NodeRef, int]: The owner of the id and the id of its predecessor.
+
+        Raises:
+            NoResponse: If a node on the path failed and no other route avoids it.
+        """
+        done, node = self.lookup_step(id)
+        start = self.node.id
+        hops = 0
+        dead: Set[int] = set()
+        while not done:
+            check(f'encontrar el sucesor de {id}')
+            hops += 1
+            if hops > self.m:
+                raise RuntimeError(f'Búsqueda del ID {id} excede {self.m} saltos')
+
+            self.incr('steps')
+            try:
+                step = node.lookup_step(id)
+            except NoResponse:
+                # Route around the failed node from this node's own fingers
+                dead.add(node.id)
+                node = self.closest_preceding_finger(id, exclude=dead)
+                if node.id == self.node.id:
+                    raise NoResponse(f'Ninguna ruta hacia el ID {id} evita los nodos caídos')
+                logging.warning(f'Paso de búsqueda del ID {id} fallido, reintentando por {node.ip}')
+                continue
+            if step is None:
+                # The node predates the lookup step operation, route the old way
+                logging.info(f'Nodo {node.ip} no soporta búsqueda por pasos')
+                return self.find_successor_legacy(id)
+            start = node.id
+            done, node = step
+            if not done and node.id in dead:
+                # The route leads back into a failed node, fail now instead of going around again
+                raise NoResponse(f'La búsqueda del ID {id} solo avanza por el nodo caído {node.ip}')
+            self.learn(node)
+        return node, start
+
+    def find_successor_legacy(self, id: int) -> Tuple[NodeRef, int]:
+        """
+        Finds the successor of an id by first locating its predecessor, for rings with
+        nodes that do not support LOOKUP_STEP.
+
+        Args:
+            id (int): The id for which to find the successor.
+
+        Returns:
+            Tuple[NodeRef, int]: The owner of the id and the id of its predecessor.
+        """
         node = self.find_predecessor(id)  # Find the predecessor of the id
         
         with self.node.succ_lock:
             if self.node.id == node.id:
                 logging.info(f"El sucesor es el propio nodo, retornando el primer sucesor.")
-                return self.node.successors.get(0)
-            
-        logging.info(f"Sucesor encontrado: {node.succ.id}")
-        return node.succ  # Return successor of the node
+                return self.node.successors.get(0), node.id
+
+        return node.succ, node.id  # Return successor of the node
+
+    def find_successor_recursive(self, id: int) -> Optional[Tuple[NodeRef, int]]:
+        """
+        Finds the successor of an id forwarding the query along the ring; the node that
+        knows the owner sends it straight back to this node with LOOKUP_REPLY.
+
+        Args:
+            id (int): The id for which to find the successor.
+
+        Returns:
+            Tuple[NodeRef, int]: The owner of the id and the id of its predecessor,
+                or None if the answer did not arrive in time.
+        """
+        done, node = self.lookup_step(id)
+        if done:
+            return node, self.node.id
+
+        query_id = uuid.uuid4().hex
+        future = Future()
+        with self.lookups_lock:
+            self.lookups[query_id] = future
+        try:
+            if not node.find_recursive(id, query_id, self.node.ip, self.node.port):
+                return None
+            left = remaining()
+            result = future.result(RPC_TIMEOUT if left is None else max(0, left))
+            self.incr('recursive')
+            return result
+        except FutureTimeoutError:
+            logging.error(f'Búsqueda recursiva del ID {id} sin respuesta')
+            return None
+        finally:
+            with self.lookups_lock:
+                self.lookups.pop(query_id, None)
+
+    def route_recursive(self, id: int, query_id: str, origin_ip: str, origin_port: int):
+        """
+        Handles a recursive lookup: answers the originator if this node knows the owner,
+        otherwise forwards the query to the next node.
 
-    def closest_preceding_finger(self, id: int) -> NodeRef:
+        Args:
+            id (int): The id being looked up.
+            query_id (str): The id the originator is waiting on.
+            origin_ip (str): IP address of the originator.
+            origin_port (int): Port of the originator.
+        """
+        try:
+            done, node = self.lookup_step(id)
+            if done:
+                NodeRef(origin_ip, origin_port).lookup_reply(query_id, node, self.node.id)
+            elif not node.find_recursive(id, query_id, origin_ip, origin_port):
+                logging.error(f'No se pudo reenviar la búsqueda {query_id} a {node.ip}')
+        except Exception as e:
+            logging.error(f'Error encaminando la búsqueda {query_id}: {e}')
+
+    def resolve_lookup(self, query_id: str, owner: NodeRef, start: int) -> int:
+        """
+        Delivers the answer of a recursive lookup started by this node.
+
+        Args:
+            query_id (str): The id of the lookup.
+            owner (NodeRef): The owner found.
+            start (int): The id of the owner's predecessor.
+
+        Returns:
+            int: TRUE if a lookup was waiting for the answer, FALSE otherwise.
+        """
+        with self.lookups_lock:
+            future = self.lookups.get(query_id)
+        if future is None or future.done():
+            return FALSE
+        future.set_result((owner, start))
+        return TRUE
+
+    def incr(self, name: str):
+        """
+        Increments the lookup counter with the given name.
+        """
+        with self.lookups_lock:
+            self.lookup_stats[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
         """
-        Finds the closest preceding finger to a given id.
+        Returns a copy of the lookup counters.
+        """
+        with self.lookups_lock:
+            return dict(self.lookup_stats)
+
+    def closest_preceding_finger(self, id: int, exclude: Set[int] = frozenset()) -> NodeRef:
+        """
+        Finds the closest preceding finger to a given id with a binary search over the
+        finger index. Fingers whose circuit breaker is open are skipped, so lookups route
+        around suspect nodes instead of waiting on them. With PROXIMITY_ROUTING, among the
+        nodes just before the closest one that leave the same number of bits to resolve,
+        the one with the lowest round trip time is picked.
 
         Args:
             id (int): The id for which to find the closest preceding finger.
+            exclude (Set[int]): Ids of nodes to skip, those that already failed this lookup.
 
         Returns:
             NodeRef: The closest preceding finger to the given id.
         """
-        logging.info(f'Encontrando dedo precedente más cercano a {id}')
+        offsets, nodes = self.index  # Replaced as a whole on every change, so it is read without the lock
+        target = (id - self.node.id) % self.ring or self.ring
+        i = bisect.bisect_right(offsets, target) - 1
+        best = None
+        while i >= 0:
+            node = nodes[i]
+            if node.id not in exclude and not health.is_suspect(node.ip, node.port):
+                if not PROXIMITY_ROUTING:
+                    return node
+                if best is None:
+                    best, bits, candidates = node, (target - offsets[i]).bit_length(), FINGER_ALTERNATES
+                elif candidates == 0 or (target - offsets[i]).bit_length() > bits:
+                    break  # Any other node would take more hops
+                else:
+                    candidates -= 1
+                    if node.proximity < best.proximity:
+                        best = node
+            i -= 1
+        if best is not None:
+            return best
 
-        for i in range(self.m - 1, -1, -1):
-            with self.finger_lock:
-                if self.finger[i] and is_in_interval(self.finger[i].id, self.node.id, id):
-                    logging.info(f"Dedo precedente más cercano encontrado en índice {i}: {self.finger[i].id}")
-                    return self.finger[i]
-                
         logging.info(f"Ningún dedo precedente encontrado. Retornando la referencia del nodo {self.node.ref.id}.")
         return self.node.ref  # Return the node itself if no preceding finger is found
 
+    def fix_finger(self):
+        """
+        Fixes the next finger in turn with a lookup of its start.
+        """
+        self.fix_next += 1
+        if self.fix_next >= self.m:
+            self.fix_next = 0
+
+        succ = self.find_successor((self.node.id + 2 ** self.fix_next) % 2 ** self.m, physical=True)
+        logging.info(f"Arreglando dedo en el índice {self.fix_next}, dedo correspondiente encontrado en {succ.id}")
+
+        with self.finger_lock:
+            if succ.id == self.node:  # If the successor is the node itself, clear and reset the finger table
+                logging.warning(f"Sucesor del dedo {self.fix_next} es el propio nodo. Reiniciando finger table.")
+                for i in range(self.fix_next, self.m):
+                    self.finger[i] = None
+                self.rebuild_index()
+                self.fix_next = 0
+                return
+
+        self.set_finger(self.fix_next, succ)  # Update the finger table with the found successor
+
+    def refresh_fingers(self) -> int:
+        """
+        Refreshes the whole finger table. After looking up the successor of a finger's start,
+        every later finger whose start falls before that successor gets the same node without
+        another lookup, so a full refresh costs one lookup per distinct finger.
+
+        Returns:
+            int: The number of lookups made.
+        """
+        lookups = 0
+        i = 0
+        while i < self.m:
+            check('refrescar la tabla de dedos')
+            succ = self.find_successor((self.node.id + 2 ** i) % self.ring, physical=True)
+            lookups += 1
+
+            # The successor owns every start up to its own id; when it is this node, all the remaining ones.
+            # The finger looked up always takes it, even if a stale answer lies before its start
+            reach = (succ.id - self.node.id) % self.ring or self.ring
+            with self.finger_lock:
+                self.finger[i] = succ
+                i += 1
+                while i < self.m and 2 ** i <= reach:
+                    self.finger[i] = succ
+                    i += 1
+                self.rebuild_index()
+
+        logging.info(f'Tabla de dedos refrescada con {lookups} búsquedas, {len(self.index[1])} dedos distintos')
+        return lookups
+
+    def learn(self, node: NodeRef):
+        """
+        Records a peer seen during a lookup or in a hint, as a candidate alternate.
+
+        Args:
+            node (NodeRef): The peer.
+        """
+        if node.id == self.node.id or node.id in self.known:
+            return
+        with self.finger_lock:
+            if len(self.known) >= self.m:
+                self.known.pop(next(iter(self.known)))  # Forget the oldest peer
+            self.known[node.id] = node
+
+    def update_alternates(self):
+        """
+        Pings the known peers whose round trip time is unknown, a few per round, and picks
+        for every finger up to FINGER_ALTERNATES other healthy peers inside its interval,
+        closest first. The alternates join the finger index, so when a finger fails the
+        lookups fall back to a node in the same interval without waiting for a refresh.
+        """
+        with self.node.succ_lock:
+            neighbours = list(self.node.successors.list)
+        with self.node.pred_lock:
+            neighbours += self.node.predecessors.list
+        for node in neighbours:
+            self.learn(node)
+
+        with self.finger_lock:
+            known = [node for node in self.known.values() if not health.is_suspect(node.ip, node.port)]
+        for node in [node for node in known if node.proximity == float('inf')][:PROXIMITY_PROBES]:
+            check('medir la latencia de los pares')
+            node.ping()
+
+        ordered = sorted(known, key=lambda node: (node.id - self.node.id) % self.ring)
+        offsets = [(node.id - self.node.id) % self.ring for node in ordered]
+        with self.finger_lock:
+            for i in range(self.m):
+                # Peers in [start of finger i, start of finger i + 1)
+                low = bisect.bisect_left(offsets, 2 ** i)
+                high = bisect.bisect_left(offsets, 2 ** (i + 1))
+                finger = self.finger[i]
+                peers = [node for node in ordered[low:high] if finger is None or node.id != finger.id]
+                self.alternates[i] = sorted(peers, key=lambda node: node.proximity)[:FINGER_ALTERNATES]
+            self.rebuild_index()
+
+    def apply_hint(self, nodes: List[NodeRef]):
+        """
+        Fills the finger table from a list of nodes known by another node, usually the
+        finger table of the successor on join. Every finger points to the first known node
+        at or after its start; the next refresh corrects whatever the hint got wrong.
+
+        Args:
+            nodes (List[NodeRef]): The nodes to build the table from.
+        """
+        with self.finger_lock:
+            known = {node.id: node for node in self.index[1]}
+            known.update((node.id, node) for node in nodes if node.id != self.node.id)
+            for node in nodes:
+                self.learn(node)
+            if not known:
+                return
+            ordered = sorted(known.values(), key=lambda node: (node.id - self.node.id) % self.ring)
+            offsets = [(node.id - self.node.id) % self.ring for node in ordered]
+            for i in range(self.m):
+                index = bisect.bisect_left(offsets, 2 ** i)
+                # Past the last known node the start wraps around to this node
+                self.finger[i] = ordered[index] if index < len(ordered) else self.node.ref
+            self.rebuild_index()
+        logging.info(f'Tabla de dedos inicializada con {len(known)} nodos conocidos')
+
     def fix_fingers(self):
         """
         A method that periodically updates the finger table in a separate thread.
 
         The thread runs in the background and periodically attempts to update the finger table
-        by finding the successor for a given id, based on the current state of the node.
+        by finding the successor for a given id, based on the current state of the node. With
+        FINGER_BULK_REFRESH every round refreshes the whole table, otherwise a single finger.
+        Rounds that change the distinct fingers shorten the interval until the next one.
         """
 
         logging.info('Hilo de Arreglo de dedos iniciado')
 
         while not self.node.shutdown_event.is_set():
+            rpcs = thread_rpcs()
+            before = self.index[0]
             try:
-                self.fix_next += 1
-                if self.fix_next >= self.m:
-                    self.fix_next = 0
-
-                succ = self.find_successor((self.node.id + 2 ** self.fix_next) % 2 ** self.m)
-                logging.info(f"Arreglando dedo en el índice {self.fix_next}, dedo correspondiente encontrado en {succ.id}")
-
-                with self.finger_lock:
-                    if succ.id == self.node:  # If the successor is the node itself, clear and reset the finger table
-                        logging.warning(f"Sucesor del dedo {self.fix_next} es el propio nodo. Reiniciando finger table.")
-                        for i in range(self.fix_next, self.m):
-                            self.finger[i] = None
-                        self.fix_next = 0
-                        continue
-
-                self.finger[self.fix_next] = succ  # Update the finger table with the found successor
-
+                if FINGER_BULK_REFRESH:
+                    self.refresh_fingers()
+                else:
+                    self.fix_finger()
+                self.update_alternates()
             except Exception as e:
                 logging.error(f"Error en el Hilo de Arreglo de dedos: {e}")
-            time.sleep(FIX_FINGERS_FREQ)  # Sleep for a while before the next fix attempt
+            self.node.end_round('fix_fingers', before != self.index[0], rpcs)
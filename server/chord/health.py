@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from chord.constants import HEALTH_FAILURE_THRESHOLD, HEALTH_OPEN_TIME
+
+# Circuit breaker states
+CLOSED = 'closed'  # Healthy, requests flow normally
+OPEN = 'open'  # Suspect, requests fail right away
+HALF_OPEN = 'half-open'  # Suspect, a probe is checking whether the peer came back
+
+
+class PeerUnavailable(ConnectionError):
+    """
+    Raised instead of contacting a peer whose circuit breaker is open.
+    """
+
+
+class PeerHealth:
+    """
+    Circuit breaker for a single peer address.
+
+    Attributes:
+        state (str): CLOSED, OPEN or HALF_OPEN.
+        failures (int): Consecutive failed requests.
+        opened_at (float): Monotonic time at which the breaker last opened.
+        rejected (int): Requests failed fast while the breaker was open.
+    """
+
+    def __init__(self, ip: str, port: int) -> None:
+        self.ip = ip
+        self.port = port
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+
+    @property
+    def suspect(self) -> bool:
+        """
+        Whether the peer should be avoided.
+        """
+        return self.state != CLOSED
+
+    def allow(self) -> bool:
+        """
+        Tells whether a request may be sent to the peer, counting it as rejected otherwise.
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        """
+        Records a successful request, closing the breaker.
+        """
+        with self.lock:
+            if self.state != CLOSED:
+                logging.info(f'Nodo {self.ip}:{self.port} responde de nuevo')
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self):
+        """
+        Records a failed request, opening the breaker after HEALTH_FAILURE_THRESHOLD
+        consecutive failures or when a half-open probe fails.
+        """
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= HEALTH_FAILURE_THRESHOLD):
+                if self.state == CLOSED:
+                    logging.warning(f'Nodo {self.ip}:{self.port} marcado como sospechoso tras {self.failures} fallos')
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def start_probe(self, now: float) -> bool:
+        """
+        Moves an open breaker to half-open once it has been open for HEALTH_OPEN_TIME.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            bool: Whether the caller should probe the peer now.
+        """
+        with self.lock:
+            if self.state != OPEN or now - self.opened_at < HEALTH_OPEN_TIME:
+                return False
+            self.state = HALF_OPEN
+            return True
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Returns a plain dictionary with the state of the breaker.
+        """
+        with self.lock:
+            return {'state': self.state, 'failures': self.failures, 'rejected': self.rejected}
+
+
+class HealthRegistry:
+    """
+    Process-wide registry of the circuit breakers of every peer contacted.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.peers: Dict[Tuple[str, int], PeerHealth] = {}
+
+    def get(self, ip: str, port: int) -> PeerHealth:
+        """
+        Returns the breaker of a peer, creating it on first use.
+        """
+        key = (ip, int(port))
+        with self.lock:
+            health = self.peers.get(key)
+            if health is None:
+                health = self.peers[key] = PeerHealth(ip, int(port))
+            return health
+
+    def is_suspect(self, ip: str, port: int) -> bool:
+        """
+        Tells whether a peer is currently considered down. Unknown peers are healthy.
+        """
+        with self.lock:
+            health = self.peers.get((ip, int(port)))
+        return health is not None and health.suspect
+
+    def to_probe(self) -> List[PeerHealth]:
+        """
+        Returns the breakers due for a half-open probe, already moved to HALF_OPEN.
+        """
+        now = time.monotonic()
+        with self.lock:
+            peers = list(self.peers.values())
+        return [health for health in peers if health.start_probe(now)]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """
+        Returns the state of the breakers of the peers that are suspect or had requests rejected.
+        """
+        with self.lock:
+            peers = list(self.peers.values())
+        result = {}
+        for health in peers:
+            state = health.to_dict()
+            if state['state'] != CLOSED or state['rejected']:
+                result[f'{health.ip}:{health.port}'] = state
+        return result
+
+
+health = HealthRegistry()
@@ -0,0 +1,148 @@
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from chord.node_ref import NodeRef
+from chord.utils import is_in_interval
+from chord.constants import LOCATION_CACHE_SIZE, LOCATION_CACHE_TTL, LOCATION_CACHE_CHANGE_TTL
+
+
+class LocationCache:
+    """
+    Cache of the ring ranges whose owner was resolved recently.
+
+    Every entry maps the range (start, end] to the node owning it, where `end` is the id of
+    the owner and `start` the id of its predecessor. Entries are kept sorted by `end`, so
+    the owner of an id is found with a single bisection.
+
+    Cached owners are not validated against the ring, so an entry may name a node that no
+    longer owns its range. Entries are dropped when a node joins inside their range or their
+    owner fails, but changes elsewhere in the ring go unnoticed. To bound how long such an
+    owner is served, every topology change this node sees shortens the life of all entries
+    to `change_ttl`, and entries cached during the following `ttl` seconds get that shorter
+    life too; only on a ring that stayed stable do entries live for the whole `ttl`.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to be routed.
+        invalidations (int): Entries dropped because the ring changed or the owner failed.
+    """
+
+    def __init__(self, size: int = LOCATION_CACHE_SIZE, ttl: float = LOCATION_CACHE_TTL, change_ttl: float = LOCATION_CACHE_CHANGE_TTL) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            size (int): The maximum number of ranges kept; the oldest ones are dropped first.
+            ttl (float): Seconds an entry stays valid.
+            change_ttl (float): Seconds an entry stays valid while the ring is changing.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.change_ttl = change_ttl
+        self.changing_until = 0.0  # Monotonic time until which new entries get the short life
+        self.lock = threading.Lock()
+        self.ends: List[int] = []  # Sorted range ends
+        self.entries: Dict[int, Tuple[int, NodeRef, float]] = {}  # end -> (start, owner, expiry)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, id: int) -> Optional[NodeRef]:
+        """
+        Returns the cached owner of an id.
+
+        Args:
+            id (int): The id to look up.
+
+        Returns:
+            NodeRef: The owner of the id, or None if no valid entry covers it.
+        """
+        with self.lock:
+            if self.ends:
+                # The first range ending at or after the id, wrapping around the ring
+                index = bisect.bisect_left(self.ends, id) % len(self.ends)
+                end = self.ends[index]
+                start, owner, expiry = self.entries[end]
+                if is_in_interval(id, start, end) and time.monotonic() < expiry:
+                    self.hits += 1
+                    return owner
+            self.misses += 1
+            return None
+
+    def put(self, start: int, owner: NodeRef):
+        """
+        Caches the owner of the range (start, owner.id].
+
+        Args:
+            start (int): The id of the owner's predecessor.
+            owner (NodeRef): The node owning the range.
+        """
+        end = owner.id
+        with self.lock:
+            if end not in self.entries:
+                if len(self.ends) >= self.size:
+                    oldest = min(self.entries, key=lambda e: self.entries[e][2])
+                    self.remove(oldest)
+                bisect.insort(self.ends, end)
+            now = time.monotonic()
+            self.entries[end] = (start, owner, now + (self.change_ttl if now < self.changing_until else self.ttl))
+
+    def remove(self, end: int):
+        """
+        Drops the entry ending at `end`. Must be called holding the lock.
+        """
+        del self.entries[end]
+        del self.ends[bisect.bisect_left(self.ends, end)]
+
+    def invalidate_owner(self, owner: NodeRef):
+        """
+        Drops the entries owned by a node, used when a request to it fails.
+
+        Args:
+            owner (NodeRef): The node that failed.
+        """
+        with self.lock:
+            for end in [end for end, (_, node, _) in self.entries.items() if node.ip == owner.ip]:
+                self.remove(end)
+                self.invalidations += 1
+
+    def invalidate_id(self, id: int):
+        """
+        Drops the entries whose range contains an id, used when a node joins at that id.
+
+        Args:
+            id (int): The id of the node that joined.
+        """
+        with self.lock:
+            for end in [end for end, (start, _, _) in self.entries.items() if is_in_interval(id, start, end)]:
+                self.remove(end)
+                self.invalidations += 1
+
+    def shorten(self):
+        """
+        Shortens the life of every entry to `change_ttl` after a topology change, and of the
+        entries cached during the next `ttl` seconds, while the ring settles.
+        """
+        with self.lock:
+            now = time.monotonic()
+            limit = now + self.change_ttl
+            self.entries = {end: (start, owner, min(expiry, limit)) for end, (start, owner, expiry) in self.entries.items()}
+            self.changing_until = now + self.ttl
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self.lock:
+            self.invalidations += len(self.ends)
+            self.ends = []
+            self.entries = {}
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns the counters and the number of cached ranges.
+        """
+        with self.lock:
+            return {'size': len(self.ends), 'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
@@ -0,0 +1,362 @@
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from chord.storage import Data, DefaultData, Storage
+from chord.snapshot import read_snapshot, write_snapshot
+from chord.constants import LOG_SEGMENT_SIZE, LOG_FSYNC_INTERVAL, LOG_COMPACT_FREQ, LOG_COMPACT_RATIO
+
+# Record header: crc32 of the rest of the record, key length, value length, version and active flag
+HEADER = struct.Struct('!IIIqB')
+
+# Where the value of a key lives: segment, offset and length of the value, record size, version and active flag
+Entry = Tuple[int, int, int, int, int, bool]
+
+
+class LogStorage(Storage):
+    """
+    Durable storage keeping every change as a record appended to a log of segment files.
+
+    Only an index of key to file offset is kept in memory; values are read from disk. Writes
+    are flushed to disk in batches every LOG_FSYNC_INTERVAL seconds, so a crash loses at most
+    that much, which the replicas of the node cover. On start the segments are replayed to
+    rebuild the index, dropping a torn record at the end of the log. A background compactor
+    rewrites the live records of the segments that are mostly superseded and deletes them.
+    """
+
+    def __init__(self, path: str, segment_size: int = LOG_SEGMENT_SIZE, fsync_interval: float = LOG_FSYNC_INTERVAL) -> None:
+        """
+        Opens the storage in a directory, recovering the data logged there.
+
+        :param path: Directory holding the segment files; created if missing.
+        :param segment_size: Size in bytes after which a new segment is started.
+        :param fsync_interval: Seconds between the batched flushes of the log to disk.
+        """
+        super().__init__()
+        self.path = path
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.index: Dict[str, Entry] = {}
+        self.fds: Dict[int, int] = {}  # Open file descriptor of every segment
+        self.live: Dict[int, int] = {}  # Bytes of every segment still referenced by the index
+        self.sizes: Dict[int, int] = {}  # Bytes written to every segment
+        self.active = 0  # Segment receiving the appends
+        self.dirty = False
+        self.closed = threading.Event()
+
+        os.makedirs(path, exist_ok=True)
+        self.recover()
+        threading.Thread(target=self.flush_periodically, daemon=True).start()
+        threading.Thread(target=self.compact_periodically, daemon=True).start()
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f'{segment:08d}.log')
+
+    def open_segment(self, segment: int):
+        """
+        Opens a segment for appending and reading, making it the active one.
+        """
+        if segment not in self.fds:
+            self.fds[segment] = os.open(self.segment_path(segment), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self.live.setdefault(segment, 0)
+        self.sizes.setdefault(segment, 0)
+        self.active = segment
+
+    def recover(self):
+        """
+        Rebuilds the index replaying every segment in order. A record that fails its checksum
+        ends the replay of its segment, which is truncated there.
+        """
+        segments = sorted(int(name[:-4]) for name in os.listdir(self.path) if name.endswith('.log') and name[:-4].isdigit())
+        records = 0
+        for segment in segments:
+            with open(self.segment_path(segment), 'rb') as file:
+                content = file.read()
+            self.live[segment] = 0
+            offset = 0
+            while offset + HEADER.size <= len(content):
+                crc, key_len, value_len, version, active = HEADER.unpack_from(content, offset)
+                end = offset + HEADER.size + key_len + value_len
+                if end > len(content) or zlib.crc32(content[offset + 4:end]) != crc:
+                    break
+                key = content[offset + HEADER.size:offset + HEADER.size + key_len].decode()
+                self.index_record(key, (segment, end - value_len, value_len, end - offset, version, bool(active)))
+                offset = end
+                records += 1
+
+            if offset < len(content):
+                logging.warning(f'Segmento {segment} truncado en {offset} de {len(content)} bytes por un registro incompleto')
+                os.truncate(self.segment_path(segment), offset)
+            self.sizes[segment] = offset
+            self.fds[segment] = os.open(self.segment_path(segment), os.O_RDWR | os.O_APPEND)
+
+        # Keep appending to the last segment, if any
+        self.open_segment(segments[-1] if segments else 0)
+        logging.info(f'Almacenamiento recuperado: {len(self.index)} llaves de {records} registros en {len(segments)} segmentos')
+
+    def index_record(self, key: str, entry: Entry):
+        """
+        Points a key to its newest record, releasing the bytes of the previous one.
+        """
+        previous = self.index.get(key)
+        if previous is not None:
+            self.live[previous[0]] -= previous[3]
+        else:
+            self.ring.add(key)
+        self.index[key] = entry
+        self.live[entry[0]] = self.live.get(entry[0], 0) + entry[3]
+
+    def append(self, key: str, value: str, version: int, active: bool):
+        """
+        Appends a record to the active segment and indexes it. Must be called holding the lock.
+        """
+        key_bytes, value_bytes = key.encode(), value.encode()
+        body = HEADER.pack(0, len(key_bytes), len(value_bytes), version, active)[4:] + key_bytes + value_bytes
+        record = struct.pack('!I', zlib.crc32(body)) + body
+
+        if self.sizes[self.active] > 0 and self.sizes[self.active] + len(record) > self.segment_size:
+            os.fsync(self.fds[self.active])  # Seal the segment before moving on
+            self.open_segment(self.active + 1)
+
+        offset = self.sizes[self.active]
+        os.write(self.fds[self.active], record)
+        self.sizes[self.active] += len(record)
+        self.dirty = True
+        self.index_record(key, (self.active, offset + len(record) - len(value_bytes), len(value_bytes), len(record), version, active))
+
+    def read(self, entry: Entry) -> Data:
+        """
+        Reads the data of an index entry from its segment.
+        """
+        segment, offset, length, _, version, active = entry
+        return Data(os.pread(self.fds[segment], length, offset).decode(), version, active)
+
+    def get(self, key: str) -> Tuple[Data, bool]:
+        """
+        Retrieves a data item from storage.
+
+        :param key: Key of the data to fetch.
+        :return: A tuple containing the data and a boolean indicating if it was empty.
+        """
+        with self.storage_lock:
+            entry = self.index.get(key)
+            data = self.read(entry) if entry is not None else DefaultData()
+        return data, data.is_empty()
+
+    def set(self, key: str, data: Data) -> bool:
+        """
+        Stores a data item associated with a key.
+
+        :param key: Key of the data.
+        :param data: Data instance to be stored.
+        :return: True if the data was stored successfully.
+        """
+        with self.storage_lock:
+            data.active = True
+            self.append(key, data.value, data.version, True)
+        return True
+
+    def remove(self, key: str, timestamp: int, mark_inactive: bool = True) -> bool:
+        """
+        Removes a data item by marking it as inactive and updating its version.
+
+        :param key: Key of the data to remove.
+        :param timestamp: Timestamp of the removal.
+        :param mark_inactive: Whether to mark as inactive instead of physically deleting.
+        :return: True if the data was removed successfully.
+        """
+        with self.storage_lock:
+            entry = self.index.get(key)
+            if entry is None:
+                logging.warning(f"Se intentó eliminar una llave que no existe: '{key}'.")
+                return False
+            data = self.read(entry)
+            self.append(key, data.value, timestamp, data.active and not mark_inactive)
+        return True
+
+    def get_keys(self, active: Optional[bool] = None) -> List[str]:
+        """
+        Retrieves every key in storage, including the ones marked as removed, in sorted order.
+        The keys and their flags come from the index, without reading any value from disk.
+
+        :param active: If given, only the keys whose active flag matches it.
+        :return: A sorted list with the keys.
+        """
+        with self.storage_lock:
+            return sorted(key for key, entry in self.index.items() if active is None or entry[5] == active)
+
+    def count(self) -> int:
+        """
+        Counts the active data items from the index, without reading them from disk.
+
+        :return: The number of active keys.
+        """
+        with self.storage_lock:
+            return sum(1 for entry in self.index.values() if entry[5])
+
+    def select(self, active: bool) -> Dict[str, Data]:
+        """
+        Reads every data item with the given active flag, in log order to keep the reads sequential.
+        """
+        with self.storage_lock:
+            entries = sorted(((entry, key) for key, entry in self.index.items() if entry[5] == active), key=lambda item: item[0][:2])
+            return {key: self.read(entry) for entry, key in entries}
+
+    def get_all(self) -> Tuple[Dict[str, Data], bool]:
+        """
+        Retrieves all active data items from storage.
+
+        :return: A dictionary with active data and a success boolean.
+        """
+        return self.select(True), True
+
+    def get_remove_all(self) -> Tuple[Dict[str, Data], bool]:
+        """
+        Retrieves all data items marked as removed.
+
+        :return: A dictionary with removed data and a success boolean.
+        """
+        return self.select(False), True
+
+    def set_all(self, new_data: Dict[str, Data]) -> bool:
+        """
+        Stores multiple data items in the system.
+
+        :param new_data: Dictionary of data items to store.
+        :return: True if all data items were stored successfully.
+        """
+        with self.storage_lock:
+            for key, data in new_data.items():
+                data.active = True
+                self.append(key, data.value, data.version, True)
+            logging.info(f"Almacenados {len(new_data)} elementos.")
+        return True
+
+    def remove_all(self, keys_with_versions: Dict[str, int]) -> bool:
+        """
+        Marks multiple keys as removed and updates their versions.
+
+        :param keys_with_versions: Dictionary with keys and their new removal versions.
+        :return: True if all data items were marked as removed successfully.
+        """
+        with self.storage_lock:
+            for key, version in keys_with_versions.items():
+                self.remove(key, version)
+        return True
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Writes every data item, including the removed ones, to a snapshot file.
+
+        :param path: The snapshot file.
+        :return: The size of the snapshot in bytes.
+        """
+        with self.storage_lock:
+            entries = sorted(((entry, key) for key, entry in self.index.items()), key=lambda item: item[0][:2])
+            records = []
+            for entry, key in entries:
+                data = self.read(entry)
+                records.append((key, data.value, data.version, data.active))
+        return write_snapshot(path, records)
+
+    def load_snapshot(self, path: str, interval: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Loads the data items of a snapshot file, keeping the stored ones that are newer.
+
+        :param path: The snapshot file.
+        :param interval: If given, only the keys whose hash falls in the ring interval (start, end] are loaded.
+        :return: The number of data items loaded.
+        """
+        records = read_snapshot(path, interval)
+        loaded = 0
+        with self.storage_lock:
+            for key, value, version, active in records:
+                entry = self.index.get(key)
+                if entry is None or entry[4] < version:
+                    self.append(key, value, version, active)
+                    loaded += 1
+        logging.info(f"Cargados {loaded} de {len(records)} elementos de la instantánea {path}.")
+        return loaded
+
+    def flush(self):
+        """
+        Forces the records appended so far to disk.
+        """
+        with self.storage_lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            fd = self.fds[self.active]
+        os.fsync(fd)
+
+    def flush_periodically(self):
+        """
+        Flushes the log every fsync interval, so a burst of writes shares a single fsync.
+        """
+        while not self.closed.wait(self.fsync_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logging.error(f'Error sincronizando el registro de almacenamiento: {e}')
+
+    def garbage(self) -> List[int]:
+        """
+        Returns the sealed segments whose share of superseded bytes reached LOG_COMPACT_RATIO.
+        """
+        with self.storage_lock:
+            return [segment for segment, size in self.sizes.items()
+                    if segment != self.active and size and 1 - self.live[segment] / size >= LOG_COMPACT_RATIO]
+
+    def compact(self, segment: int) -> int:
+        """
+        Moves the live records of a sealed segment to the active one and deletes the segment.
+        The lock is taken once per record, so writes are not stalled behind a whole segment.
+
+        :param segment: The segment to compact.
+        :return: The number of bytes reclaimed.
+        """
+        with self.storage_lock:
+            keys = [key for key, entry in self.index.items() if entry[0] == segment]
+
+        for key in keys:
+            with self.storage_lock:
+                entry = self.index.get(key)
+                if entry is not None and entry[0] == segment:
+                    data = self.read(entry)
+                    self.append(key, data.value, data.version, data.active)
+
+        with self.storage_lock:
+            if any(entry[0] == segment for entry in self.index.values()):
+                return 0  # Left for the next round
+            self.flush()  # The moved records must be durable before their old copies go away
+            os.close(self.fds.pop(segment))
+            size = self.sizes.pop(segment)
+            self.live.pop(segment)
+            os.remove(self.segment_path(segment))
+        logging.info(f'Segmento {segment} compactado, {size} bytes liberados')
+        return size
+
+    def compact_periodically(self):
+        """
+        Compacts the segments that are mostly garbage every LOG_COMPACT_FREQ seconds.
+        """
+        while not self.closed.wait(LOG_COMPACT_FREQ):
+            try:
+                for segment in self.garbage():
+                    self.compact(segment)
+            except Exception as e:
+                logging.error(f'Error compactando el almacenamiento: {e}')
+
+    def close(self):
+        """
+        Flushes the log and closes every segment.
+        """
+        self.closed.set()
+        with self.storage_lock:
+            self.flush()
+            for fd in self.fds.values():
+                os.close(fd)
+            self.fds.clear()
@@ -0,0 +1,338 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from chord.node_ref import NodeRef
+from chord.health import health
+from chord.utils import getShaRepr
+from chord.constants import LOOKUP_MODE, LOOKUP_ONE_HOP, MEMBERSHIP_TTL, VIRTUAL_NODES
+
+
+def positions(ip: str, vnodes: int) -> List[int]:
+    """
+    Returns the ring positions of a node's virtual nodes. The first one is the id of the
+    node itself, so a node with a single virtual node sits where it always did.
+
+    Args:
+        ip (str): IP address of the node.
+        vnodes (int): The number of virtual nodes.
+
+    Returns:
+        List[int]: The positions.
+    """
+    return [getShaRepr(ip)] + [getShaRepr(f'{ip}#{k}') for k in range(1, vnodes)]
+
+
+class Membership:
+    """
+    Full table of the nodes of the ring, for one-hop routing in small clusters and for
+    placing virtual nodes.
+
+    Every node keeps a heartbeat for itself and for every node it heard of. Heartbeats are
+    wall clock milliseconds, so a restarted node supersedes its previous incarnation. On
+    every stabilize round a node bumps its own heartbeat and swaps its table with its
+    successor and with a random member, keeping the highest heartbeat of each node; a member
+    whose heartbeat stops growing for MEMBERSHIP_TTL seconds is dropped. The owner of an id
+    is the member of the first virtual node at or after it, found with a bisection.
+
+    Every member announces how many virtual nodes it runs, so the table places all of them
+    on the ring; a node with more capacity runs more of them and owns a larger share of the
+    keyspace. A node heard of directly, before its own announcement arrives, sits only at its
+    id. The table has converged once every member announced its virtual nodes and the last
+    swap with a peer found the same table there; until then lookups route with fingers, so
+    nodes whose tables still differ do not place keys on different owners. The table is
+    active, and used for routing, in LOOKUP_ONE_HOP mode or when the ring runs more than one
+    virtual node per node, which finger routing cannot see. Both are ring-wide settings, so
+    every node agrees on whether the table routes.
+
+    Attributes:
+        merges (int): Tables merged from other nodes.
+        expired (int): Members dropped because their heartbeat stopped growing.
+        removed (int): Members dropped because they were found dead.
+    """
+
+    def __init__(self, node, vnodes: int = VIRTUAL_NODES, ttl: float = MEMBERSHIP_TTL) -> None:
+        """
+        Initializes the table with the node itself as its only member.
+
+        Args:
+            node: The node that owns the table.
+            vnodes (int): The number of virtual nodes the node runs.
+            ttl (float): Seconds a member is kept without its heartbeat growing.
+        """
+        self.node = node
+        self.vnodes = vnodes
+        self.ttl = ttl
+        self.active = LOOKUP_MODE == LOOKUP_ONE_HOP or VIRTUAL_NODES > 1
+        self.lock = threading.Lock()
+        self.members: Dict[int, Tuple[NodeRef, int, float, int]] = {}  # id -> (node, heartbeat, time it last grew, virtual nodes)
+        self.positions: Dict[int, List[int]] = {}  # id -> positions of the member's virtual nodes
+        self.removed_at: Dict[int, int] = {}  # id -> heartbeat of the members dropped
+        self.index: Tuple[List[int], List[NodeRef]] = ([], [])  # Virtual nodes sorted by position, with their member
+        self.nodes: Tuple[List[int], List[NodeRef]] = ([], [])  # Members sorted by id, without their virtual nodes
+        self.epoch = 0  # Bumped on every change of the members
+        self.agreed = False  # Whether the last swap found the same table on the peer, with no change since
+        self.merges = 0
+        self.expired = 0
+        self.removed = 0
+        self.beat()
+
+    def rebuild_index(self):
+        """
+        Rebuilds the sorted index of virtual nodes. Must be called holding the lock.
+        """
+        for id, (node, _, _, vnodes) in self.members.items():
+            if len(self.positions.get(id, ())) != max(1, vnodes):
+                self.positions[id] = positions(node.ip, vnodes)
+        for id in [id for id in self.positions if id not in self.members]:
+            del self.positions[id]
+
+        ordered = sorted(((position, self.members[id][0]) for id, points in self.positions.items() for position in points), key=lambda item: item[0])
+        self.index = ([position for position, _ in ordered], [node for _, node in ordered])
+        nodes = sorted((node for node, _, _, _ in self.members.values()), key=lambda node: node.id)
+        self.nodes = ([node.id for node in nodes], nodes)
+        self.epoch += 1
+        self.agreed = False
+
+    def beat(self):
+        """
+        Bumps the heartbeat of the node itself.
+        """
+        with self.lock:
+            new = self.node.id not in self.members
+            self.members[self.node.id] = (self.node.ref, int(time.time() * 1000), time.monotonic(), self.vnodes)
+            if new:
+                self.rebuild_index()
+
+    def fields(self) -> List:
+        """
+        Returns the table as the fields of a message: ip, port, heartbeat and number of
+        virtual nodes of every member, 0 for those that did not announce it yet.
+        """
+        with self.lock:
+            return [field for node, heartbeat, _, vnodes in self.members.values() for field in (node.ip, node.port, heartbeat, vnodes)]
+
+    def agrees(self, fields: List[str]) -> bool:
+        """
+        Checks whether a table received from another node has the same members, with the
+        same virtual nodes, as this one. Must be called holding the lock.
+
+        Args:
+            fields (List[str]): The table, as returned by fields().
+        """
+        other = {(fields[i], int(fields[i + 1]), int(fields[i + 3])) for i in range(0, len(fields) - 3, 4)}
+        return other == {(node.ip, node.port, vnodes) for node, _, _, vnodes in self.members.values()}
+
+    def merge(self, fields: List[str]) -> bool:
+        """
+        Merges a table received from another node, keeping the highest heartbeat of every member.
+
+        Args:
+            fields (List[str]): The table, as returned by fields().
+
+        Returns:
+            bool: True if a member was added or changed its number of virtual nodes.
+        """
+        changed = False
+        now = time.monotonic()
+        with self.lock:
+            for i in range(0, len(fields) - 3, 4):
+                node, heartbeat, vnodes = NodeRef(fields[i], int(fields[i + 1])), int(fields[i + 2]), max(0, int(fields[i + 3]))
+                # Only a newer heartbeat brings back a member dropped before
+                if node.id == self.node.id or heartbeat <= self.removed_at.get(node.id, -1):
+                    continue
+                current = self.members.get(node.id)
+                if current is None or heartbeat > current[1]:
+                    self.members[node.id] = (node, heartbeat, now, vnodes)
+                    self.removed_at.pop(node.id, None)
+                    changed = changed or current is None or current[3] != vnodes
+            self.merges += 1
+            if changed:
+                self.rebuild_index()
+        return changed
+
+    def add(self, node: NodeRef):
+        """
+        Adds a node this one heard from directly, until its own heartbeat arrives by gossip.
+        Its number of virtual nodes is unknown until then, so the table does not converge.
+
+        Args:
+            node (NodeRef): The node.
+        """
+        if node.id not in self.members:
+            self.merge([node.ip, node.port, 0, 0])
+
+    def remove(self, node: NodeRef):
+        """
+        Drops a member found dead.
+
+        Args:
+            node (NodeRef): The member.
+        """
+        with self.lock:
+            entry = self.members.pop(node.id, None) if node.id != self.node.id else None
+            if entry is not None:
+                self.removed_at[node.id] = entry[1]
+                self.removed += 1
+                self.rebuild_index()
+
+    def expire(self):
+        """
+        Drops the members whose heartbeat did not grow for longer than the TTL.
+        """
+        now = time.monotonic()
+        with self.lock:
+            stale = [id for id, (_, _, seen, _) in self.members.items() if id != self.node.id and now - seen > self.ttl]
+            for id in stale:
+                self.removed_at[id] = self.members.pop(id)[1]
+            if stale:
+                self.expired += len(stale)
+                self.rebuild_index()
+                logging.info(f'{len(stale)} miembros expirados de la tabla de membresía')
+
+    def lookup(self, id: int) -> Optional[NodeRef]:
+        """
+        Finds the owner of an id in the table. Members whose circuit breaker is open are
+        skipped, so their keys are served by the next member, which holds their replicas.
+
+        Args:
+            id (int): The id to look up.
+
+        Returns:
+            NodeRef: The owner of the id, or None if the table has not heard of the rest of the ring yet.
+        """
+        ids, nodes = self.index  # Replaced as a whole on every change, so it is read without the lock
+        if len(self.members) == 1 and self.node.successors.get(0).id != self.node.id:
+            return None
+
+        # The first virtual node at or after the id, wrapping around the ring
+        index = bisect.bisect_left(ids, id)
+        for k in range(len(ids)):
+            owner = nodes[(index + k) % len(ids)]
+            if owner.id == self.node.id or not health.is_suspect(owner.ip, owner.port):
+                return owner
+        return None
+
+    def successors(self, id: int, count: int = 1) -> List[NodeRef]:
+        """
+        Finds the members whose node id comes at or after an id, skipping every virtual
+        position, so a node is never its own successor. Ring maintenance follows these, as
+        the successor lists and fingers link nodes and not virtual nodes.
+
+        Args:
+            id (int): The id.
+            count (int): The number of members.
+
+        Returns:
+            List[NodeRef]: Up to `count` members, skipping the suspect ones.
+        """
+        ids, nodes = self.nodes
+        index = bisect.bisect_left(ids, id)
+        found = []
+        for k in range(len(ids)):
+            node = nodes[(index + k) % len(ids)]
+            if node.id == self.node.id or not health.is_suspect(node.ip, node.port):
+                found.append(node)
+                if len(found) == count:
+                    break
+        return found
+
+    @property
+    def converged(self) -> bool:
+        """
+        Whether every member announced its virtual nodes and the last swap found the same table on the peer.
+        """
+        with self.lock:
+            return self.agreed and all(vnodes for _, _, _, vnodes in self.members.values())
+
+    @property
+    def virtual(self) -> bool:
+        """
+        Whether some member runs more than one virtual node, so ownership no longer follows the successor lists.
+        """
+        ids, _ = self.index
+        return len(ids) > len(self.positions)
+
+    def replicas(self, id: int, count: int) -> List[NodeRef]:
+        """
+        Finds where the replicas of an id go: the next distinct members after its owner,
+        following the virtual nodes on the ring and skipping the suspect ones.
+
+        Args:
+            id (int): The id.
+            count (int): The number of replicas.
+
+        Returns:
+            List[NodeRef]: Up to `count` members, none of them the owner.
+        """
+        ids, nodes = self.index
+        owner = self.lookup(id)
+        if owner is None:
+            return []
+
+        replicas: Dict[int, NodeRef] = {}
+        index = bisect.bisect_left(ids, id)
+        for k in range(len(ids)):
+            node = nodes[(index + k) % len(ids)]
+            if node.id != owner.id and node.id not in replicas and not health.is_suspect(node.ip, node.port):
+                replicas[node.id] = node
+                if len(replicas) == count:
+                    break
+        return list(replicas.values())
+
+    def shares(self) -> Dict[str, float]:
+        """
+        Returns the fraction of the keyspace owned by every member, to check the balance of the ring.
+        """
+        ids, nodes = self.index
+        ring = 2 ** self.node.finger.m
+        shares: Dict[str, float] = {}
+        for i, node in enumerate(nodes):
+            # Every virtual node owns the arc since the previous one
+            arc = (ids[i] - ids[i - 1]) % ring or ring
+            address = f'{node.ip}:{node.port}'
+            shares[address] = shares.get(address, 0) + arc / ring
+        return {address: round(share, 6) for address, share in shares.items()}
+
+    def gossip(self):
+        """
+        Bumps the heartbeat of the node, drops the expired members and swaps tables with the
+        successor and with a random member, checking whether the tables agree.
+        """
+        self.beat()
+        self.expire()
+
+        with self.node.succ_lock:
+            succ = self.node.successors.get(0)
+        peers = [succ] if succ.id != self.node.id else []
+        with self.lock:
+            others = [node for node, _, _, _ in self.members.values() if node.id not in (self.node.id, succ.id)]
+        if others:
+            peers.append(random.choice(others))
+
+        if not peers:
+            with self.lock:
+                self.agreed = len(self.members) == 1
+        for peer in peers:
+            response = peer.exchange_members(self.fields())
+            if response:
+                self.merge(response)
+                with self.lock:
+                    self.agreed = self.agrees(response)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns the size of the table and its counters.
+        """
+        with self.lock:
+            return {
+                'members': len(self.members),
+                'vnodes': len(self.index[0]),
+                'converged': int(self.agreed),
+                'merges': self.merges,
+                'expired': self.expired,
+                'removed': self.removed,
+            }
@@ -0,0 +1,360 @@
+import math
+import threading
+import time
+from typing import Dict
+
+
+class LatencyHistogram:
+    """
+    Log-scale latency histogram with four buckets per power of two, from 10 us up to about 90 s.
+    Recording a value is a logarithm and a list increment, cheap enough for every RPC.
+    """
+
+    MIN_LATENCY = 1e-5
+    BUCKETS_PER_OCTAVE = 4
+    SIZE = 94
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.SIZE
+
+    def add(self, seconds: float):
+        """
+        Records a latency.
+
+        Args:
+            seconds (float): The latency to record.
+        """
+        if seconds <= self.MIN_LATENCY:
+            index = 0
+        else:
+            index = min(self.SIZE - 1, 1 + int(math.log2(seconds / self.MIN_LATENCY) * self.BUCKETS_PER_OCTAVE))
+        self.counts[index] += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Returns an upper bound of the given percentile of the recorded latencies.
+
+        Args:
+            p (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The upper bound, in seconds, of the bucket holding the percentile.
+        """
+        total = sum(self.counts)
+        if total == 0:
+            return 0.0
+        rank = math.ceil(total * p / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.MIN_LATENCY * 2 ** (index / self.BUCKETS_PER_OCTAVE)
+        return self.MIN_LATENCY * 2 ** ((self.SIZE - 1) / self.BUCKETS_PER_OCTAVE)
+
+
+class RpcCounters:
+    """
+    Counters kept for the RPCs of a single operation code.
+
+    Attributes:
+        count (int): Number of requests completed.
+        errors (int): Number of requests that failed.
+        bytes_in (int): Bytes received for the operation.
+        bytes_out (int): Bytes sent for the operation.
+        total_latency (float): Accumulated seconds spent on the requests.
+        max_latency (float): Slowest request observed, in seconds.
+        histogram (LatencyHistogram): Distribution of the latencies.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.histogram = LatencyHistogram()
+
+    def record(self, seconds: float, bytes_in: int, bytes_out: int, error: bool):
+        """
+        Records a completed request. Must be called holding the owner's lock.
+        """
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.total_latency += seconds
+        self.max_latency = max(self.max_latency, seconds)
+        self.histogram.add(seconds)
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Returns a plain dictionary with the counters, the average and the latency percentiles.
+        """
+        done = self.count or 1
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'avg_latency_ms': round(self.total_latency * 1000 / done, 3),
+            'p50_ms': round(self.histogram.percentile(50) * 1000, 3),
+            'p95_ms': round(self.histogram.percentile(95) * 1000, 3),
+            'p99_ms': round(self.histogram.percentile(99) * 1000, 3),
+            'max_latency_ms': round(self.max_latency * 1000, 3),
+        }
+
+
+class OpCounters(RpcCounters):
+    """
+    Counters kept by the server for a single operation code, adding the worker queue.
+
+    Attributes:
+        queued (int): Number of requests currently waiting for a worker.
+        active (int): Number of requests currently being handled.
+        max_queued (int): Highest queue depth observed.
+        total_wait (float): Accumulated seconds spent waiting in the queue.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.queued = 0
+        self.active = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        Returns a plain dictionary with the counters, including the queue ones.
+        """
+        result = super().to_dict()
+        result.update({
+            'queued': self.queued,
+            'active': self.active,
+            'max_queued': self.max_queued,
+            'avg_wait_ms': round(self.total_wait * 1000 / (self.count or 1), 3),
+        })
+        return result
+
+
+class RpcMetrics:
+    """
+    Thread-safe per-operation RPC metrics, as seen by the client side.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.ops: Dict[int, RpcCounters] = {}
+
+    def record(self, op: int, seconds: float, bytes_in: int = 0, bytes_out: int = 0, error: bool = False):
+        """
+        Records a completed request.
+
+        Args:
+            op (int): The operation code.
+            seconds (float): How long the request took.
+            bytes_in (int): Bytes received in the response.
+            bytes_out (int): Bytes sent in the request.
+            error (bool): Whether the request failed.
+        """
+        with self.lock:
+            counters = self.ops.get(op)
+            if counters is None:
+                counters = self.ops[op] = RpcCounters()
+            counters.record(seconds, bytes_in, bytes_out, error)
+
+    def snapshot(self) -> Dict[int, Dict[str, float]]:
+        """
+        Returns a copy of the metrics of every operation seen so far.
+        """
+        with self.lock:
+            return {op: counters.to_dict() for op, counters in self.ops.items()}
+
+
+class ServerStats:
+    """
+    Thread-safe per-operation queue depth, latency and traffic counters for the Chord server.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.ops: Dict[int, OpCounters] = {}
+
+    def _counters(self, op: int) -> OpCounters:
+        counters = self.ops.get(op)
+        if counters is None:
+            counters = self.ops[op] = OpCounters()
+        return counters
+
+    def enqueue(self, op: int) -> float:
+        """
+        Records that a request for `op` was queued for a worker.
+
+        Args:
+            op (int): The operation code.
+
+        Returns:
+            float: The monotonic time at which the request was queued.
+        """
+        with self.lock:
+            counters = self._counters(op)
+            counters.queued += 1
+            counters.max_queued = max(counters.max_queued, counters.queued)
+        return time.monotonic()
+
+    def start(self, op: int, enqueued_at: float) -> float:
+        """
+        Records that a worker picked up a queued request.
+
+        Args:
+            op (int): The operation code.
+            enqueued_at (float): The value returned by `enqueue`.
+
+        Returns:
+            float: The monotonic time at which handling started.
+        """
+        now = time.monotonic()
+        with self.lock:
+            counters = self._counters(op)
+            counters.queued -= 1
+            counters.active += 1
+            counters.total_wait += now - enqueued_at
+        return now
+
+    def finish(self, op: int, started_at: float, error: bool = False, bytes_in: int = 0, bytes_out: int = 0):
+        """
+        Records the completion of a request.
+
+        Args:
+            op (int): The operation code.
+            started_at (float): The value returned by `start`.
+            error (bool): Whether the handler failed.
+            bytes_in (int): Size of the request.
+            bytes_out (int): Size of the response.
+        """
+        elapsed = time.monotonic() - started_at
+        with self.lock:
+            counters = self._counters(op)
+            counters.active -= 1
+            counters.record(elapsed, bytes_in, bytes_out, error)
+
+    def snapshot(self) -> Dict[int, Dict[str, float]]:
+        """
+        Returns a copy of the counters of every operation seen so far.
+        """
+        with self.lock:
+            return {op: counters.to_dict() for op, counters in self.ops.items()}
+
+
+class CompressionStats:
+    """
+    Thread-safe per-operation counters of the bytes sent before and after compression.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.ops: Dict[int, Dict[str, int]] = {}
+
+    def record(self, op: int, raw: int, wire: int):
+        """
+        Records a message sent on a connection that negotiated compression.
+
+        Args:
+            op (int): The operation code.
+            raw (int): Size of the fields section before compression.
+            wire (int): Size of the fields section as sent.
+        """
+        with self.lock:
+            counters = self.ops.get(op)
+            if counters is None:
+                counters = self.ops[op] = {'messages': 0, 'compressed': 0, 'raw_bytes': 0, 'wire_bytes': 0}
+            counters['messages'] += 1
+            counters['compressed'] += 1 if wire < raw else 0
+            counters['raw_bytes'] += raw
+            counters['wire_bytes'] += wire
+
+    def snapshot(self) -> Dict[int, Dict[str, int]]:
+        """
+        Returns a copy of the counters of every operation seen so far.
+        """
+        with self.lock:
+            return {op: dict(counters) for op, counters in self.ops.items()}
+
+
+class PathStats:
+    """
+    Thread-safe counters of the requests served in-process because this node owned the key,
+    against the ones sent to another node.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, local: bool):
+        """
+        Records a request.
+
+        Args:
+            name (str): The kind of request, such as 'get' or 'replicate'.
+            local (bool): Whether it was served in-process.
+        """
+        with self.lock:
+            counters = self.counters.get(name)
+            if counters is None:
+                counters = self.counters[name] = {'local': 0, 'remote': 0}
+            counters['local' if local else 'remote'] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns a copy of the counters of every kind of request, with the share served in-process.
+        """
+        with self.lock:
+            return {
+                name: dict(counters, local_share=round(counters['local'] / ((counters['local'] + counters['remote']) or 1), 3))
+                for name, counters in self.counters.items()
+            }
+
+
+class TransferStats:
+    """
+    Thread-safe counters of the keys and bytes moved by every kind of data transfer, against
+    the keys stored when each transfer ran, to see how much of the storage a membership change moves.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self.last: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, keys: int, bytes: int, stored: int):
+        """
+        Records a transfer.
+
+        Args:
+            name (str): The kind of transfer, such as 'handoff' or 'replica_sync'.
+            keys (int): Keys sent.
+            bytes (int): Bytes of the data sent.
+            stored (int): Keys stored by this node when the transfer ran.
+        """
+        with self.lock:
+            counters = self.counters.get(name)
+            if counters is None:
+                counters = self.counters[name] = {'events': 0, 'keys': 0, 'bytes': 0, 'stored': 0}
+            counters['events'] += 1
+            counters['keys'] += keys
+            counters['bytes'] += bytes
+            counters['stored'] += stored
+            self.last[name] = {'keys': keys, 'bytes': bytes, 'stored': stored}
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """
+        Returns a copy of the counters of every kind of transfer, with the share of the stored
+        keys moved and the figures of the last transfer.
+        """
+        with self.lock:
+            return {
+                name: dict(counters, moved_share=round(counters['keys'] / (counters['stored'] or 1), 3), last=dict(self.last[name]))
+                for name, counters in self.counters.items()
+            }
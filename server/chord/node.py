@@ -1,7 +1,10 @@
+import json
 import logging
 import threading
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from chord.utils import decode_dict, getShaRepr, is_in_interval, send_message, recv_message
 from chord.node_ref import NodeRef
@@ -12,11 +15,18 @@ from chord.storage import Data
 from chord.elector import Elector
 from chord.discoverer import Discoverer
 from chord.replicator import Replicator
+from chord.reader import HedgedReader
+from chord.scheduler import AdaptiveInterval
+from chord.membership import Membership
+from chord.metrics import PathStats, ServerStats
+from chord.health import health
+from chord.transport import metrics as client_metrics, peer_timeouts, stats as transport_stats, thread_rpcs
+from chord.deadline import DeadlineExceeded, bind, check, deadline_scope
+from chord.protocol import compression_stats, CAP_ZLIB, CAPABILITIES, LEGACY_VERSION, PROTOCOL_VERSION, decode_legacy, decode_message, encode_message, encode_response, is_binary, read_budget, text
 from chord.constants import *
-from config import SEPARATOR
 
 class Node:
-    def __init__(self, ip: str, port: int = 8001, m: int = 160, c: int = 3):
+    def __init__(self, ip: str, port: int = 8001, m: int = 160, c: int = 3, pool_size: int = SERVER_POOL_SIZE, weight: float = NODE_WEIGHT):
         """
         Initializes a new Chord node with given parameters.
 
@@ -25,11 +35,14 @@ class Node:
             port (int): The port the node will listen on.
             m (int): The number of bits for the ID space.
             c (int): The number of successors and predecessors to maintain.
+            pool_size (int): The number of worker threads serving the fast incoming requests.
+            weight (float): The capacity of the node relative to the others, which scales its number of virtual nodes
+                when the ring runs them.
         """
-        self.id = getShaRepr(ip)
         self.ip = ip
         self.port = port
         self.ref = NodeRef(self.ip, self.port)
+        self.id = self.ref.id
         self.c = c
 
         # Successor and predecessor lists with locking mechanisms for thread safety
@@ -41,6 +54,23 @@ class Node:
 
         self.shutdown_event = threading.Event()
 
+        # Worker pools serving incoming requests, with per-operation queue and latency counters. The
+        # operations in LONG_OPS, which wait on other nodes, get their own workers: a node full of
+        # them still answers the fast operations they end up calling, here or on its neighbours
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='chord-worker')
+        self.long_executor = ThreadPoolExecutor(max_workers=SERVER_LONG_POOL_SIZE, thread_name_prefix='chord-long')
+        self.server_stats = ServerStats()
+        self.path_stats = PathStats()  # Requests served in-process because this node owns the key
+
+        # Intervals of the maintenance loops, shortened on topology changes and stretched while the ring is stable
+        self.schedules = {
+            'stabilize': AdaptiveInterval(STABILIZE_FREQ),
+            'check_predecessor': AdaptiveInterval(CHECK_PREDECESSOR_FREQ),
+            'check_successor': AdaptiveInterval(CHECK_SUCCESSOR_FREQ),
+            'fix_successors': AdaptiveInterval(FIX_SUCCESSORS_FREQ),
+            'fix_fingers': AdaptiveInterval(FIX_FINGERS_FREQ),
+        }
+
         threading.Thread(target=self.start_server, daemon=True).start()
 
         self.finger = FingerTable(self, m)
@@ -48,6 +78,8 @@ class Node:
         self.elector = Elector(self, self.timer)
         self.discoverer = Discoverer(self, self.succ_lock, self.pred_lock, self.elector, self.finger)
         self.replicator = Replicator(self, self.timer)
+        self.reader = HedgedReader(self)
+        self.membership = Membership(self, max(1, round(VIRTUAL_NODES * weight)) if VIRTUAL_NODES > 1 else 1)
 
         time.sleep(CHORD_THREADS_GENERAL_DELAY)
         
@@ -64,77 +96,121 @@ class Node:
         threading.Thread(target=self.elector.check_for_election, daemon=True).start()
         threading.Thread(target=self.discoverer.listen_for_announcements, daemon=True).start()
         threading.Thread(target=self.replicator.fix_storage, daemon=True).start()
+        threading.Thread(target=self.replicator.snapshot_periodically, daemon=True).start()
+        threading.Thread(target=self.dump_metrics, daemon=True).start()
         
         time.sleep(FIRST_DISCOVER_AND_JOIN_DELAY)
         threading.Thread(target=self.discoverer.discover_and_join, daemon=True).start()
         
-    def get_key(self, key: str) -> str:
+    def get_key(self, key: str, timeout: Optional[float] = None) -> str:
         """
-        Retrieves the value associated with a given key from the successor node.
+        Retrieves the value associated with a given key from the successor node,
+        hedging with a replica when the successor is slow or down.
         
         Parameters:
         - key (str): The key to retrieve.
+        - timeout (float): Seconds the whole lookup may take; by default the deadline of the caller, if any.
 
         Returns:
         - str: The value associated with the key.
+
+        Raises:
+        - DeadlineExceeded: If the lookup ran out of time.
         """
         logging.info(f'Recuperar llave: {key}')
         
         key_hash = getShaRepr(key)
-        with self.succ_lock:
-            succ = self.finger.find_successor(key_hash)
-        data = succ.retrieve_key(key)
+        with deadline_scope(timeout):
+            with self.succ_lock:
+                succ = self.finger.find_successor(key_hash, use_cache=True)
+            check(f'recuperar la llave {key}')
+            local = succ.id == self.id
+            self.path_stats.record('get', local)
+            data = self.replicator.get(key) if local else self.reader.read(succ, key)
+            if data is None:
+                self.finger.cache.invalidate_owner(succ)
+                data = Data('', 0)
+            if not data.value:
+                # A lookup that ran out of time must not be mistaken for a missing key
+                check(f'recuperar la llave {key}')
         
         logging.info(f'Llave {key} recuperada del sucesor {succ.id}')
         return data.value
 
-    def set_key(self, key: str, value: str) -> bool:
+    def set_key(self, key: str, value: str, timeout: Optional[float] = None) -> bool:
         """
         Sets the value for a given key on the successor node.
         
         Parameters:
         - key (str): The key to set.
         - value (str): The value to associate with the key.
+        - timeout (float): Seconds the whole operation may take; by default the deadline of the caller, if any.
 
         Returns:
         - bool: True if the key was successfully set, False otherwise.
+
+        Raises:
+        - DeadlineExceeded: If the lookup ran out of time.
         """
         logging.info(f'Fijando llave: {key} con valor: {value}')
         
         key_hash = getShaRepr(key)
-        with self.succ_lock:
-            succ = self.finger.find_successor(key_hash)
+        with deadline_scope(timeout):
+            with self.succ_lock:
+                succ = self.finger.find_successor(key_hash, use_cache=True)
 
-        with self.timer.time_lock:
-            time = self.timer.time_counter
+            with self.timer.time_lock:
+                time = self.timer.time_counter
 
-        # Store key with the timestamp and replicate if necessary
-        response = succ.store_key(key, value, time, True)
+            # Store key with the timestamp and replicate if necessary
+            check(f'fijar la llave {key}')
+            if succ.id == self.id:
+                # This node owns the key, store it without a round trip to itself
+                self.path_stats.record('set', True)
+                response = self.replicator.set(key, Data(value, time), True) == TRUE
+            else:
+                self.path_stats.record('set', False)
+                response = succ.store_key(key, value, time, True)
+            if not response:
+                self.finger.cache.invalidate_owner(succ)
 
         logging.info(f'Llave {key} fijada exitosamente en sucesor {succ.id}')
         return response
 
-    def remove_key(self, key: str) -> bool:
+    def remove_key(self, key: str, timeout: Optional[float] = None) -> bool:
         """
         Removes the given key from the successor node.
         
         Parameters:
         - key (str): The key to remove.
+        - timeout (float): Seconds the whole operation may take; by default the deadline of the caller, if any.
 
         Returns:
         - bool: True if the key was successfully removed, False otherwise.
+
+        Raises:
+        - DeadlineExceeded: If the lookup ran out of time.
         """
         logging.info(f'Eliminando llave: {key}')
         
         key_hash = getShaRepr(key)
-        with self.succ_lock:
-            succ = self.finger.find_successor(key_hash)
+        with deadline_scope(timeout):
+            with self.succ_lock:
+                succ = self.finger.find_successor(key_hash, use_cache=True)
 
-        with self.timer.time_lock:
-            time = self.timer.time_counter
+            with self.timer.time_lock:
+                time = self.timer.time_counter
 
-        # Delete key with the timestamp and replicate if necessary
-        response = succ.delete_key(key, time, True)
+            # Delete key with the timestamp and replicate if necessary
+            check(f'eliminar la llave {key}')
+            if succ.id == self.id:
+                self.path_stats.record('remove', True)
+                response = self.replicator.remove(key, time, True) == TRUE
+            else:
+                self.path_stats.record('remove', False)
+                response = succ.delete_key(key, time, True)
+            if not response:
+                self.finger.cache.invalidate_owner(succ)
 
         logging.info(f'Llave {key} eliminada exitosamente del sucesor {succ.id}')
         return response
@@ -145,6 +221,8 @@ class Node:
         Ensures that the successor is properly linked and updates the predecessor list if needed.
         """
         while not self.shutdown_event.is_set():
+            rpcs = thread_rpcs()
+            changed = False
             try:
                 logging.info('Estabilizando nodo')
 
@@ -157,6 +235,9 @@ class Node:
                     logging.info(f'Notificando a predecesor {succ_pred}')
                     with self.succ_lock:
                         self.successors.set(0, succ_pred)
+                    self.finger.cache.invalidate_id(succ_pred.id)
+                    changed = True
+                    self.topology_changed('fix_successors', 'fix_fingers')
                     if succ_pred.id != self.id:
                         succ_pred.notify(self.ref)
                         self.replicator.replicate_all_data(succ_pred)
@@ -164,6 +245,10 @@ class Node:
                 # Notify successor
                 if succ.id != self.id:
                     succ.notify(self.ref)
+
+                # Spread the membership table along with the stabilize traffic
+                if self.membership.active:
+                    self.membership.gossip()
                 
                 logging.info('Nodo estabilizado')
 
@@ -177,7 +262,7 @@ class Node:
                 succ = self.successors.get(0)
             logging.info(f"Predecesor: {pred}, Sucesor: {succ}")
 
-            time.sleep(STABILIZE_FREQ)
+            self.end_round('stabilize', changed, rpcs)
 
     def notify(self, node: NodeRef) -> int:
         """
@@ -190,12 +275,15 @@ class Node:
             pred = self.predecessors.get(0)
             if pred.id == self.id or is_in_interval(node.id, pred.id, self.id):
                 logging.info(f'Notificación del nodo {node.id}')
+                self.finger.cache.invalidate_id(node.id)
                 with self.pred_lock:
                     if pred.id == self.id:
                         self.predecessors.erase(0)
                     self.predecessors.set(0, node)
 
                 self.replicator.handle_new_predecessor()
+                self.membership.add(node)
+                self.topology_changed('check_predecessor', 'fix_fingers')
                 return TRUE
             else:
                 logging.info(f'Nnguna actualización requerida para nodo {node.id}')
@@ -206,7 +294,9 @@ class Node:
         Periodically checks if the predecessor node is alive.
         If the predecessor is dead, it is removed from the list of predecessors.
         """
-        while True:
+        while not self.shutdown_event.is_set():
+            rpcs = thread_rpcs()
+            changed = False
             try:
                 with self.pred_lock:
                     pred = self.predecessors.get(0)
@@ -215,6 +305,8 @@ class Node:
                     ok = pred.ping()
                     if not ok:
                         logging.info(f'Predecesor {pred.id} ha fallado')
+                        self.membership.remove(pred)
+                        changed = True
                         with self.pred_lock:
                             preds_len = len(self.predecessors)
                             if preds_len == 1:
@@ -224,14 +316,16 @@ class Node:
                                 self.predecessors.erase(0)
             except Exception as e:
                 logging.error(f'Error en Hilo de revisión de predecesores: {e}')
-            time.sleep(CHECK_PREDECESSOR_FREQ)
+            self.end_round('check_predecessor', changed, rpcs)
 
     def check_successor(self):
         """
         Periodically checks if the successor node is alive.
         If the successor is dead, it is removed from the list of successors.
         """
-        while True:
+        while not self.shutdown_event.is_set():
+            rpcs = thread_rpcs()
+            changed = False
             try:
                 with self.succ_lock:
                     succ = self.successors.get(0)
@@ -240,6 +334,9 @@ class Node:
                     ok = succ.ping()
                     if not ok:
                         logging.info(f'Sucesor {succ.id} ha fallado')
+                        self.finger.cache.invalidate_owner(succ)
+                        self.membership.remove(succ)
+                        changed = True
                         with self.succ_lock:
                             succs_len = len(self.successors)
                             if succs_len == 1:
@@ -247,9 +344,10 @@ class Node:
                                 self.successors.set(0, self.ref)
                             else:
                                 self.successors.erase(0)
+                        self.topology_changed('stabilize', 'fix_successors', 'fix_fingers')
             except Exception as e:
                 logging.error(f'Error en Hilo de revisión de sucesor: {e}')
-            time.sleep(CHECK_SUCCESSOR_FREQ)
+            self.end_round('check_successor', changed, rpcs)
 
     def get_successor_and_notify(self, index, ip):
         """
@@ -349,20 +447,92 @@ class Node:
 
         next = 0
         while not self.shutdown_event.is_set():
+            rpcs = thread_rpcs()
+            changed = False
             try:
-                succ = self.successors.get(0)
-                if succ.id == self.id:
-                    continue
-                next = self.fix_successor(next)
+                with self.succ_lock:
+                    before = [succ.id for succ in self.successors.list]
+                # Alone in the ring there is nothing to fix, just wait for the next round
+                if self.successors.get(0).id != self.id:
+                    next = self.fix_successor(next)
+                with self.succ_lock:
+                    changed = before != [succ.id for succ in self.successors.list]
             except Exception as e:
                 logging.error(f'Error en Hilo de Arreglo de sucesores: {e}')
-            time.sleep(FIX_SUCCESSORS_FREQ)
+            self.end_round('fix_successors', changed, rpcs)
+
+    def topology_changed(self, *names: str):
+        """
+        Wakes the given maintenance loops at their shortest interval after a change in the ring,
+        and shortens the life of the cached owners, which the change may have moved.
+
+        Args:
+            names (str): The names of the loops in self.schedules.
+        """
+        self.finger.cache.shorten()
+        for name in names:
+            self.schedules[name].changed()
+
+    def end_round(self, name: str, changed: bool, rpcs: int):
+        """
+        Records a finished round of a maintenance loop and waits until its next one.
+
+        Args:
+            name (str): The name of the loop in self.schedules.
+            changed (bool): Whether the round found the topology changed.
+            rpcs (int): The RPC count of the thread when the round started.
+        """
+        schedule = self.schedules[name]
+        schedule.record_round(thread_rpcs() - rpcs)
+        if changed:
+            self.finger.cache.shorten()
+            schedule.changed(wake=False)
+        else:
+            schedule.unchanged()
+        schedule.wait()
+
+    def metrics_snapshot(self) -> dict:
+        """
+        Collects the metrics of the node: server side per-operation counters and latency
+        percentiles, client side RPC metrics, connection reuse and compression savings.
+
+        Returns:
+            dict: The metrics, ready to be encoded as JSON.
+        """
+        return {
+            'server': self.server_stats.snapshot(),
+            'client': client_metrics.snapshot(),
+            'transport': transport_stats.snapshot(),
+            'compression': compression_stats.snapshot(),
+            'timeouts': peer_timeouts(),
+            'health': health.snapshot(),
+            'reads': self.reader.snapshot(),
+            'location_cache': self.finger.cache.snapshot(),
+            'lookups': self.finger.snapshot(),
+            'membership': self.membership.snapshot(),
+            'keys': self.replicator.key_counts(),
+            'paths': self.path_stats.snapshot(),
+            'transfers': self.replicator.transfers.snapshot(),
+            'maintenance': {name: schedule.snapshot() for name, schedule in self.schedules.items()},
+        }
+
+    def dump_metrics(self):
+        """
+        Periodically writes the node metrics to the log.
+        """
+        while not self.shutdown_event.is_set():
+            time.sleep(METRICS_DUMP_FREQ)
+            try:
+                logging.info(f'Métricas: {json.dumps(self.metrics_snapshot())}')
+            except Exception as e:
+                logging.error(f'Error en Hilo de volcado de métricas: {e}')
 
     def start_server(self):
         """
         Starts the main server thread to handle incoming client requests.
         
-        The server listens for connections and processes different types of operations.
+        The server listens for connections and hands every request to a worker pool,
+        so slow operations (partitions, elections) do not block lookups and pings.
         Operations include key retrieval, key storage, election, and more.
         """
         logging.info('Iniciando Hilo Principal del servidor y escuchando a conexiones...')
@@ -370,86 +540,255 @@ class Node:
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind((self.ip, self.port))
-            s.listen(10)
+            s.listen(SERVER_BACKLOG)
 
             while True:
                 try:
                     conn, addr = s.accept()
                     logging.info(f'Nueva conexión de {addr}')
+                    threading.Thread(target=self.serve_connection, args=(conn, addr), daemon=True).start()
+                except Exception as e:
+                    logging.error(f'Error en Hilo Principal del servidor: {e}')
 
-                    # Receive the whole message
-                    raw_data = recv_message(conn)
-                    data = raw_data.decode('utf-8').split(SEPARATOR)
-
-                    option = int(data[0])
-                    logging.info(f'Operación {option} recibida de {addr}')
-                    
-                    data_response = None
-                    server_response = ''
-
-                    # Handling various operations based on option value
-                    if option == FIND_ID_PREDECESSOR:
-                        id = int(data[1])
-                        pred = self.finger.find_predecessor(id)
-                        data_response = pred if pred else self.ref
-                    elif option == FIND_ID_SUCCESSOR:
-                        id = int(data[1])
-                        data_response = self.finger.find_successor(id)
-                    elif option == GET_PREDECESSOR:
-                        pred = self.predecessors.get(0)
-                        data_response = pred if pred else self.ref
-                    elif option == GET_SUCCESSOR:
-                        succ = self.successors.get(0)
-                        data_response = succ if succ else self.ref
-                    elif option == CLOSEST_PRECEDING_FINGER:
-                        id = int(data[1])
-                        data_response = self.finger.closest_preceding_finger(id)
-                    elif option == NOTIFY:
-                        ip, port = data[1], int(data[2])
-                        self.notify(NodeRef(ip, port))
-                    elif option == GET_SUCCESSOR_AND_NOTIFY:
-                        index, ip = int(data[1]), data[2]
-                        data_response = self.get_successor_and_notify(index, ip)
-                    elif option == PING:
-                        server_response = ALIVE
-                    elif option == PING_LEADER:
-                        id, time = int(data[1]), int(data[2])
-                        server_response = self.elector.ping_leader(id, time)
-                    elif option == ELECTION:
-                        id, ip, port = int(data[1]), data[2], int(data[3])
-                        server_response = self.elector.election(id, ip, port)
-                    elif option == SET_PARTITION:
-                        dict = decode_dict(data[1])
-                        version = decode_dict(data[2])
-                        removed_dict = decode_dict(data[3])
-                        server_response = self.replicator.set_partition(dict, version, removed_dict)
-                    elif option == RESOLVE_DATA:
-                        dict = decode_dict(data[1])
-                        version = decode_dict(data[2])
-                        removed_dict = decode_dict(data[3])
-                        server_response = self.replicator.resolve_data(dict, version, removed_dict)
-                    elif option == RETRIEVE_KEY:
-                        key = data[1]
-                        server_response = self.replicator.get(key)
-                    elif option == STORE_KEY:
-                        key = data[1]
-                        value, version = data[2], int(data[3])
-                        rep = True if int(data[4]) == TRUE else False
-                        server_response = self.replicator.set(key, Data(value, version), rep)
-                    elif option == DELETE_KEY:
-                        key, time = data[1], data[2]
-                        rep = True if int(data[3]) == TRUE else False
-                        server_response = self.replicator.remove(key, time, rep)
-                        
-                    # Prepare the response to send to the client
-                    if data_response:
-                        response = f'{data_response.id}{SEPARATOR}{data_response.ip}'.encode('utf-8')
-                    else:
-                        response = f'{server_response}'.encode('utf-8')
+    def serve_connection(self, conn: socket.socket, addr):
+        """
+        Reads the requests sent through an accepted connection and queues them in a worker pool.
+        The connection stays open, so a peer can reuse it and keep several requests in flight.
 
-                    logging.info(f'Enviando respuesta: {response}')
-                    send_message(conn, response)
-                    conn.close()
+        Every message is answered in the protocol it was sent with, so peers still speaking
+        the legacy text protocol keep working next to the ones using the binary protocol.
 
+        Args:
+            conn (socket.socket): The accepted connection.
+            addr: The address of the remote peer.
+        """
+        send_lock = threading.Lock()
+        compress = False  # Negotiated in the HELLO handshake
+        conn.settimeout(SERVER_IDLE_TIMEOUT)
+        try:
+            while not self.shutdown_event.is_set():
+                # Receive the whole message
+                request_id, raw_data = recv_message(conn)
+                try:
+                    if is_binary(raw_data):
+                        version, option, _, fields = decode_message(raw_data)
+                        version = min(version, PROTOCOL_VERSION)
+                        budget = read_budget(raw_data)
+                        # The sub-operations of a batch are binary messages themselves
+                        data = fields if option == BATCH else [text(field) for field in fields]
+                    else:
+                        version = LEGACY_VERSION
+                        budget = None
+                        option, data = decode_legacy(raw_data)
                 except Exception as e:
-                    logging.error(f'Error en Hilo Principal del servidor: {e}')
\ No newline at end of file
+                    logging.error(f'Petición mal formada de {addr}: {e}')
+                    with send_lock:
+                        send_message(conn, b'', request_id)
+                    continue
+                logging.info(f'Operación {option} recibida de {addr}')
+
+                if option == GET_STATS and addr[0] not in ('127.0.0.1', self.ip):
+                    logging.warning(f'Operación de administración rechazada desde {addr}')
+                    with send_lock:
+                        send_message(conn, encode_response([], version, option), request_id)
+                    continue
+
+                if option == HELLO:
+                    # Handshake: answer with the highest version and the capabilities both sides support.
+                    # The HELLO arrives as a text frame, but only peers that speak binary send it
+                    capabilities = (int(data[1]) if len(data) > 1 else 0) & CAPABILITIES
+                    compress = bool(capabilities & CAP_ZLIB)
+                    response = encode_message(option, [min(int(data[0]), PROTOCOL_VERSION), capabilities])
+                    with send_lock:
+                        send_message(conn, response, request_id)
+                    continue
+
+                enqueued_at = self.server_stats.enqueue(option)
+                # A store or removal waits on the replicas only when it is the one replicating
+                replicates = option in (STORE_KEY, DELETE_KEY) and data and data[-1] == str(TRUE)
+                executor = self.long_executor if option in LONG_OPS or replicates else self.executor
+                executor.submit(self.handle_request, conn, send_lock, request_id, version, compress, option, data, len(raw_data), budget, enqueued_at)
+        except (ConnectionError, socket.timeout):
+            logging.debug(f'Conexión con {addr} cerrada')
+        except Exception as e:
+            logging.error(f'Error leyendo peticiones de {addr}: {e}')
+        finally:
+            conn.close()
+
+    def handle_request(self, conn: socket.socket, send_lock: threading.Lock, request_id: Optional[int], version: int, compress: bool, option: int, data: List[str], size: int, budget: Optional[float], enqueued_at: float):
+        """
+        Worker pool task: runs the requested operation and sends the response back.
+
+        Args:
+            conn (socket.socket): The connection the request came from.
+            send_lock (threading.Lock): Lock serializing the responses written to the connection.
+            request_id (int): The id the client tagged the request with, or None if it was sent
+                untagged, as peers without multiplexing do; the response is tagged the same way.
+            version (int): The protocol version the request was sent with.
+            compress (bool): Whether the connection negotiated compression.
+            option (int): The operation code.
+            data (List[str]): The request fields.
+            size (int): Size of the request in bytes.
+            budget (float): Seconds the client gave to answer, counted from when the request was queued.
+                Calls made while handling the request inherit what is left of it.
+            enqueued_at (float): The time the request was queued, used for the queue counters.
+        """
+        started_at = self.server_stats.start(option, enqueued_at)
+        left = None if budget is None else budget - (started_at - enqueued_at)
+        error = False
+        try:
+            if left is not None and left <= 0:
+                # The client already gave up waiting, the answer would be discarded
+                raise DeadlineExceeded(f'Plazo agotado en cola tras {started_at - enqueued_at:.3f}s')
+            with deadline_scope(left):
+                fields = self.handle_operation(option, data)
+        except Exception as e:
+            error = True
+            fields = []
+            logging.error(f'Error procesando operación {option}: {e}')
+
+        response = encode_response(fields, version, option, compress)
+        self.server_stats.finish(option, started_at, error, size, len(response))
+
+        try:
+            logging.info(f'Enviando respuesta: {fields}')
+            with send_lock:
+                send_message(conn, response, request_id)
+        except OSError as e:
+            logging.error(f'Error enviando respuesta de operación {option}: {e}')
+
+    def handle_batched(self, message: bytes) -> bytes:
+        """
+        Executes one of the sub-operations carried by a BATCH request.
+
+        Args:
+            message (bytes): The binary encoded sub-operation.
+
+        Returns:
+            bytes: The binary encoded response of the sub-operation; it has no fields if it failed.
+        """
+        _, option, _, fields = decode_message(message)
+        if option in (HELLO, BATCH):
+            logging.error(f'Operación {option} no permitida dentro de un lote')
+            return encode_message(0, [])
+
+        started_at = self.server_stats.start(option, self.server_stats.enqueue(option))
+        error = False
+        try:
+            response = self.handle_operation(option, [text(field) for field in fields])
+        except Exception as e:
+            error = True
+            response = []
+            logging.error(f'Error procesando operación {option} del lote: {e}')
+
+        encoded = encode_message(option, response)
+        self.server_stats.finish(option, started_at, error, len(message), len(encoded))
+        return encoded
+
+    def handle_operation(self, option: int, data: List[str]) -> List[str]:
+        """
+        Executes a single operation and builds the fields of its response.
+
+        Args:
+            option (int): The operation code.
+            data (List[str]): The request fields.
+
+        Returns:
+            List[str]: The response fields to send to the client.
+        """
+        data_response = None
+        server_response = []
+
+        # Handling various operations based on option value
+        if option == FIND_ID_PREDECESSOR:
+            id = int(data[0])
+            pred = self.finger.find_predecessor(id)
+            data_response = pred if pred else self.ref
+        elif option == FIND_ID_SUCCESSOR:
+            id = int(data[0])
+            data_response = self.finger.find_successor(id, physical=True)
+        elif option == GET_PREDECESSOR:
+            pred = self.predecessors.get(0)
+            data_response = pred if pred else self.ref
+        elif option == GET_SUCCESSOR:
+            succ = self.successors.get(0)
+            data_response = succ if succ else self.ref
+        elif option == CLOSEST_PRECEDING_FINGER:
+            id = int(data[0])
+            data_response = self.finger.closest_preceding_finger(id)
+        elif option == NOTIFY:
+            ip, port = data[0], int(data[1])
+            self.notify(NodeRef(ip, port))
+        elif option == GET_SUCCESSOR_AND_NOTIFY:
+            index, ip = int(data[0]), data[1]
+            data_response = self.get_successor_and_notify(index, ip)
+        elif option == PING:
+            server_response = [ALIVE]
+        elif option == PING_LEADER:
+            id, time = int(data[0]), int(data[1])
+            server_response = [self.elector.ping_leader(id, time)]
+        elif option == ELECTION:
+            id, ip, port = int(data[0]), data[1], int(data[2])
+            leader = self.elector.election(id, ip, port)
+            server_response = [leader.ip, leader.port] if leader else []
+        elif option == SET_PARTITION:
+            dict = decode_dict(data[0])
+            version = decode_dict(data[1])
+            removed_dict = decode_dict(data[2])
+            server_response = [self.replicator.set_partition(dict, version, removed_dict)]
+        elif option == RESOLVE_DATA:
+            dict = decode_dict(data[0])
+            version = decode_dict(data[1])
+            removed_dict = decode_dict(data[2])
+            server_response = self.replicator.resolve_data(dict, version, removed_dict)
+        elif option == RETRIEVE_KEY:
+            key = data[0]
+            value = self.replicator.get(key)
+            server_response = [value.value, value.version]
+        elif option == STORE_KEY:
+            key = data[0]
+            value, version = data[1], int(data[2])
+            rep = True if int(data[3]) == TRUE else False
+            server_response = [self.replicator.set(key, Data(value, version), rep)]
+        elif option == DELETE_KEY:
+            key, time = data[0], int(data[1])
+            rep = True if int(data[2]) == TRUE else False
+            server_response = [self.replicator.remove(key, time, rep)]
+        elif option in (PARTITION_CHUNK, RESOLVE_CHUNK):
+            transfer_id, seq = data[0], int(data[1])
+            dict = decode_dict(data[2])
+            version = decode_dict(data[3])
+            removed_dict = decode_dict(data[4])
+            if option == PARTITION_CHUNK:
+                server_response = [self.replicator.receive_partition_chunk(transfer_id, seq, dict, version, removed_dict)]
+            else:
+                server_response = self.replicator.receive_resolve_chunk(transfer_id, seq, dict, version, removed_dict)
+        elif option == TRANSFER_STATUS:
+            server_response = [self.replicator.streamer.acked(data[0])]
+        elif option == LOOKUP_STEP:
+            done, node = self.finger.lookup_step(int(data[0]))
+            server_response = [TRUE if done else FALSE, node.ip, node.port]
+        elif option == FIND_RECURSIVE:
+            id, query_id, ip, port = int(data[0]), data[1], data[2], int(data[3])
+            self.long_executor.submit(bind(self.finger.route_recursive), id, query_id, ip, port)
+            server_response = [TRUE]
+        elif option == LOOKUP_REPLY:
+            query_id, owner, start = data[0], NodeRef(data[1], int(data[2])), int(data[3])
+            server_response = [self.finger.resolve_lookup(query_id, owner, start)]
+        elif option == GET_FINGERS:
+            nodes = [self.ref, self.successors.get(0)] + self.finger.index[1]
+            server_response = [field for node in nodes for field in (node.ip, node.port)]
+        elif option == EXCHANGE_MEMBERS:
+            self.membership.merge(data)
+            server_response = self.membership.fields()
+        elif option == GET_SNAPSHOT:
+            server_response = self.replicator.snapshot_chunk(int(data[0]))
+        elif option == GET_STATS:
+            server_response = [json.dumps(self.metrics_snapshot())]
+        elif option == BATCH:
+            server_response = [self.handle_batched(message) for message in data]
+
+        # Prepare the response to send to the client
+        if data_response:
+            return [data_response.id, data_response.ip]
+        return server_response
@@ -1,46 +1,135 @@
 import logging
-import socket
-from typing import List, Tuple
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
 
 from chord.constants import *
-from chord.utils import getShaRepr, send_message, recv_message
+from chord.utils import decode_dict, getShaRepr
+from chord.transport import ConnectionPool, get_pool
 from chord.storage import Data
-from config import PORT, SEPARATOR
+from config import PORT
+
+
+class NoResponse(ConnectionError):
+    """
+    Raised when a node gives no usable answer to an operation whose result is needed.
+    """
+
 
 class NodeRef:
-    def __init__(self, ip: str, port: int = PORT):
+    # Process-wide table of references by address, so every response naming a known peer reuses its object
+    refs: Dict[Tuple[str, int], 'NodeRef'] = {}
+    refs_lock = threading.Lock()
+
+    def __new__(cls, ip: str, port: int = PORT) -> 'NodeRef':
         """
-        Initializes a reference to a Chord node.
+        Returns the reference to a Chord node, creating it the first time its address is seen.
+        The id is hashed only then, and the same object is shared by every later lookup,
+        response and list naming that node.
 
         Args:
             ip (str): IP address of the node.
             port (int): Port number of the node (default is the value from config).
         """
-        self.id = getShaRepr(ip)  # Unique identifier for the node based on its IP address
-        self.ip = ip
-        self.port = port
+        key = (ip, int(port))
+        ref = cls.refs.get(key)
+        if ref is None:
+            with cls.refs_lock:
+                ref = cls.refs.get(key)
+                if ref is None:
+                    ref = super().__new__(cls)
+                    ref.id = getShaRepr(ip)  # Unique identifier for the node based on its IP address
+                    ref.ip = ip
+                    ref.port = int(port)
+                    ref.conn_pool = None
+                    cls.refs[key] = ref
+        return ref
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """
+        The pool of connections to the referenced node, looked up once per reference.
+        """
+        if self.conn_pool is None:
+            self.conn_pool = get_pool(self.ip, self.port)
+        return self.conn_pool
 
-    def process_operation(self, op: int, data: str = None) -> bytes:
+    @property
+    def proximity(self) -> float:
+        """
+        The smoothed ping round trip time to the referenced node, or infinity if it was never pinged.
+        """
+        if self.conn_pool is None or self.conn_pool.proximity is None:
+            return float('inf')
+        return self.conn_pool.proximity
+
+    def process_operation(self, op: int, *fields) -> List[str]:
         """
         Internal method to process a requested operation in the referenced node.
+        The request travels over a pooled persistent connection to the node.
+
+        Args:
+            op (int): The operation code.
+            *fields: The fields to send with the operation.
+
+        Returns:
+            List[str]: The fields of the response, or an empty list if the operation failed.
+        """
+        try:
+            return self.pool.call(op, list(fields), RPC_TIMEOUT)
+        except Exception as e:
+            logging.error(f"Error enviando dato a {self.ip}: {e}, operación: {op}, dato: {fields}")
+            return []
+
+    def request(self, op: int, *fields, size: int = 1) -> List[str]:
+        """
+        Processes an operation whose answer is needed, checking that the node gave one.
 
         Args:
             op (int): The operation code.
-            data (str): The data to send (default is None).
+            *fields: The fields to send with the operation.
+            size (int): The least number of fields the answer must have.
+
+        Returns:
+            List[str]: The fields of the response.
+
+        Raises:
+            NoResponse: If the operation failed or the node answered with an empty or short reply.
+        """
+        response = self.process_operation(op, *fields)
+        if len(response) < size or response == [EMPTY]:
+            raise NoResponse(f'Nodo {self.ip} no respondió a la operación {op}')
+        return response
+
+    def batch(self, calls: List[Tuple[int, list]]) -> List[List[str]]:
+        """
+        Processes several operations in the referenced node with a single round trip.
+
+        Args:
+            calls (List[Tuple[int, list]]): The operation codes and the fields of each one.
 
         Returns:
-            bytes: The response received from the node.
+            List[List[str]]: The fields of each response, or an empty list per operation if the batch failed.
         """
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.settimeout(3)
-                s.connect((self.ip, int(self.port)))
-                message = f'{op}{SEPARATOR}{data}'.encode('utf-8')
-                send_message(s, message)
-                return recv_message(s)
+            return self.pool.call_batch(calls, RPC_TIMEOUT)
         except Exception as e:
-            logging.error(f"Error enviando dato a {self.ip}: {e}, operación: {op}, dato: {data}")
-            return b''
+            logging.error(f"Error enviando lote de {len(calls)} operaciones a {self.ip}: {e}")
+            return [[] for _ in calls]
+
+    def batched(self, op: int, *fields) -> Future:
+        """
+        Queues an operation to be sent to the referenced node together with the other
+        operations requested within the batching window.
+
+        Args:
+            op (int): The operation code.
+            *fields: The fields to send with the operation.
+
+        Returns:
+            Future: Resolves to the fields of the response.
+        """
+        return self.pool.batcher.submit(op, list(fields))
 
     def find_predecessor(self, id: int) -> 'NodeRef':
         """
@@ -51,8 +140,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the predecessor node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(FIND_ID_PREDECESSOR, str(id)).decode().split(SEPARATOR)
+        response = self.request(FIND_ID_PREDECESSOR, id, size=2)
         return NodeRef(response[1], self.port)
 
     def find_successor(self, id: int) -> 'NodeRef':
@@ -64,8 +156,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the successor node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(FIND_ID_SUCCESSOR, str(id)).decode().split(SEPARATOR)
+        response = self.request(FIND_ID_SUCCESSOR, id, size=2)
         return NodeRef(response[1], self.port)
 
     @property
@@ -75,8 +170,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the predecessor node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(GET_PREDECESSOR).decode().split(SEPARATOR)
+        response = self.request(GET_PREDECESSOR, size=2)
         return NodeRef(response[1], self.port)
 
     @property
@@ -86,10 +184,110 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the successor node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(GET_SUCCESSOR).decode().split(SEPARATOR)
+        response = self.request(GET_SUCCESSOR, size=2)
         return NodeRef(response[1], self.port)
 
+    def lookup_step(self, id: int) -> Optional[Tuple[bool, 'NodeRef']]:
+        """
+        Runs one routing step of a lookup on the current node.
+
+        Args:
+            id (int): The id being looked up.
+
+        Returns:
+            Tuple[bool, NodeRef]: Whether the returned node is the owner of the id or the next
+                node to ask, or None if the node does not support the operation.
+
+        Raises:
+            NoResponse: If the node failed or its circuit breaker is open.
+        """
+        try:
+            response = self.pool.call(LOOKUP_STEP, [id], RPC_TIMEOUT)
+        except Exception as e:
+            logging.error(f"Error enviando paso de búsqueda a {self.ip}: {e}, ID: {id}")
+            raise NoResponse(f'Nodo {self.ip} no respondió a la operación {LOOKUP_STEP}') from e
+        if len(response) < 3:
+            # Nodes that predate the operation answer it with an empty reply
+            return None
+        return int(response[0]) == TRUE, NodeRef(response[1], int(response[2]))
+
+    def find_recursive(self, id: int, query_id: str, origin_ip: str, origin_port: int) -> bool:
+        """
+        Hands a recursive lookup to the current node, which forwards it or answers the originator.
+
+        Args:
+            id (int): The id being looked up.
+            query_id (str): The id the originator is waiting on.
+            origin_ip (str): IP address of the originator.
+            origin_port (int): Port of the originator.
+
+        Returns:
+            bool: True if the node accepted the lookup.
+        """
+        response = self.process_operation(FIND_RECURSIVE, id, query_id, origin_ip, origin_port)
+        return response == [str(TRUE)]
+
+    def lookup_reply(self, query_id: str, owner: 'NodeRef', start: int) -> bool:
+        """
+        Sends the answer of a recursive lookup to the node that started it.
+
+        Args:
+            query_id (str): The id of the lookup.
+            owner (NodeRef): The owner found.
+            start (int): The id of the owner's predecessor.
+
+        Returns:
+            bool: True if the originator was still waiting for the answer.
+        """
+        response = self.process_operation(LOOKUP_REPLY, query_id, owner.ip, owner.port, start)
+        return response == [str(TRUE)]
+
+    def get_fingers(self) -> List['NodeRef']:
+        """
+        Retrieves the current node, its successor and the distinct nodes in its finger table.
+
+        Returns:
+            List[NodeRef]: The nodes, or an empty list if the node failed or does not support the operation.
+        """
+        response = self.process_operation(GET_FINGERS)
+        return [NodeRef(response[i], int(response[i + 1])) for i in range(0, len(response) - 1, 2)]
+
+    def exchange_members(self, fields: List) -> List[str]:
+        """
+        Sends the membership table of the current node and retrieves the one of the referenced node.
+
+        Args:
+            fields (List): The table, as ip, port and heartbeat of every member.
+
+        Returns:
+            List[str]: The table of the referenced node, or an empty list if it failed or does not support the operation.
+        """
+        return self.process_operation(EXCHANGE_MEMBERS, *fields)
+
+    def get_snapshot_chunk(self, offset: int) -> Optional[Tuple[int, bytes]]:
+        """
+        Retrieves a piece of the latest snapshot of the referenced node's storage.
+
+        Args:
+            offset (int): Where the piece starts in the snapshot file.
+
+        Returns:
+            Tuple[int, bytes]: The size of the whole snapshot and the piece, or None if the node
+                failed, has no snapshot or does not support the operation.
+        """
+        try:
+            response = self.pool.call(GET_SNAPSHOT, [offset], RPC_TIMEOUT, raw=True)
+            if len(response) != 2:
+                return None
+            return int(bytes(response[0])), bytes(response[1])
+        except Exception as e:
+            logging.error(f"Error obteniendo instantánea de {self.ip}: {e}, desde: {offset}")
+            return None
+
     def closest_preceding_finger(self, id: int) -> 'NodeRef':
         """
         Finds the closest preceding finger for a given id.
@@ -99,8 +297,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the closest preceding finger node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(CLOSEST_PRECEDING_FINGER, str(id)).decode().split(SEPARATOR)
+        response = self.request(CLOSEST_PRECEDING_FINGER, id, size=2)
         return NodeRef(response[1], self.port)
     
     def notify(self, node: 'NodeRef'):
@@ -110,7 +311,7 @@ class NodeRef:
         Args:
             node (NodeRef): The node to notify.
         """
-        self.process_operation(NOTIFY, f'{node.ip}{SEPARATOR}{node.port}')
+        self.process_operation(NOTIFY, node.ip, node.port)
 
     def get_successor_and_notify(self, index, ip) -> 'NodeRef':
         """
@@ -122,8 +323,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the successor node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(GET_SUCCESSOR_AND_NOTIFY, f'{index}{SEPARATOR}{ip}').decode().split(SEPARATOR)
+        response = self.request(GET_SUCCESSOR_AND_NOTIFY, index, ip, size=2)
         return NodeRef(response[1], self.port)
     
     def ping(self) -> bool:
@@ -133,8 +337,8 @@ class NodeRef:
         Returns:
             bool: True if the node is alive, False otherwise.
         """
-        response = self.process_operation(PING).decode()
-        return response == ALIVE
+        response = self.process_operation(PING)
+        return response == [ALIVE]
     
     def ping_leader(self, id: int, time: int):
         """
@@ -146,9 +350,12 @@ class NodeRef:
 
         Returns:
             int: The response from the leader node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(PING_LEADER, f'{id}{SEPARATOR}{time}').decode()
-        return int(response)
+        response = self.request(PING_LEADER, id, time)
+        return int(response[0])
 
     def election(self, first_id: int, leader_ip: int, leader_port: int) -> 'NodeRef':
         """
@@ -161,8 +368,11 @@ class NodeRef:
 
         Returns:
             NodeRef: A reference to the newly elected leader node.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(ELECTION, f'{first_id}{SEPARATOR}{leader_ip}{SEPARATOR}{leader_port}').decode().split(SEPARATOR)
+        response = self.request(ELECTION, first_id, leader_ip, leader_port, size=2)
         return NodeRef(response[0], response[1])
     
     def set_partition(self, dict: str, version: str, remove: str) -> bool:
@@ -177,8 +387,8 @@ class NodeRef:
         Returns:
             bool: True if the operation succeeded, False otherwise.
         """
-        response = self.process_operation(SET_PARTITION, f'{dict}{SEPARATOR}{version}{SEPARATOR}{remove}').decode()
-        return False if response == '' else int(response) == TRUE
+        response = self.process_operation(SET_PARTITION, dict, version, remove)
+        return response == [str(TRUE)]
 
     def resolve_data(self, dict: str, version: str, remove: str) -> Tuple[List[str], bool]:
         """
@@ -192,7 +402,7 @@ class NodeRef:
         Returns:
             Tuple[List[str], bool]: A tuple containing the list of resolved data and a flag indicating whether there were multiple entries.
         """
-        response = self.process_operation(RESOLVE_DATA, f'{dict}{SEPARATOR}{version}{SEPARATOR}{remove}').decode().split(SEPARATOR)
+        response = self.process_operation(RESOLVE_DATA, dict, version, remove)
         return response, len(response) > 1
     
     def retrieve_key(self, key: str) -> Data:
@@ -204,8 +414,11 @@ class NodeRef:
 
         Returns:
             Data: The data associated with the key.
+
+        Raises:
+            NoResponse: If the node did not answer.
         """
-        response = self.process_operation(RETRIEVE_KEY, key).decode().split(SEPARATOR)
+        response = self.request(RETRIEVE_KEY, key, size=2)
         return Data(response[0], int(response[1]))
 
     def store_key(self, key: str, value: str, version: int, rep: bool = False) -> bool:
@@ -221,8 +434,8 @@ class NodeRef:
         Returns:
             bool: True if the operation succeeded, False otherwise.
         """
-        response = self.process_operation(STORE_KEY, f'{key}{SEPARATOR}{value}{SEPARATOR}{version}{SEPARATOR}{TRUE if rep else FALSE}').decode()
-        return False if response == '' else int(response) == TRUE
+        response = self.process_operation(STORE_KEY, key, value, version, TRUE if rep else FALSE)
+        return response == [str(TRUE)]
 
     def delete_key(self, key: str, time: int, rep: bool = False) -> bool: 
         """
@@ -236,5 +449,50 @@ class NodeRef:
         Returns:
             bool: True if the operation succeeded, False otherwise.
         """
-        response = self.process_operation(DELETE_KEY, f'{key}{SEPARATOR}{time}{SEPARATOR}{TRUE if rep else FALSE}').decode()
-        return False if response == '' else int(response) == TRUE
+        response = self.process_operation(DELETE_KEY, key, time, TRUE if rep else FALSE)
+        return response == [str(TRUE)]
+
+    def send_chunk(self, op: int, transfer_id: str, seq: int, dict: str, version: str, remove: str) -> Tuple[bool, List[str]]:
+        """
+        Sends one chunk of a streamed partition transfer to the current node.
+
+        Args:
+            op (int): PARTITION_CHUNK to store the chunk or RESOLVE_CHUNK to resolve it against the node's data.
+            transfer_id (str): The id of the transfer.
+            seq (int): The sequence number of the chunk.
+            dict (str): The encoded values of the chunk.
+            version (str): The encoded versions of the chunk.
+            remove (str): The encoded removed keys of the chunk.
+
+        Returns:
+            Tuple[bool, List[str]]: Whether the chunk was acknowledged, and the response fields.
+        """
+        response = self.process_operation(op, transfer_id, seq, dict, version, remove)
+        ok = len(response) == 3 if op == RESOLVE_CHUNK else response == [str(TRUE)]
+        return ok, response
+
+    def transfer_status(self, transfer_id: str) -> Optional[int]:
+        """
+        Asks the current node up to which chunk it has applied a streamed transfer.
+
+        Args:
+            transfer_id (str): The id of the transfer.
+
+        Returns:
+            Optional[int]: The last contiguous chunk applied (-1 if none), or None if the node did not answer.
+        """
+        response = self.process_operation(TRANSFER_STATUS, transfer_id)
+        try:
+            return int(response[0])
+        except (IndexError, ValueError):
+            return None
+
+    def get_stats(self) -> dict:
+        """
+        Retrieves the metrics of the current node. Only answered for local callers.
+
+        Returns:
+            dict: The node metrics, or an empty dictionary if they could not be retrieved.
+        """
+        response = self.process_operation(GET_STATS)
+        return decode_dict(response[0]) if response and response[0] else {}
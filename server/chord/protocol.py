@@ -0,0 +1,228 @@
+import struct
+import zlib
+from typing import List, Optional, Tuple, Union
+
+from chord.constants import COMPRESSION_LEVEL, COMPRESSION_THRESHOLD, MAX_FRAME_SIZE
+from chord.metrics import CompressionStats
+from config import SEPARATOR
+
+# Version 0 is the legacy text protocol ('op|field|field' frames), version 1 the binary one,
+# version 2 adds the deadline budget
+LEGACY_VERSION = 0
+PROTOCOL_VERSION = 2
+DEADLINE_VERSION = 2
+
+# Binary messages start with a byte that can never begin a legacy frame (an ASCII digit)
+MAGIC = 0xC5
+
+# magic, version, op, flags, field count
+HEADER = struct.Struct('!BBBBH')
+FIELD_LENGTH = struct.Struct('!I')
+BUDGET = struct.Struct('!I')  # Milliseconds left to answer, right after the header
+
+# Header flags
+FLAG_COMPRESSED = 0x01  # The fields section is zlib-compressed
+FLAG_DEADLINE = 0x02  # The header is followed by the time budget of the request
+
+# Capabilities advertised in the HELLO handshake
+CAP_ZLIB = 0x01
+CAPABILITIES = CAP_ZLIB
+
+compression_stats = CompressionStats()
+
+Field = Union[str, bytes]
+Buffer = Union[bytes, bytearray, memoryview]
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+
+
+def text(field: Buffer) -> str:
+    """
+    Decodes a received field as UTF-8 text, reading straight from the receive buffer.
+
+    Args:
+        field (Buffer): The raw field.
+
+    Returns:
+        str: The decoded text.
+    """
+    return str(field, 'utf-8')
+
+
+def is_binary(message: Buffer) -> bool:
+    """
+    Tells whether a received message uses the binary protocol.
+
+    Args:
+        message (Buffer): The message as received from the socket.
+
+    Returns:
+        bool: True for binary messages, False for legacy text frames.
+    """
+    return len(message) >= HEADER.size and message[0] == MAGIC
+
+
+def encode_message(op: int, fields: List[Field], flags: int = 0, version: int = PROTOCOL_VERSION, compress: bool = False, budget: Optional[float] = None) -> bytes:
+    """
+    Encodes an operation and its fields as a binary message.
+
+    The message is a fixed header (magic, version, op, flags, field count) followed by
+    every field as a 4 byte length and its bytes, so fields may contain any character.
+
+    Args:
+        op (int): The operation code.
+        fields (List[Field]): The fields of the message; buffers are sent as is, anything else as UTF-8 text.
+        flags (int): Bit flags for the message.
+        version (int): The protocol version to stamp in the header.
+        compress (bool): Whether the peer accepts compressed messages. Only fields sections
+            of at least COMPRESSION_THRESHOLD bytes that actually shrink are compressed.
+        budget (float): Seconds the receiver has to answer, sent only to peers of DEADLINE_VERSION or later.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    parts = []
+    for field in fields:
+        raw = field if isinstance(field, BUFFER_TYPES) else str(field).encode('utf-8')
+        parts.append(FIELD_LENGTH.pack(len(raw)))
+        parts.append(raw)
+    body = b''.join(parts)
+
+    wire = body
+    if compress and len(body) >= COMPRESSION_THRESHOLD:
+        compressed = zlib.compress(body, COMPRESSION_LEVEL)
+        if len(compressed) < len(body):
+            wire = compressed
+            flags |= FLAG_COMPRESSED
+    if compress:
+        compression_stats.record(op, len(body), len(wire))
+
+    if budget is not None:
+        flags |= FLAG_DEADLINE
+        return HEADER.pack(MAGIC, version, op, flags, len(fields)) + BUDGET.pack(max(0, int(budget * 1000))) + wire
+    return HEADER.pack(MAGIC, version, op, flags, len(fields)) + wire
+
+
+def decode_message(message: Buffer) -> Tuple[int, int, int, List[memoryview]]:
+    """
+    Decodes a binary message.
+
+    Fields are returned as views over the received buffer, so nothing is copied until
+    a field is turned into text with `text`.
+
+    Args:
+        message (Buffer): The encoded message.
+
+    Returns:
+        Tuple[int, int, int, List[memoryview]]: The version, operation code, flags and raw fields.
+
+    Raises:
+        ValueError: If the message is not a well formed binary message.
+    """
+    if not is_binary(message):
+        raise ValueError('El mensaje no usa el protocolo binario')
+
+    view = memoryview(message)
+    _, version, op, flags, count = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    if flags & FLAG_DEADLINE:
+        offset += BUDGET.size
+
+    if flags & FLAG_COMPRESSED:
+        decompressor = zlib.decompressobj()
+        body = decompressor.decompress(view[offset:], MAX_FRAME_SIZE)
+        if decompressor.unconsumed_tail:
+            raise ValueError(f'Mensaje descomprimido excede el máximo de {MAX_FRAME_SIZE} bytes')
+        view = memoryview(body)
+        offset = 0
+
+    fields: List[memoryview] = []
+    for _ in range(count):
+        (length,) = FIELD_LENGTH.unpack_from(view, offset)
+        offset += FIELD_LENGTH.size
+        if offset + length > len(view):
+            raise ValueError('Campo truncado en mensaje binario')
+        fields.append(view[offset:offset + length])
+        offset += length
+    return version, op, flags, fields
+
+
+def read_budget(message: Buffer) -> Optional[float]:
+    """
+    Reads the time budget carried by a binary message.
+
+    Args:
+        message (Buffer): The encoded message.
+
+    Returns:
+        float: The seconds the sender gave the receiver to answer, or None if the message carries no budget.
+    """
+    if not is_binary(message) or not message[3] & FLAG_DEADLINE:
+        return None
+    (budget,) = BUDGET.unpack_from(message, HEADER.size)
+    return budget / 1000
+
+
+def encode_legacy(op: int, fields: List[Field]) -> bytes:
+    """
+    Encodes an operation and its fields as a legacy text frame.
+
+    Args:
+        op (int): The operation code.
+        fields (List[Field]): The fields of the message.
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    return SEPARATOR.join([str(op)] + [text(f) if isinstance(f, BUFFER_TYPES) else str(f) for f in fields]).encode('utf-8')
+
+
+def decode_legacy(message: Buffer) -> Tuple[int, List[str]]:
+    """
+    Decodes a legacy text frame.
+
+    Args:
+        message (Buffer): The encoded frame.
+
+    Returns:
+        Tuple[int, List[str]]: The operation code and its fields.
+    """
+    data = text(message).split(SEPARATOR)
+    return int(data[0]), data[1:]
+
+
+def encode_response(fields: List[Field], version: int, op: int = 0, compress: bool = False) -> bytes:
+    """
+    Encodes the fields of a response in the protocol version the request used.
+
+    Args:
+        fields (List[Field]): The fields of the response.
+        version (int): The protocol version of the request.
+        op (int): The operation being answered, echoed in binary responses.
+        compress (bool): Whether the peer negotiated compression.
+
+    Returns:
+        bytes: The encoded response.
+    """
+    if version == LEGACY_VERSION:
+        return SEPARATOR.join(text(f) if isinstance(f, BUFFER_TYPES) else str(f) for f in fields).encode('utf-8')
+    return encode_message(op, fields, version=version, compress=compress)
+
+
+def decode_response(message: Buffer, version: int, raw: bool = False) -> List[Field]:
+    """
+    Decodes a response received for a request sent with the given protocol version.
+
+    Args:
+        message (Buffer): The encoded response.
+        version (int): The protocol version the request was sent with.
+        raw (bool): Whether to return binary fields as buffer views instead of decoding them as text.
+
+    Returns:
+        List[Field]: The fields of the response.
+    """
+    if version == LEGACY_VERSION:
+        return text(message).split(SEPARATOR)
+    _, _, _, fields = decode_message(message)
+    if raw:
+        return fields
+    return [text(field) for field in fields]
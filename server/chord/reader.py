@@ -0,0 +1,163 @@
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+from chord.node_ref import NodeRef
+from chord.utils import getShaRepr
+from chord.storage import Data
+from chord.deadline import bind, remaining
+from chord.health import health
+from chord.constants import RETRIEVE_KEY, RPC_TIMEOUT, HEDGED_READS, HEDGE_DELAY, HEDGE_DELAY_PERCENTILE, HEDGE_DELAY_DEFAULT, HEDGE_DELAY_MIN
+
+
+class HedgedReader:
+    """
+    Reads keys from their owner, hedging with a replica when the owner is slow or down.
+
+    The request goes to the owner first. If it has not answered within the hedge delay,
+    or it fails, the same read is sent to a node known to hold a replica. The first answer
+    that has the key wins, and if both have answered by then the highest version wins. An
+    answer without the key is only returned once no other request is in flight, so a
+    replica that lags behind never hides a key the slower owner has.
+
+    Attributes:
+        reads (int): Reads served.
+        fired (int): Hedges sent to a replica.
+        won (int): Hedges whose answer was the one returned.
+        failed (int): Reads for which no node answered.
+    """
+
+    def __init__(self, node) -> None:
+        """
+        Initializes the reader of a node.
+
+        Args:
+            node: The node whose routing state is used to pick replicas.
+        """
+        self.node = node
+        self.executor = ThreadPoolExecutor(thread_name_prefix='chord-read')
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.fired = 0
+        self.won = 0
+        self.failed = 0
+
+    def incr(self, name: str):
+        """
+        Increments the counter with the given name.
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def read(self, owner: NodeRef, key: str) -> Optional[Data]:
+        """
+        Reads a key from its owner, hedging with a replica if needed.
+
+        Args:
+            owner (NodeRef): The node responsible for the key.
+            key (str): The key to read.
+
+        Returns:
+            Data: The data read, or None if no node answered.
+        """
+        self.incr('reads')
+        if not HEDGED_READS:
+            return self.fetch(owner, key)
+
+        fetch = bind(self.fetch)
+        futures: Dict[Future, bool] = {self.executor.submit(fetch, owner, key): False}
+        done, _ = wait(futures, timeout=self.hedge_delay(owner))
+
+        # Hedge when the owner is slow or already failed
+        if not done or next(iter(done)).result() is None:
+            replica = self.replica_of(owner, key)
+            if replica is not None:
+                logging.info(f'Lectura de {key} enviada también a la réplica {replica.ip}')
+                self.incr('fired')
+                futures[self.executor.submit(fetch, replica, key)] = True
+
+        pending = set(futures)
+        best = None
+        while pending:
+            left = remaining()
+            done, pending = wait(pending, timeout=RPC_TIMEOUT if left is None else max(0, left), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            answers = [(future.result(), futures[future]) for future in futures if future.done() and future.result() is not None]
+            if answers:
+                best = max(answers, key=lambda answer: answer[0].version)
+                if best[0].version > 0 and not best[0].is_empty():
+                    break
+
+        if best is None:
+            self.incr('failed')
+            return None
+        data, hedge = best
+        if hedge:
+            self.incr('won')
+        return data
+
+    def fetch(self, node: NodeRef, key: str) -> Optional[Data]:
+        """
+        Reads a key from a node.
+
+        Returns:
+            Data: The data read, or None if the node did not answer.
+        """
+        try:
+            return node.retrieve_key(key)
+        except Exception as e:
+            logging.error(f'Error leyendo la llave {key} de {node.ip}: {e}')
+            return None
+
+    def hedge_delay(self, owner: NodeRef) -> float:
+        """
+        Returns how long to wait for the owner before hedging: HEDGE_DELAY if set, otherwise
+        a high percentile of the recent RETRIEVE_KEY round trips to the owner.
+        """
+        if HEDGE_DELAY is not None:
+            return HEDGE_DELAY
+        rtt = owner.pool.rtt_window(RETRIEVE_KEY).percentile(HEDGE_DELAY_PERCENTILE)
+        return HEDGE_DELAY_DEFAULT if rtt is None else max(HEDGE_DELAY_MIN, rtt)
+
+    def replica_of(self, owner: NodeRef, key: str) -> Optional[NodeRef]:
+        """
+        Picks a node known to be among the c successors of the owner, which hold the replicas
+        of its keys: the first replica target of the key in the membership table, when it routes,
+        or the node after the owner on the stretch of the ring made of this node's predecessor
+        and successor lists. Picking one costs no extra round trip; when the owner is outside
+        that stretch no replica is known and the read is not hedged.
+
+        Args:
+            owner (NodeRef): The node responsible for the key.
+            key (str): The key to read.
+
+        Returns:
+            NodeRef: The replica to hedge with, or None if no other healthy node is known.
+        """
+        membership = self.node.membership
+        if membership.virtual or (membership.active and membership.converged):
+            replicas = membership.replicas(getShaRepr(key), 1)
+            return replicas[0] if replicas and replicas[0].id != owner.id else None
+
+        with self.node.pred_lock:
+            stretch = list(reversed(self.node.predecessors.list))
+        stretch.append(self.node.ref)
+        with self.node.succ_lock:
+            stretch += self.node.successors.list
+
+        index = next((i for i, node in enumerate(stretch) if node.id == owner.id), None)
+        if index is None:
+            return None
+        for node in stretch[index + 1:index + 1 + self.node.c]:
+            if node.id != owner.id and not health.is_suspect(node.ip, node.port):
+                return node
+        return None
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns a copy of the counters.
+        """
+        with self.lock:
+            return {'reads': self.reads, 'fired': self.fired, 'won': self.won, 'failed': self.failed}
@@ -1,13 +1,19 @@
 import logging
+import os
+import threading
 import time
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 from chord.storage import Data, DefaultData, Storage
-from chord.node_ref import NodeRef
-from chord.constants import FALSE, TRUE, FIX_STORAGE_FREQ
+from chord.log_storage import LogStorage
+from chord.node_ref import NodeRef, NoResponse
+from chord.snapshot import read_chunk
+from chord.constants import FALSE, TRUE, FIX_STORAGE_FREQ, STORE_KEY, DELETE_KEY, PARTITION_CHUNK, RESOLVE_CHUNK, RPC_TIMEOUT, STORAGE_ENGINE, STORAGE_LOG, STORAGE_DIR
+from chord.constants import SNAPSHOTS, SNAPSHOT_DIR, SNAPSHOT_FREQ, SNAPSHOT_CHUNK_BYTES
 from chord.bounded_list import BoundedList
 from chord.utils import encode_dict, decode_dict, getShaRepr, is_in_interval
 from chord.timer import Timer
-from config import SEPARATOR
+from chord.streamer import PartitionStreamer
+from chord.metrics import TransferStats
 
 
 class Replicator:
@@ -26,9 +32,22 @@ class Replicator:
         """
         self.node = node
         self.timer = timer
-        self.storage = Storage()  # Storage instance for key-value pairs
-
-    def get(self, key: str) -> str:
+        # Storage instance for key-value pairs, kept on disk by the log engine so it survives restarts
+        if STORAGE_ENGINE == STORAGE_LOG:
+            self.storage = LogStorage(os.path.join(STORAGE_DIR, f'{node.ip}_{node.port}'))
+        else:
+            self.storage = Storage()
+        self.streamer = PartitionStreamer(self.storage)  # Chunked transfers of the storage
+        self.transfers = TransferStats()  # Keys and bytes moved by handoffs and replica syncs
+        self.epoch = 0  # Membership epoch the stored keys were last rebalanced for
+        self.snapshot_path = os.path.join(SNAPSHOT_DIR, f'{node.ip}_{node.port}.snap')
+        self.snapshot_lock = threading.Lock()
+
+        # The in-memory storage starts from its last snapshot; the log engine recovers on its own
+        if STORAGE_ENGINE != STORAGE_LOG and os.path.exists(self.snapshot_path):
+            self.restore()
+
+    def get(self, key: str) -> Data:
         """
         Retrieves the value and version of the data associated with the given key.
 
@@ -36,15 +55,14 @@ class Replicator:
             key: The key to retrieve data for.
 
         Returns:
-            A string containing the value and version of the data associated with the key.
+            The data associated with the key, carrying its value and version.
         """
         with self.storage.storage_lock:
             data, error = self.storage.get(key)
             if error:
                 data = DefaultData()  # Default to an empty data object if an error occurs
             
-            # Return the value and version, separated by a constant separator
-            return f'{data.value}{SEPARATOR}{data.version}'
+            return data
         
     def set(self, key: str, data: Data, rep: bool) -> str:
         """
@@ -77,9 +95,27 @@ class Replicator:
 
         return TRUE
         
+    def replica_targets(self, key: str) -> List[NodeRef]:
+        """
+        Returns the nodes holding the replicas of a key: the successors of the current node or,
+        with virtual nodes, the next distinct nodes after the key's owner on the ring.
+
+        Args:
+            key: The key.
+
+        Returns:
+            The nodes to replicate the key on.
+        """
+        membership = self.node.membership
+        if membership.virtual:
+            return [node for node in membership.replicas(getShaRepr(key), self.node.c) if node.id != self.node.id]
+        with self.node.succ_lock:
+            successors: BoundedList[NodeRef] = self.node.successors
+            return [successors.get(i) for i in range(len(successors))]
+
     def replicate_set(self, key: str, data: Data):
         """
-        Replicates the data to all successors of the current node.
+        Replicates the data to all the replica targets of the key.
 
         Args:
             key: The key associated with the data.
@@ -87,19 +123,23 @@ class Replicator:
         """
         logging.info(f'Replicando llave {key}')
 
-        with self.node.succ_lock:
-            successors: BoundedList[NodeRef] = self.node.successors
-
-            # Attempt to replicate the data to each successor
-            for i in range(len(successors)):
-                try:
-                    succ_i = successors.get(i)
-                    logging.info(f'Configurando réplica para la llave {key} en {succ_i.ip}')
-                    ok = succ_i.store_key(key, data.value, data.version)
-                    if not ok:
-                        logging.error(f'Error replicando llave {key} en sucesor {i}')
-                except Exception as e:
-                    logging.error(f'Error replicando llave {key} en sucesor {i}: {e}')
+        # Queue the replica on every target; concurrent writes to the same
+        # node share a single BATCH round trip
+        pending = []
+        for i, succ_i in enumerate(self.replica_targets(key)):
+            local = succ_i.id == self.node.id
+            self.node.path_stats.record('replicate', local)
+            if local:
+                continue  # The successor list wrapped around to this node, which already stored the key
+            logging.info(f'Configurando réplica para la llave {key} en {succ_i.ip}')
+            pending.append((i, succ_i.batched(STORE_KEY, key, data.value, data.version, FALSE)))
+
+        for i, future in pending:
+            try:
+                if future.result(RPC_TIMEOUT) != [str(TRUE)]:
+                    logging.error(f'Error replicando llave {key} en sucesor {i}')
+            except Exception as e:
+                logging.error(f'Error replicando llave {key} en sucesor {i}: {e}')
 
     def remove(self, key: str, time: int, rep: bool) -> bool:
         """
@@ -131,7 +171,7 @@ class Replicator:
     
     def replicate_remove(self, key: str, time: int):
         """
-        Replicates the removal of a key to all successors.
+        Replicates the removal of a key to all the replica targets of the key.
 
         Args:
             key: The key to be removed.
@@ -139,19 +179,22 @@ class Replicator:
         """
         logging.info(f'Eliminando llave {key}')
 
-        with self.node.succ_lock:
-            successors: BoundedList[NodeRef] = self.node.successors
-
-            # Attempt to remove the key from each successor
-            for i in range(len(successors)):
-                try:
-                    succ_i = successors.get(i)
-                    logging.info(f'Eliminando la réplica de la llave {key} de {succ_i.ip}')
-                    ok = succ_i.delete_key(key, time)
-                    if not ok:
-                        logging.error(f'Error eliminando llave {key} en sucesor {i}')
-                except Exception as e:
-                    logging.error(f'Error eliminando llave {key} en sucesor {i}: {e}')
+        # Queue the removal on every target, batched with concurrent removals
+        pending = []
+        for i, succ_i in enumerate(self.replica_targets(key)):
+            local = succ_i.id == self.node.id
+            self.node.path_stats.record('replicate', local)
+            if local:
+                continue  # Already removed from this node
+            logging.info(f'Eliminando la réplica de la llave {key} de {succ_i.ip}')
+            pending.append((i, succ_i.batched(DELETE_KEY, key, time, FALSE)))
+
+        for i, future in pending:
+            try:
+                if future.result(RPC_TIMEOUT) != [str(TRUE)]:
+                    logging.error(f'Error eliminando llave {key} en sucesor {i}')
+            except Exception as e:
+                logging.error(f'Error eliminando llave {key} en sucesor {i}: {e}')
 
     def set_partition(self, dict: Dict[str, str], version: Dict[str, int], removed_dict: Dict[str, int]) -> bool:
         """
@@ -194,32 +237,134 @@ class Replicator:
 
         if pred.id == self.node.id:
             return
-        
-        logging.info(f'Replicando todos los datos a {node.ip}')
 
-        # Retrieve all the data to be replicated
-        with self.storage.storage_lock:
-            dict, _ = self.storage.get_all()
-            removed_dict, _ = self.storage.get_remove_all()
+        # Filter the data to be replicated based on valid range
+        interval = self.replica_interval(node)
+        keys = self.storage.keys_in_interval(*interval) if interval else self.storage.get_keys()
+        logging.info(f'Replicando {len(keys)} llaves a {node.ip}')
+
+        # Stream the data in bounded chunks, applied by the node as they arrive
+        sent: Dict[str, int] = {}
+        ok = self.streamer.stream(node, PARTITION_CHUNK, keys=keys, sent=sent)
+        if ok is not None:
+            self.record_transfer('replica_sync', keys, sent.get('bytes', 0))
+            if not ok:
+                logging.error(f'Error replicando todos los datos a {node.ip}')
+            return
+
+        # The node does not support streaming, send everything in a single frame
+        logging.info(f'Nodo {node.ip} no soporta transferencias por fragmentos')
+        partition = self.encode_keys(keys)
+
+        # Attempt to replicate the data to the given node
+        ok = node.set_partition(*partition)
+        self.record_transfer('replica_sync', keys, sum(len(part) for part in partition))
+        if not ok:
+            logging.error(f'Error replicando todos los datos a {node.ip}')
+
+    def replica_interval(self, node: NodeRef) -> Optional[Tuple[int, int]]:
+        """
+        Finds the ring interval of the keys for which a successor is one of the replicas: the keys
+        owned by this node and by the predecessors whose replicas reach as far as the successor.
+
+        Args:
+            node: The successor.
 
+        Returns:
+            The interval (start, end], or None if every key must be sent: the node is not a
+            successor, not enough predecessors are known or nodes run virtual nodes.
+        """
+        if self.node.membership.virtual:
+            return None
+
+        with self.node.succ_lock:
+            index = next((i for i in range(len(self.node.successors)) if self.node.successors.get(i).id == node.id), None)
+        if index is None:
+            return None
+
+        # A key is replicated on the c successors of its owner, so the successor at index i
+        # holds the keys of this node and of its c - i - 1 closest predecessors
+        owners = self.node.c - index
+        with self.node.pred_lock:
+            if len(self.node.predecessors) < owners:
+                return None
+            start = self.node.predecessors.get(owners - 1)
+        if start.id == self.node.id:
+            return None
+        return start.id, self.node.id
+
+    def encode_keys(self, keys: List[str]) -> List[str]:
+        """
+        Encodes the data of some keys to be sent in a single frame.
+
+        Args:
+            keys: The keys.
+
+        Returns:
+            The encoded values, versions and removals of the keys.
+        """
         new_dict: Dict[str, str] = {}
         new_version: Dict[str, int] = {}
         new_removed_dict: Dict[str, int] = {}
 
-        # Filter the data to be replicated based on valid range
-        for key, data in dict.items():
-            new_dict[key] = data.value
-            new_version[key] = data.version
+        with self.storage.storage_lock:
+            for key in keys:
+                data, _ = self.storage.get(key)
+                if data.active:
+                    new_dict[key] = data.value
+                    new_version[key] = data.version
+                else:
+                    new_removed_dict[key] = data.version
 
-        for key, data in removed_dict.items():
-            new_removed_dict[key] = data.version
+        return [encode_dict(new_dict), encode_dict(new_version), encode_dict(new_removed_dict)]
 
-        # Attempt to replicate the data to the given node
-        ok = node.set_partition(encode_dict(new_dict), encode_dict(new_version), encode_dict(new_removed_dict))
-        if not ok:
-            logging.error(f'Error replicando todos los datos a {node.ip}')
+    def record_transfer(self, name: str, keys: List[str], bytes: int):
+        """
+        Records the keys and bytes moved by a transfer, against the keys stored.
 
-    def resolve_data(self, dict: Dict[str, str], version: Dict[str, int], removed_dict: Dict[str, int]) -> str:
+        Args:
+            name: The kind of transfer.
+            keys: The keys sent.
+            bytes: The bytes sent.
+        """
+        with self.storage.storage_lock:
+            stored = len(self.storage.ring)
+        self.transfers.record(name, len(keys), bytes, stored)
+        logging.info(f'Transferencia {name}: {len(keys)} de {stored} llaves, {bytes} bytes')
+
+    def receive_partition_chunk(self, transfer_id: str, seq: int, dict: Dict[str, str], version: Dict[str, int], removed_dict: Dict[str, int]) -> int:
+        """
+        Applies a chunk of a streamed partition as soon as it arrives.
+
+        Args:
+            transfer_id: The id of the transfer.
+            seq: The sequence number of the chunk.
+            dict: The values of the chunk.
+            version: The versions of the values.
+            removed_dict: The removed keys of the chunk.
+
+        Returns:
+            TRUE if the chunk was applied, FALSE otherwise.
+        """
+        return self.streamer.receive(transfer_id, seq, lambda: self.set_partition(dict, version, removed_dict))
+
+    def receive_resolve_chunk(self, transfer_id: str, seq: int, dict: Dict[str, str], version: Dict[str, int], removed_dict: Dict[str, int]) -> List[str]:
+        """
+        Resolves a chunk of a streamed transfer against the local data as soon as it arrives.
+
+        Args:
+            transfer_id: The id of the transfer.
+            seq: The sequence number of the chunk.
+            dict: The values of the chunk.
+            version: The versions of the values.
+            removed_dict: The removed keys of the chunk.
+
+        Returns:
+            The encoded data of the chunk's keys that is newer here, or an empty list on failure.
+        """
+        return self.streamer.receive(transfer_id, seq, lambda: self.resolve_data(dict, version, removed_dict, scoped=True))
+
+    def resolve_data(self, dict: Dict[str, str], version: Dict[str, int], removed_dict: Dict[str, int], scoped: bool = False) -> List[str]:
         """
         Resolves conflicts between different versions of the same data by comparing versions and updating accordingly.
 
@@ -227,9 +372,10 @@ class Replicator:
             dict: A dictionary of new data to resolve.
             version: A dictionary of versions corresponding to the new data.
             removed_dict: A dictionary of removed keys.
+            scoped: Whether only the keys sent are resolved, as done for the chunks of a streamed transfer.
 
         Returns:
-            A string containing the resolved data.
+            The encoded resolved values, versions and removals, or an empty list on failure.
         """
         logging.info('Resolviendo conflictos de versiones de datos')
 
@@ -239,15 +385,10 @@ class Replicator:
         res_removed_dict: Dict[str, int] = {}
 
         with self.storage.storage_lock:
-            actual_dict, error = self.storage.get_all()
-            if not error:
-                return ''
-
-            # Resolve conflicts for each data item
+            # Resolve conflicts for each data item, looking up only the keys sent
             for key, value in dict.items():
-                try:
-                    data = actual_dict[key]
-                except:
+                data, _ = self.storage.get(key)
+                if not data.active:
                     data = DefaultData()
 
                 if data.version > version[key]:
@@ -258,9 +399,8 @@ class Replicator:
 
             # Resolve removals
             for key, time in removed_dict.items():
-                try:
-                    data = actual_dict[key]
-                except:
+                data, _ = self.storage.get(key)
+                if not data.active:
                     data = DefaultData()
 
                 if data.version > time:
@@ -269,11 +409,23 @@ class Replicator:
                 else:
                     self.storage.remove(key, time)
 
-            # Resolve removals across all data
-            remove, _ = self.storage.get_remove_all()
+            # Resolve removals across all data, or across the keys sent for a scoped transfer
+            if scoped:
+                remove = {}
+                for key in [*version, *removed_dict]:
+                    data, _ = self.storage.get(key)
+                    if not data.active:
+                        remove[key] = data
+            else:
+                remove, _ = self.storage.get_remove_all()
 
             for key, data in remove.items():
-                time = version[key]
+                if key in version:
+                    time = version[key]
+                elif key in removed_dict:
+                    time = removed_dict[key]
+                else:
+                    time = 0
 
                 if data.version > time:
                     res_removed_dict[key] = data.version
@@ -282,7 +434,7 @@ class Replicator:
             self.storage.set_all(new_dict)
 
             # Return the encoded resolved data
-            return f'{encode_dict(res_dict_value)}{SEPARATOR}{encode_dict(res_dict_version)}{SEPARATOR}{encode_dict(res_removed_dict)}'
+            return [encode_dict(res_dict_value), encode_dict(res_dict_version), encode_dict(res_removed_dict)]
 
     def handle_new_predecessor(self):
         """
@@ -301,29 +453,42 @@ class Replicator:
         
         logging.info('Delegando datos del predecesor')
 
-        # Retrieve current storage data
-        with self.storage.storage_lock:
-            dict, _ = self.storage.get_all()
-            remove, _ = self.storage.get_remove_all()
-
-        new_dict: Dict[str, str] = {}
-        new_version: Dict[str, int] = {}
-        new_removed_dict: Dict[str, int] = {}
-
-        # Filter data to be delegated to the new predecessor
-        for key, data in dict.items():
-            new_dict[key] = data.value
-            new_version[key] = data.version
+        # Filter data to be delegated to the new predecessor: every key but the ones owned by
+        # this node, as replicas only go to successors
+        if self.node.membership.virtual:
+            keys = self.storage.get_keys()
+        else:
+            keys = self.storage.keys_in_interval(self.node.id, pred.id)
+
+        # Stream the data in bounded chunks, applying what the predecessor resolves as it arrives
+        sent: Dict[str, int] = {}
+        ok = self.streamer.stream(pred, RESOLVE_CHUNK, self.apply_resolved, keys=keys, sent=sent)
+        if ok is not None:
+            self.record_transfer('handoff', keys, sent.get('bytes', 0))
+            if not ok:
+                logging.error(f'Error obteniendo datos de {pred.ip}')
+            return
 
-        for key, data in remove.items():
-            new_removed_dict[key] = data.version
+        # The predecessor does not support streaming, resolve everything in a single frame
+        logging.info(f'Nodo {pred.ip} no soporta transferencias por fragmentos')
+        partition = self.encode_keys(keys)
 
         # Resolve and set the data in the new predecessor
-        response, ok = pred.resolve_data(encode_dict(new_dict), encode_dict(new_version), encode_dict(new_removed_dict))
+        response, ok = pred.resolve_data(*partition)
+        self.record_transfer('handoff', keys, sum(len(part) for part in partition))
         if not ok:
             logging.error(f'Error obteniendo datos de {pred.ip}')
             return
-        
+
+        self.apply_resolved(response)
+
+    def apply_resolved(self, response: List[str]):
+        """
+        Stores the data that a node reported as newer while resolving our data.
+
+        Args:
+            response: The encoded values, versions and removals returned by the node.
+        """
         # Decode and store the resolved data
         res_dict: Dict[str, str] = decode_dict(response[0])
         res_version: Dict[str, int] = decode_dict(response[1])
@@ -338,14 +503,199 @@ class Replicator:
             self.storage.set_all(new_res_dict)
             self.storage.remove_all(res_removed_dict)
 
+    def rebalance(self):
+        """
+        Moves the stored keys after the members of a ring with virtual nodes changed: the keys
+        this node owns go to their replica targets, and the keys it neither owns nor replicates
+        go to their owner. The receiving nodes resolve versions, so nothing newer is overwritten.
+        """
+        membership = self.node.membership
+        epoch = membership.epoch
+
+        with self.storage.storage_lock:
+            dict, _ = self.storage.get_all()
+            removed, _ = self.storage.get_remove_all()
+
+        # node id -> (node, values, versions, removals) to send
+        outgoing: Dict[int, Tuple[NodeRef, Dict[str, str], Dict[str, int], Dict[str, int]]] = {}
+        for key, data in list(dict.items()) + list(removed.items()):
+            id = getShaRepr(key)
+            owner = membership.lookup(id)
+            if owner is None:
+                return
+            replicas = membership.replicas(id, self.node.c)
+            if owner.id == self.node.id:
+                targets = replicas
+            elif all(node.id != self.node.id for node in replicas):
+                targets = [owner]
+            else:
+                continue
+
+            for node in targets:
+                _, values, versions, removals = outgoing.setdefault(node.id, (node, {}, {}, {}))
+                if data.active:
+                    values[key] = data.value
+                    versions[key] = data.version
+                else:
+                    removals[key] = data.version
+
+        for node, values, versions, removals in outgoing.values():
+            logging.info(f'Rebalanceando {len(values) + len(removals)} llaves hacia {node.ip}')
+            _, ok = node.resolve_data(encode_dict(values), encode_dict(versions), encode_dict(removals))
+            if not ok:
+                logging.error(f'Error rebalanceando llaves hacia {node.ip}')
+                return
+        self.epoch = epoch
+
+    def key_counts(self) -> Dict[str, int]:
+        """
+        Counts the keys stored by this node and the ones it owns, to check the balance of the ring.
+
+        Returns:
+            The number of active keys stored and of those owned by this node.
+        """
+        keys = self.storage.get_keys(active=True)
+
+        membership = self.node.membership
+        if membership.active:
+            owners = [membership.lookup(getShaRepr(key)) for key in keys]
+            owned = sum(1 for owner in owners if owner is None or owner.id == self.node.id)
+        else:
+            with self.node.pred_lock:
+                pred = self.node.predecessors.get(0)
+            owned = sum(1 for key in keys if pred.id == self.node.id or is_in_interval(getShaRepr(key), pred.id, self.node.id))
+        return {'stored': len(keys), 'owned': owned}
+
+    def restore(self):
+        """
+        Loads the last snapshot of this node's storage after a restart.
+        """
+        start = time.monotonic()
+        try:
+            loaded = self.storage.load_snapshot(self.snapshot_path)
+            logging.info(f'Almacenamiento restaurado desde la instantánea: {loaded} llaves en {time.monotonic() - start:.3f}s')
+        except (OSError, ValueError) as e:
+            logging.error(f'Error restaurando la instantánea {self.snapshot_path}: {e}')
+
+    def snapshot(self) -> int:
+        """
+        Writes a snapshot of the storage, replacing the previous one.
+
+        Returns:
+            The size of the snapshot in bytes.
+        """
+        with self.snapshot_lock:
+            start = time.monotonic()
+            size = self.storage.save_snapshot(self.snapshot_path)
+            logging.info(f'Instantánea escrita: {size} bytes en {time.monotonic() - start:.3f}s')
+            return size
+
+    def snapshot_chunk(self, offset: int) -> List:
+        """
+        Returns a piece of the latest snapshot of the storage, for a node bootstrapping from it.
+        A snapshot is written first if there is none yet.
+
+        Args:
+            offset: Where the piece starts in the snapshot file.
+
+        Returns:
+            The size of the whole snapshot and the piece, or an empty list if snapshots are disabled.
+        """
+        if not SNAPSHOTS:
+            return []
+        if not os.path.exists(self.snapshot_path):
+            self.snapshot()
+        total, chunk = read_chunk(self.snapshot_path, offset, SNAPSHOT_CHUNK_BYTES)
+        return [total, chunk]
+
+    def bootstrap_interval(self, node: NodeRef) -> Optional[Tuple[int, int]]:
+        """
+        Finds the ring interval of the keys this node holds once it joins before a successor:
+        the ones it owns and the ones of its c predecessors, which it keeps replicas of. Those
+        predecessors are the successor's, found walking its predecessor pointers.
+
+        Args:
+            node: The successor.
+
+        Returns:
+            The interval (start, end], or None if every key must be loaded: nodes run virtual
+            nodes, the ring has no more than c nodes or a predecessor did not answer.
+        """
+        if self.node.membership.virtual:
+            return None
+
+        start = node
+        try:
+            for i in range(self.node.c + 1):
+                start = start.pred
+                if start.id == node.id and i < self.node.c:
+                    return None
+        except NoResponse:
+            return None
+        return start.id, self.node.id
+
+    def bootstrap(self, node: NodeRef) -> bool:
+        """
+        Fetches the snapshot of a node in pieces and loads into the storage the keys this node
+        will hold after joining, keeping the stored data that is newer. If the snapshot is
+        replaced while being fetched the pieces no longer match, and the incremental transfers
+        bring the data instead.
+
+        Args:
+            node: The node to fetch the snapshot from.
+
+        Returns:
+            True if the snapshot was loaded.
+        """
+        start = time.monotonic()
+        interval = self.bootstrap_interval(node)
+        partial = f'{self.snapshot_path}.{node.ip}_{node.port}'
+        offset, total, loaded = 0, None, 0
+        try:
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            with open(partial, 'wb') as file:
+                while total is None or offset < total:
+                    response = node.get_snapshot_chunk(offset)
+                    if response is None or not response[1] or total not in (None, response[0]):
+                        logging.info(f'Nodo {node.ip} no pudo enviar su instantánea')
+                        return False
+                    total, chunk = response
+                    file.write(chunk)
+                    offset += len(chunk)
+            loaded = self.storage.load_snapshot(partial, interval)
+        except (OSError, ValueError) as e:
+            logging.error(f'Error cargando la instantánea de {node.ip}: {e}')
+            return False
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        logging.info(f'Instantánea de {node.ip} cargada: {total} bytes, {loaded} llaves en {time.monotonic() - start:.3f}s')
+        return True
+
+    def snapshot_periodically(self):
+        """
+        Writes a snapshot of the storage every SNAPSHOT_FREQ seconds.
+        """
+        while True:
+            time.sleep(SNAPSHOT_FREQ)
+            if not SNAPSHOTS:
+                continue
+            try:
+                self.snapshot()
+            except Exception as e:
+                logging.error(f'Error escribiendo la instantánea del almacenamiento: {e}')
+
     def fix_storage(self):
         while True:
             try:
                 logging.info('Arreglando almacenamiento')
 
-                with self.storage.storage_lock:
-                    dict, _ = self.storage.get_all()
-                    logging.info(f'Longitud actual de almacenamiento: {len(dict)}')
+                # The owners of the keys moved with the members of a ring with virtual nodes
+                if self.node.membership.virtual and self.node.membership.epoch != self.epoch:
+                    self.rebalance()
+
+                logging.info(f'Longitud actual de almacenamiento: {self.storage.count()}')
 
                 with self.node.succ_lock:
                     succ_len = len(self.node.successors)
@@ -360,4 +710,4 @@ class Replicator:
             except Exception as e:
                 logging.error(f'Error en hilo de arreglo de almacenamiento: {e}')
 
-            time.sleep(FIX_STORAGE_FREQ)
\ No newline at end of file
+            time.sleep(FIX_STORAGE_FREQ)
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from chord.constants import MAINTENANCE_MIN_FACTOR, MAINTENANCE_MAX_FACTOR, MAINTENANCE_BACKOFF, MAINTENANCE_STABLE_ROUNDS, MAINTENANCE_JITTER
+
+
+class AdaptiveInterval:
+    """
+    Interval between the rounds of a maintenance loop that adapts to the state of the ring.
+
+    A topology change drops the interval to its minimum and wakes the loop right away;
+    after MAINTENANCE_STABLE_ROUNDS rounds in a row without changes the interval grows by
+    MAINTENANCE_BACKOFF, up to its maximum. Every wait is jittered so the nodes of a ring
+    do not run their maintenance in lockstep.
+
+    Attributes:
+        interval (float): Current seconds between rounds, before jitter.
+        rounds (int): Rounds run.
+        changes (int): Rounds or events that found the topology changed.
+        rpcs (int): RPCs sent by the loop.
+        converging_since (float): Monotonic time of the first change not yet followed by a stable round.
+        last_convergence (float): Seconds from the last change until the loop saw the ring stable.
+        total_convergence (float): Accumulated convergence seconds.
+        convergences (int): Number of convergences measured.
+    """
+
+    def __init__(self, base: float, minimum: Optional[float] = None, maximum: Optional[float] = None) -> None:
+        """
+        Initializes the interval at its base value.
+
+        Args:
+            base (float): The starting interval, usually the loop's *_FREQ constant.
+            minimum (float): The shortest interval; by default base * MAINTENANCE_MIN_FACTOR.
+            maximum (float): The longest interval; by default base * MAINTENANCE_MAX_FACTOR.
+        """
+        self.minimum = base * MAINTENANCE_MIN_FACTOR if minimum is None else minimum
+        self.maximum = base * MAINTENANCE_MAX_FACTOR if maximum is None else maximum
+        self.interval = base
+        self.stable = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.woken = False  # A wake up not yet consumed by wait()
+
+        self.rounds = 0
+        self.changes = 0
+        self.rpcs = 0
+        self.converging_since: Optional[float] = None
+        self.last_convergence = 0.0
+        self.total_convergence = 0.0
+        self.convergences = 0
+
+    def changed(self, wake: bool = True):
+        """
+        Records a topology change: the next rounds run at the minimum interval.
+
+        Args:
+            wake (bool): Whether to run the next round right away; False when the loop itself found the change.
+        """
+        with self.lock:
+            self.changes += 1
+            self.stable = 0
+            self.interval = self.minimum
+            if self.converging_since is None:
+                self.converging_since = time.monotonic()
+            if wake:
+                self.woken = True
+                self.wake.notify_all()
+
+    def unchanged(self):
+        """
+        Records a round that found nothing to change, backing off after enough of them.
+        """
+        with self.lock:
+            if self.converging_since is not None:
+                self.last_convergence = time.monotonic() - self.converging_since
+                self.total_convergence += self.last_convergence
+                self.convergences += 1
+                self.converging_since = None
+
+            self.stable += 1
+            if self.stable >= MAINTENANCE_STABLE_ROUNDS:
+                self.stable = 0
+                self.interval = min(self.maximum, self.interval * MAINTENANCE_BACKOFF)
+
+    def record_round(self, rpcs: int):
+        """
+        Records a finished round.
+
+        Args:
+            rpcs (int): RPCs sent during the round.
+        """
+        with self.lock:
+            self.rounds += 1
+            self.rpcs += rpcs
+
+    def wait(self):
+        """
+        Sleeps until the next round is due or a topology change wakes the loop. A wake up
+        is consumed under the lock it is raised with, so one that arrives while the round
+        runs, or just as the wait times out, still makes the next wait return at once.
+        """
+        with self.lock:
+            if not self.woken:
+                self.wake.wait(self.interval * random.uniform(1 - MAINTENANCE_JITTER, 1 + MAINTENANCE_JITTER))
+            self.woken = False
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns the current interval and the counters of the loop.
+        """
+        with self.lock:
+            return {
+                'interval': round(self.interval, 3),
+                'rounds': self.rounds,
+                'changes': self.changes,
+                'rpcs': self.rpcs,
+                'converging': self.converging_since is not None,
+                'last_convergence': round(self.last_convergence, 3),
+                'avg_convergence': round(self.total_convergence / (self.convergences or 1), 3),
+            }
@@ -0,0 +1,107 @@
+import mmap
+import os
+import struct
+import zlib
+from typing import List, Optional, Tuple
+
+from chord.utils import getShaRepr, is_in_interval
+
+# File header: magic and number of records; every record is a RECORD header followed by
+# the key and the value, and the file ends with the crc32 of everything before it
+MAGIC = b'CHSNAP01'
+HEADER = struct.Struct('!8sQ')
+RECORD = struct.Struct('!IIqB')
+FOOTER = struct.Struct('!I')
+
+# A key with its value, version and active flag
+Record = Tuple[str, str, int, bool]
+
+
+def write_snapshot(path: str, records: List[Record]) -> int:
+    """
+    Writes a snapshot of the given data. The file is written aside and renamed over the
+    previous snapshot once on disk, so a crash never leaves a partial snapshot behind.
+
+    Args:
+        path (str): The snapshot file.
+        records (List[Record]): The data, including the removed keys.
+
+    Returns:
+        int: The size of the snapshot in bytes.
+    """
+    parts = [HEADER.pack(MAGIC, len(records))]
+    for key, value, version, active in records:
+        key_bytes, value_bytes = key.encode(), value.encode()
+        parts.append(RECORD.pack(len(key_bytes), len(value_bytes), version, active))
+        parts.append(key_bytes)
+        parts.append(value_bytes)
+    body = b''.join(parts)
+    content = body + FOOTER.pack(zlib.crc32(body))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    partial = f'{path}.tmp'
+    with open(partial, 'wb') as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+    return len(content)
+
+
+def read_snapshot(path: str, interval: Optional[Tuple[int, int]] = None) -> List[Record]:
+    """
+    Reads a snapshot, mapping the file into memory instead of reading it into a buffer.
+
+    Args:
+        path (str): The snapshot file.
+        interval (Tuple[int, int]): If given, only the keys whose hash falls in the ring
+            interval (start, end] are read; the values of the others are not even decoded.
+
+    Returns:
+        List[Record]: The data in the snapshot.
+
+    Raises:
+        ValueError: If the file is not a snapshot or is corrupt.
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < HEADER.size + FOOTER.size:
+            raise ValueError(f'Instantánea {path} incompleta')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            end = len(view) - FOOTER.size
+            (crc,) = FOOTER.unpack_from(view, end)
+            if zlib.crc32(memoryview(view)[:end]) != crc:
+                raise ValueError(f'Instantánea {path} corrupta')
+            magic, count = HEADER.unpack_from(view, 0)
+            if magic != MAGIC:
+                raise ValueError(f'{path} no es una instantánea')
+
+            records: List[Record] = []
+            offset = HEADER.size
+            for _ in range(count):
+                key_len, value_len, version, active = RECORD.unpack_from(view, offset)
+                offset += RECORD.size
+                key = view[offset:offset + key_len].decode()
+                offset += key_len
+                if interval is None or is_in_interval(getShaRepr(key), *interval):
+                    records.append((key, view[offset:offset + value_len].decode(), version, bool(active)))
+                offset += value_len
+            return records
+
+
+def read_chunk(path: str, offset: int, size: int) -> Tuple[int, bytes]:
+    """
+    Reads a piece of a snapshot file, to ship it to another node.
+
+    Args:
+        path (str): The snapshot file.
+        offset (int): Where the piece starts.
+        size (int): Longest piece to read.
+
+    Returns:
+        Tuple[int, bytes]: The size of the whole file and the piece.
+    """
+    with open(path, 'rb') as file:
+        total = os.fstat(file.fileno()).st_size
+        return total, os.pread(file.fileno(), size, offset)
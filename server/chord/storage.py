@@ -1,6 +1,10 @@
+import bisect
 import threading
 import logging
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from chord.snapshot import read_snapshot, write_snapshot
+from chord.utils import getShaRepr
 
 class Data:
     """
@@ -34,6 +38,58 @@ class DefaultData(Data):
     def __init__(self) -> None:
         super().__init__('', 0)
 
+class HashIndex:
+    """
+    Keys ordered by their position on the ring, to find the ones falling in an interval of ids.
+
+    New keys are queued unsorted and merged into the ordered list on the next query, so writes
+    only pay for hashing the key. Keys are never dropped, as removed ones are kept inactive.
+    Callers hold the storage lock.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Tuple[int, str]] = []  # (hash, key), sorted
+        self.pending: List[Tuple[int, str]] = []  # (hash, key), not merged yet
+
+    def __len__(self) -> int:
+        return len(self.entries) + len(self.pending)
+
+    def add(self, key: str):
+        """
+        Adds a new key to the index.
+
+        :param key: The key, which must not be in the index already.
+        """
+        self.pending.append((getShaRepr(key), key))
+
+    def merge(self):
+        """
+        Merges the queued keys into the ordered list.
+        """
+        if self.pending:
+            self.entries.extend(self.pending)
+            self.entries.sort()  # Two sorted runs once the queue is sorted, merged in linear time
+            self.pending = []
+
+    def keys_in_interval(self, start: int, end: int) -> List[str]:
+        """
+        Retrieves the keys whose hash is in the interval (start, end], wrapping around 0 if
+        start >= end, like is_in_interval.
+
+        :param start: Start of the interval (exclusive).
+        :param end: End of the interval (inclusive).
+        :return: The keys, in ring order from start.
+        """
+        self.merge()
+        low = bisect.bisect_right(self.entries, start, key=lambda entry: entry[0])
+        high = bisect.bisect_right(self.entries, end, key=lambda entry: entry[0])
+        if start < end:
+            selected = self.entries[low:high]
+        else:
+            selected = self.entries[low:] + self.entries[:high]
+        return [key for _, key in selected]
+
+
 class Storage:
     """
     Class managing data storage with support for concurrency.
@@ -42,6 +98,7 @@ class Storage:
     def __init__(self) -> None:
         self.storage_lock = threading.RLock()  # Lock for concurrent access
         self.storage: Dict[str, Data] = {}  # Dictionary storing the data
+        self.ring = HashIndex()  # Keys ordered by hash
 
     def get(self, key: str) -> Tuple[Data, bool]:
         """
@@ -64,6 +121,8 @@ class Storage:
         """
         with self.storage_lock:
             data.active = True
+            if key not in self.storage:
+                self.ring.add(key)
             self.storage[key] = data
             logging.info(f"Llave '{key}' guardada con versión {data.version}.")
         return True
@@ -89,6 +148,37 @@ class Storage:
             logging.warning(f"Se intentó eliminar una llave que no existe: '{key}'.")
         return False
     
+    def get_keys(self, active: Optional[bool] = None) -> List[str]:
+        """
+        Retrieves every key in storage, including the ones marked as removed, in sorted order.
+
+        :param active: If given, only the keys whose active flag matches it.
+        :return: A sorted list with the keys.
+        """
+        with self.storage_lock:
+            return sorted(key for key, data in self.storage.items() if active is None or data.active == active)
+
+    def count(self) -> int:
+        """
+        Counts the active data items without copying them.
+
+        :return: The number of active keys.
+        """
+        with self.storage_lock:
+            return sum(1 for data in self.storage.values() if data.active)
+
+    def keys_in_interval(self, start: int, end: int) -> List[str]:
+        """
+        Retrieves the keys, including the ones marked as removed, whose hash falls in the ring
+        interval (start, end], wrapping around 0 if start >= end.
+
+        :param start: Start of the interval (exclusive).
+        :param end: End of the interval (inclusive).
+        :return: The keys, in ring order from start.
+        """
+        with self.storage_lock:
+            return self.ring.keys_in_interval(start, end)
+
     def get_all(self) -> Tuple[Dict[str, Data], bool]:
         """
         Retrieves all active data items from storage.
@@ -121,6 +211,8 @@ class Storage:
         with self.storage_lock:
             for key, data in new_data.items():
                 data.active = True
+                if key not in self.storage:
+                    self.ring.add(key)
                 self.storage[key] = data
             logging.info(f"Almacenados {len(new_data)} elementos.")
         return True
@@ -143,3 +235,35 @@ class Storage:
                 else:
                     logging.warning(f"Se intentó eliminar una llave que no existe: '{key}'.")
         return True
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Writes every data item, including the removed ones, to a snapshot file.
+
+        :param path: The snapshot file.
+        :return: The size of the snapshot in bytes.
+        """
+        with self.storage_lock:
+            records = [(key, data.value, data.version, data.active) for key, data in self.storage.items()]
+        return write_snapshot(path, records)
+
+    def load_snapshot(self, path: str, interval: Optional[Tuple[int, int]] = None) -> int:
+        """
+        Loads the data items of a snapshot file, keeping the stored ones that are newer.
+
+        :param path: The snapshot file.
+        :param interval: If given, only the keys whose hash falls in the ring interval (start, end] are loaded.
+        :return: The number of data items loaded.
+        """
+        records = read_snapshot(path, interval)
+        loaded = 0
+        with self.storage_lock:
+            for key, value, version, active in records:
+                current = self.storage.get(key)
+                if current is None:
+                    self.ring.add(key)
+                if current is None or current.version < version:
+                    self.storage[key] = Data(value, version, active)
+                    loaded += 1
+        logging.info(f"Cargados {loaded} de {len(records)} elementos de la instantánea {path}.")
+        return loaded
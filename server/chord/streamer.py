@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from chord.storage import Storage
+from chord.node_ref import NodeRef
+from chord.constants import PARTITION_CHUNK, STREAM_CHUNK_BYTES, STREAM_WINDOW, STREAM_RETRIES, STREAM_RETRY_DELAY, STREAM_TRANSFER_TTL
+from chord.utils import encode_dict
+
+# Encoded values, versions and removals of a chunk
+Chunk = Tuple[str, str, str]
+
+
+class IncomingTransfer:
+    """
+    Receiver-side progress of a streamed transfer.
+
+    Attributes:
+        acked (int): Highest sequence number such that every chunk up to it was applied.
+        applied (Set[int]): Applied chunks beyond `acked`, received out of order.
+        last_seen (float): Monotonic time of the last chunk received.
+    """
+
+    def __init__(self) -> None:
+        self.acked = -1
+        self.applied: Set[int] = set()
+        self.last_seen = time.monotonic()
+
+
+class PartitionStreamer:
+    """
+    Streams the contents of a storage to another node as a sequence of bounded chunks.
+
+    The sender keeps a window of chunks in flight and, if the connection drops, asks the
+    receiver for the last chunk it acknowledged and resumes from there. The receiver applies
+    every chunk as soon as it arrives, so neither side holds the whole partition in memory.
+    """
+
+    def __init__(self, storage: Storage) -> None:
+        """
+        Initializes the streamer for a storage.
+
+        Args:
+            storage: The storage whose contents are streamed and where received chunks are applied.
+        """
+        self.storage = storage
+        self.incoming: Dict[str, IncomingTransfer] = {}
+        self.incoming_lock = threading.Lock()
+
+    def build_chunk(self, keys: List[str], boundaries: List[Tuple[int, int]], seq: int) -> Optional[Chunk]:
+        """
+        Builds the chunk with the given sequence number, reading the current data from storage.
+
+        The key range of each chunk is fixed the first time it is built, so a resumed
+        transfer sends exactly the same chunks again.
+
+        Args:
+            keys: The sorted keys being transferred.
+            boundaries: The key ranges of the chunks built so far; extended in place.
+            seq: The sequence number of the chunk.
+
+        Returns:
+            Chunk: The encoded chunk, or None if every key has already been chunked.
+        """
+        values: Dict[str, str] = {}
+        versions: Dict[str, int] = {}
+        removed: Dict[str, int] = {}
+
+        if seq < len(boundaries):
+            start, end = boundaries[seq]
+        else:
+            start = boundaries[-1][1] if boundaries else 0
+            end = len(keys)
+        if start >= len(keys):
+            return None
+
+        size = 0
+        index = start
+        while index < end and (size < STREAM_CHUNK_BYTES or seq < len(boundaries)):
+            key = keys[index]
+            index += 1
+            data, empty = self.storage.get(key)
+            if empty and data.active:
+                continue
+            if data.active:
+                values[key] = data.value
+                versions[key] = data.version
+            else:
+                removed[key] = data.version
+            size += len(key) + len(data.value)
+
+        if seq == len(boundaries):
+            boundaries.append((start, index))
+        return encode_dict(values), encode_dict(versions), encode_dict(removed)
+
+    def stream(self, node: NodeRef, op: int = PARTITION_CHUNK, on_response: Callable[[List[str]], None] = None, keys: Optional[List[str]] = None, sent: Optional[Dict[str, int]] = None) -> Optional[bool]:
+        """
+        Streams every key in storage, or only the given ones, to a node.
+
+        Args:
+            node: The node receiving the data.
+            op: The chunk operation, PARTITION_CHUNK to overwrite or RESOLVE_CHUNK to resolve versions.
+            on_response: Called with the response of every acknowledged RESOLVE_CHUNK.
+            keys: The keys to send; every key in storage if None.
+            sent: Accumulates the 'bytes' of the chunks sent, resent ones included.
+
+        Returns:
+            bool: Whether every chunk was acknowledged, or None if the node does not support streaming.
+        """
+        transfer_id = uuid.uuid4().hex
+        keys = sorted(keys) if keys is not None else self.storage.get_keys()
+        boundaries: List[Tuple[int, int]] = []
+        seq = 0
+        attempts = 0
+        any_acked = False
+
+        with ThreadPoolExecutor(max_workers=STREAM_WINDOW, thread_name_prefix='chord-stream') as executor:
+            while True:
+                in_flight: Dict[Future, int] = {}
+                failed = False
+                done = False
+
+                while not failed and (in_flight or not done):
+                    # Keep up to STREAM_WINDOW chunks waiting for their acknowledgement
+                    while not done and len(in_flight) < STREAM_WINDOW:
+                        chunk = self.build_chunk(keys, boundaries, seq)
+                        if chunk is None:
+                            done = True
+                            break
+                        in_flight[executor.submit(node.send_chunk, op, transfer_id, seq, *chunk)] = seq
+                        if sent is not None:
+                            sent['bytes'] = sent.get('bytes', 0) + sum(len(part) for part in chunk)
+                        seq += 1
+
+                    if not in_flight:
+                        break
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        in_flight.pop(future)
+                        ok, response = future.result()
+                        if not ok:
+                            failed = True
+                            continue
+                        any_acked = True
+                        if on_response:
+                            on_response(response)
+
+                if not failed:
+                    logging.info(f'Transferencia {transfer_id} a {node.ip} completada en {len(boundaries)} fragmentos')
+                    return True
+
+                # Let the chunks still in flight settle before asking where to resume
+                for future in wait(in_flight).done:
+                    ok, response = future.result()
+                    any_acked = any_acked or ok
+                    if ok and on_response:
+                        on_response(response)
+
+                attempts += 1
+                if attempts > STREAM_RETRIES:
+                    logging.error(f'Transferencia {transfer_id} a {node.ip} abandonada tras {attempts} intentos')
+                    return False
+
+                time.sleep(STREAM_RETRY_DELAY * attempts)
+                acked = node.transfer_status(transfer_id)
+                if acked is None and not any_acked:
+                    # The node never acknowledged anything and does not answer status queries
+                    return None
+                # Chunks are idempotent, so without a status the transfer restarts from the beginning
+                seq = (acked if acked is not None else -1) + 1
+                logging.info(f'Reanudando transferencia {transfer_id} a {node.ip} desde el fragmento {seq}')
+
+    def receive(self, transfer_id: str, seq: int, apply: Callable[[], object]) -> object:
+        """
+        Applies a received chunk and records it as acknowledged when it succeeds.
+
+        Args:
+            transfer_id: The id of the transfer the chunk belongs to.
+            seq: The sequence number of the chunk.
+            apply: Applies the chunk to storage and returns the response for the sender;
+                a falsy response means the chunk was not applied.
+
+        Returns:
+            The response returned by `apply`.
+        """
+        now = time.monotonic()
+        with self.incoming_lock:
+            for expired in [id for id, transfer in self.incoming.items() if now - transfer.last_seen > STREAM_TRANSFER_TTL]:
+                del self.incoming[expired]
+            transfer = self.incoming.setdefault(transfer_id, IncomingTransfer())
+            transfer.last_seen = now
+
+        response = apply()
+        if not response:
+            return response
+
+        with self.incoming_lock:
+            transfer.applied.add(seq)
+            while transfer.acked + 1 in transfer.applied:
+                transfer.acked += 1
+                transfer.applied.discard(transfer.acked)
+        return response
+
+    def acked(self, transfer_id: str) -> int:
+        """
+        Returns the highest sequence number up to which every chunk of a transfer was applied.
+
+        Args:
+            transfer_id: The id of the transfer.
+
+        Returns:
+            int: The sequence number, or -1 if no chunk of the transfer was applied.
+        """
+        with self.incoming_lock:
+            transfer = self.incoming.get(transfer_id)
+            return transfer.acked if transfer else -1
@@ -0,0 +1,755 @@
+import itertools
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from chord.utils import send_message, recv_message
+from chord.metrics import RpcMetrics
+from chord.deadline import DeadlineExceeded, expired, remaining
+from chord.health import PeerUnavailable, health
+from chord.protocol import CAP_ZLIB, CAPABILITIES, DEADLINE_VERSION, LEGACY_VERSION, PROTOCOL_VERSION, Field, decode_message, decode_response, encode_legacy, encode_message, is_binary
+from chord.constants import BATCH, HELLO, PING, PING_LEADER, HEALTH_PROBE_FREQ, RPC_TIMEOUT, POOL_MAX_CONNECTIONS, POOL_MAX_IN_FLIGHT, POOL_IDLE_TIMEOUT, BATCH_WINDOW, BATCH_MAX_SIZE
+from chord.constants import RPC_TIMEOUT_MIN, RTT_WINDOW, RTT_MIN_SAMPLES, RTT_TIMEOUT_PERCENTILE, RTT_TIMEOUT_FACTOR, PROXIMITY_ALPHA
+
+
+class TransportStats:
+    """
+    Thread-safe counters describing how connections to peers are being reused.
+
+    Attributes:
+        requests (int): Number of requests sent.
+        reused (int): Number of requests sent over an already open connection.
+        opened (int): Number of connections opened.
+        evicted (int): Number of idle connections closed by the pool.
+        failed (int): Number of connections dropped because of an error.
+        batches (int): Number of BATCH frames sent.
+        batched (int): Number of operations carried inside BATCH frames.
+        rejected (int): Number of requests failed fast because the peer was suspect.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.reused = 0
+        self.opened = 0
+        self.evicted = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched = 0
+        self.rejected = 0
+
+    def incr(self, name: str, amount: int = 1):
+        """
+        Increments the counter with the given name.
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns a copy of the counters.
+        """
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'reused': self.reused,
+                'opened': self.opened,
+                'evicted': self.evicted,
+                'failed': self.failed,
+                'batches': self.batches,
+                'batched': self.batched,
+                'rejected': self.rejected,
+            }
+
+
+# Liveness probes always reach the peer, whatever its breaker says, so a peer is only
+# declared dead by the checks built on them and never because of its breaker alone
+LIVENESS_OPS = (PING, PING_LEADER)
+
+stats = TransportStats()
+metrics = RpcMetrics()  # Client side latency and traffic of every operation sent
+local = threading.local()  # Per-thread RPC count, so every maintenance loop can measure its own traffic
+
+
+def count_rpc():
+    """
+    Counts an RPC sent by the current thread.
+    """
+    local.rpcs = getattr(local, 'rpcs', 0) + 1
+
+
+def thread_rpcs() -> int:
+    """
+    Returns the number of RPCs sent so far by the current thread.
+    """
+    return getattr(local, 'rpcs', 0)
+
+
+class Connection:
+    """
+    A persistent connection to a peer that multiplexes several in-flight requests.
+
+    Requests are tagged with a request id and a reader thread matches every response
+    with the request waiting for it, so responses may arrive in any order. Peers that
+    predate the binary protocol serve a single request per connection, so for them every
+    request opens a connection of its own instead.
+    """
+
+    def __init__(self, ip: str, port: int) -> None:
+        """
+        Opens the connection and starts its reader thread.
+
+        Args:
+            ip (str): IP address of the peer.
+            port (int): Port of the peer.
+        """
+        self.ip = ip
+        self.port = port
+        left = remaining()
+        connect_timeout = RPC_TIMEOUT if left is None else max(0.001, min(RPC_TIMEOUT, left))
+        self.sock = socket.create_connection((ip, port), timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        self.last_used = time.monotonic()
+        self.version = LEGACY_VERSION
+        self.compress = False
+
+        try:
+            self.handshake()
+        except Exception as e:
+            self.close(e)
+            raise
+        if self.version != LEGACY_VERSION:
+            threading.Thread(target=self.read_responses, daemon=True).start()
+
+    def handshake(self):
+        """
+        Negotiates the protocol version and the optional capabilities (compression) with the peer.
+
+        The HELLO goes as an untagged legacy text frame, which every peer can read. Peers that
+        predate the binary protocol answer it with an empty frame and close the connection, in
+        which case the legacy text protocol is used, one connection per request.
+        """
+        left = remaining()
+        timeout = RPC_TIMEOUT if left is None else max(0.001, min(RPC_TIMEOUT, left))
+        self.sock.settimeout(timeout)
+        send_message(self.sock, encode_legacy(HELLO, [PROTOCOL_VERSION, CAPABILITIES]))
+        _, response = recv_message(self.sock, tagged=False)
+        self.sock.settimeout(None)  # The reader blocks until a response or the connection closes
+
+        if is_binary(response):
+            _, _, _, fields = decode_message(response)
+            self.version = min(int(fields[0]), PROTOCOL_VERSION)
+            capabilities = int(fields[1]) if len(fields) > 1 else 0
+            self.compress = bool(capabilities & CAP_ZLIB)
+        else:
+            self.sock.close()
+        logging.debug(f'Protocolo versión {self.version} negociado con {self.ip}, compresión: {self.compress}')
+
+    def call(self, op: int, fields: List[Field], timeout: float, raw: bool = False) -> List[Field]:
+        """
+        Sends an operation in the negotiated protocol version and decodes its response.
+
+        The wait is cut to whatever is left of the deadline of the calling thread, and
+        peers that understand it receive that budget so their own nested calls inherit it.
+
+        Args:
+            op (int): The operation code.
+            fields (List[Field]): The fields of the request.
+            timeout (float): Seconds to wait for the response.
+            raw (bool): Whether to return binary fields as bytes instead of text.
+
+        Returns:
+            List[Field]: The fields of the response.
+
+        Raises:
+            DeadlineExceeded: If the deadline of the calling thread already passed.
+        """
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f'Plazo agotado antes de enviar operación {op} a {self.ip}')
+            timeout = min(timeout, left)
+
+        started_at = time.monotonic()
+        if self.version == LEGACY_VERSION:
+            message = encode_legacy(op, fields)
+        elif self.version >= DEADLINE_VERSION:
+            message = encode_message(op, fields, version=self.version, compress=self.compress, budget=timeout)
+        else:
+            message = encode_message(op, fields, version=self.version, compress=self.compress)
+
+        try:
+            response = self.request(message, timeout)
+        except Exception:
+            metrics.record(op, time.monotonic() - started_at, 0, len(message), error=True)
+            raise
+        metrics.record(op, time.monotonic() - started_at, len(response), len(message))
+        return decode_response(response, self.version, raw)
+
+    def call_batch(self, calls: List[Tuple[int, List[Field]]], timeout: float) -> List[List[str]]:
+        """
+        Sends several operations in a single BATCH frame and decodes their responses.
+        Peers speaking the legacy protocol get the operations one by one instead.
+
+        Args:
+            calls (List[Tuple[int, List[Field]]]): The operation codes and fields to send.
+            timeout (float): Seconds to wait for the response.
+
+        Returns:
+            List[List[str]]: The fields of the response to each operation, in order.
+        """
+        if self.version == LEGACY_VERSION:
+            return [self.call(op, fields, timeout) for op, fields in calls]
+
+        subs = [encode_message(op, fields, version=self.version) for op, fields in calls]
+        responses = self.call(BATCH, subs, timeout, raw=True)
+        return [decode_response(response, self.version) for response in responses]
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of requests waiting for a response.
+        """
+        return len(self.pending)
+
+    def request(self, message: bytes, timeout: float) -> bytes:
+        """
+        Sends a message and waits for its response.
+
+        Args:
+            message (bytes): The encoded request.
+            timeout (float): Seconds to wait for the response.
+
+        Returns:
+            bytes: The response sent by the peer.
+
+        Raises:
+            ConnectionError: If the connection is or becomes closed.
+            TimeoutError: If the response does not arrive in time.
+        """
+        if self.version == LEGACY_VERSION:
+            return self.request_once(message, timeout)
+
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise ConnectionError(f'Conexión a {self.ip} cerrada')
+            request_id = next(self.ids) & 0xFFFFFFFF
+            self.pending[request_id] = future
+
+        try:
+            try:
+                with self.send_lock:
+                    send_message(self.sock, message, request_id)
+            except OSError as e:
+                self.close(e)
+                raise
+            return future.result(timeout)
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+                self.last_used = time.monotonic()
+
+    def request_once(self, message: bytes, timeout: float) -> bytes:
+        """
+        Sends a message to a legacy peer through a connection of its own and waits for its response.
+
+        Args:
+            message (bytes): The encoded request.
+            timeout (float): Seconds to wait for the response.
+
+        Returns:
+            bytes: The response sent by the peer.
+        """
+        if self.closed:
+            raise ConnectionError(f'Conexión a {self.ip} cerrada')
+        with socket.create_connection((self.ip, self.port), timeout=timeout) as sock:
+            send_message(sock, message)
+            _, response = recv_message(sock, tagged=False)
+        self.last_used = time.monotonic()
+        return response
+
+    def read_responses(self):
+        """
+        Reader thread: delivers each response to the request waiting for it.
+        """
+        try:
+            while True:
+                request_id, message = recv_message(self.sock)
+                with self.lock:
+                    future = self.pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(message)
+        except Exception as e:
+            self.close(e)
+
+    def close(self, error: Exception = None):
+        """
+        Closes the connection and fails every request still waiting for a response.
+
+        Args:
+            error (Exception): The reason the connection is being closed, if any.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending = list(self.pending.values())
+            self.pending.clear()
+
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+        for future in pending:
+            future.set_exception(ConnectionError(f'Conexión a {self.ip} cerrada: {error}'))
+
+
+class Batcher:
+    """
+    Gathers the operations sent to a peer within a short window and sends them as a single BATCH.
+    """
+
+    def __init__(self, pool: 'ConnectionPool') -> None:
+        """
+        Initializes an empty batcher for a pool.
+
+        Args:
+            pool (ConnectionPool): The pool the batches are sent through.
+        """
+        self.pool = pool
+        self.lock = threading.Lock()
+        self.calls: List[Tuple[int, List[Field], Future]] = []
+        self.timer: Optional[threading.Timer] = None
+
+    def submit(self, op: int, fields: List[Field]) -> Future:
+        """
+        Queues an operation for the next batch.
+
+        Args:
+            op (int): The operation code.
+            fields (List[Field]): The fields of the request.
+
+        Returns:
+            Future: Resolves to the fields of the response, or to the error that prevented sending it.
+        """
+        future = Future()
+        with self.lock:
+            self.calls.append((op, fields, future))
+            if len(self.calls) >= BATCH_MAX_SIZE:
+                calls = self.take()
+            else:
+                calls = None
+                if self.timer is None:
+                    self.timer = threading.Timer(BATCH_WINDOW, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+
+        # A full batch is sent right away by the caller that filled it
+        if calls:
+            self.send(calls)
+        return future
+
+    def take(self) -> List[Tuple[int, List[Field], Future]]:
+        """
+        Empties the queue and cancels the pending flush. Must be called holding the lock.
+        """
+        calls, self.calls = self.calls, []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return calls
+
+    def flush(self):
+        """
+        Sends the queued operations, if any.
+        """
+        with self.lock:
+            calls = self.take()
+        if calls:
+            self.send(calls)
+
+    def send(self, calls: List[Tuple[int, List[Field], Future]]):
+        """
+        Sends a batch and resolves the future of every operation in it.
+        """
+        try:
+            responses = self.pool.call_batch([(op, fields) for op, fields, _ in calls])
+        except Exception as e:
+            for _, _, future in calls:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), response in zip(calls, responses):
+            future.set_result(response)
+
+
+class RttWindow:
+    """
+    The latest round trip times of an operation to a peer, used to size its timeout.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=RTT_WINDOW)
+        self.timeout: Optional[float] = None  # Cached until the next sample arrives
+
+    def add(self, seconds: float):
+        """
+        Records a round trip time.
+
+        Args:
+            seconds (float): The round trip time, or the timeout for requests that timed out.
+        """
+        with self.lock:
+            self.samples.append(seconds)
+            self.timeout = None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Returns a percentile of the recent round trip times.
+
+        Args:
+            p (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The round trip time, or None while there are fewer than RTT_MIN_SAMPLES samples.
+        """
+        with self.lock:
+            if len(self.samples) < RTT_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def get_timeout(self, ceiling: float) -> float:
+        """
+        Returns the timeout for the next request: a multiple of a high percentile of the
+        recent round trip times, never below RPC_TIMEOUT_MIN nor above `ceiling`.
+
+        Args:
+            ceiling (float): The timeout requested by the caller.
+
+        Returns:
+            float: The timeout to use.
+        """
+        with self.lock:
+            if len(self.samples) < RTT_MIN_SAMPLES:
+                return ceiling
+            if self.timeout is None:
+                ordered = sorted(self.samples)
+                rtt = ordered[min(len(ordered) - 1, len(ordered) * RTT_TIMEOUT_PERCENTILE // 100)]
+                self.timeout = max(RPC_TIMEOUT_MIN, rtt * RTT_TIMEOUT_FACTOR)
+            return min(ceiling, self.timeout)
+
+
+class ConnectionPool:
+    """
+    The set of persistent connections kept open towards a single peer.
+    """
+
+    def __init__(self, ip: str, port: int) -> None:
+        """
+        Initializes an empty pool.
+
+        Args:
+            ip (str): IP address of the peer.
+            port (int): Port of the peer.
+        """
+        self.ip = ip
+        self.port = port
+        self.lock = threading.Lock()
+        self.connections: List[Connection] = []
+        self.opening = 0  # Connections being opened right now
+        self.batcher = Batcher(self)
+        self.rtt: Dict[int, RttWindow] = {}  # Recent round trip times per operation
+        self.health = health.get(ip, port)  # Circuit breaker shared by every caller
+        self.proximity: Optional[float] = None  # Smoothed ping round trip time, the network distance to the peer
+
+    def acquire(self) -> Connection:
+        """
+        Picks the least loaded open connection, opening a new one when all of them are busy.
+
+        Returns:
+            Connection: The connection to send the next request through.
+        """
+        with self.lock:
+            self.connections = [conn for conn in self.connections if not conn.closed]
+            best = min(self.connections, key=lambda conn: conn.in_flight, default=None)
+            full = len(self.connections) + self.opening >= POOL_MAX_CONNECTIONS
+            if best is not None and (best.in_flight < POOL_MAX_IN_FLIGHT or full):
+                stats.incr('reused')
+                return best
+            self.opening += 1
+
+        try:
+            conn = Connection(self.ip, self.port)
+        finally:
+            with self.lock:
+                self.opening -= 1
+
+        stats.incr('opened')
+        with self.lock:
+            self.connections.append(conn)
+        return conn
+
+    def acquire_or_record(self, op: int) -> Connection:
+        """
+        Acquires a connection, recording a failed `op` in the client metrics if none can be opened.
+
+        Args:
+            op (int): The operation about to be sent.
+
+        Returns:
+            Connection: The connection to send the operation through.
+
+        Raises:
+            PeerUnavailable: If the peer is suspect, without trying to reach it, unless `op` is a liveness probe.
+        """
+        if op not in LIVENESS_OPS and not self.health.allow():
+            stats.incr('rejected')
+            metrics.record(op, 0.0, error=True)
+            raise PeerUnavailable(f'Nodo {self.ip}:{self.port} sospechoso, operación {op} descartada')
+
+        started_at = time.monotonic()
+        try:
+            return self.acquire()
+        except OSError as e:
+            stats.incr('failed')
+            metrics.record(op, time.monotonic() - started_at, error=True)
+            if not isinstance(e, DeadlineExceeded):
+                self.health.failure()
+            raise
+
+    def rtt_window(self, op: int) -> RttWindow:
+        """
+        Returns the round trip times recorded for an operation, creating the window on first use.
+        """
+        window = self.rtt.get(op)
+        if window is None:
+            with self.lock:
+                window = self.rtt.setdefault(op, RttWindow())
+        return window
+
+    def timeouts(self) -> Dict[int, float]:
+        """
+        Returns the timeout currently used for every operation sent to the peer.
+        """
+        with self.lock:
+            windows = dict(self.rtt)
+        return {op: round(window.get_timeout(RPC_TIMEOUT), 3) for op, window in windows.items()}
+
+    def timed(self, op: int, timeout: float, send) -> list:
+        """
+        Runs a request with the peer's adaptive timeout for the operation, recording its round trip time.
+
+        Only transport errors count as failures of the peer. A timeout only does for liveness
+        probes: other operations may legitimately take long, like a NOTIFY waiting behind a
+        handoff, and a slow answer does not make the peer dead.
+
+        Args:
+            op (int): The operation code, used to pick the round trip window.
+            timeout (float): The longest the caller is willing to wait.
+            send: Sends the request given the timeout to use and returns its response.
+
+        Returns:
+            list: The response returned by `send`.
+
+        Raises:
+            DeadlineExceeded: If the request timed out because the caller's deadline ran out.
+        """
+        window = self.rtt_window(op)
+        timeout = window.get_timeout(timeout)
+        started_at = time.monotonic()
+        try:
+            response = send(timeout)
+        except DeadlineExceeded:
+            raise
+        except TimeoutError as e:
+            if expired():
+                raise DeadlineExceeded(f'Plazo agotado esperando operación {op} de {self.ip}') from e
+            # Count the timeout as a slow sample, so the window widens after timeouts
+            window.add(timeout)
+            if op == PING:
+                self.observe_proximity(timeout)
+            if op in LIVENESS_OPS:
+                self.health.failure()
+            raise
+        except OSError:
+            stats.incr('failed')
+            self.health.failure()
+            raise
+        rtt = time.monotonic() - started_at
+        window.add(rtt)
+        if op == PING:
+            self.observe_proximity(rtt)
+        self.health.success()
+        return response
+
+    def observe_proximity(self, seconds: float):
+        """
+        Folds a ping round trip time into the smoothed network distance to the peer.
+
+        Args:
+            seconds (float): The round trip time.
+        """
+        if self.proximity is None:
+            self.proximity = seconds
+        else:
+            self.proximity += PROXIMITY_ALPHA * (seconds - self.proximity)
+
+    def probe(self):
+        """
+        Pings a suspect peer, bypassing its open breaker, and closes the breaker if it answers.
+        """
+        try:
+            if self.acquire().call(PING, [], RPC_TIMEOUT):
+                self.health.success()
+                return
+        except Exception as e:
+            logging.debug(f'Sondeo a {self.ip}:{self.port} fallido: {e}')
+        self.health.failure()
+
+    def call(self, op: int, fields: List[Field], timeout: float = RPC_TIMEOUT, raw: bool = False) -> List[Field]:
+        """
+        Sends an operation to the peer through a pooled connection and waits for its response.
+
+        Args:
+            op (int): The operation code.
+            fields (List[Field]): The fields of the request.
+            timeout (float): Longest time to wait for the response; shortened to the peer's
+                adaptive timeout and to the caller's deadline.
+            raw (bool): Whether to return binary fields as buffers instead of text.
+
+        Returns:
+            List[Field]: The fields of the response.
+        """
+        stats.incr('requests')
+        count_rpc()
+        conn = self.acquire_or_record(op)
+        return self.timed(op, timeout, lambda timeout: conn.call(op, fields, timeout, raw))
+
+    def call_batch(self, calls: List[Tuple[int, List[Field]]], timeout: float = RPC_TIMEOUT) -> List[List[str]]:
+        """
+        Sends several operations to the peer in one round trip.
+
+        Args:
+            calls (List[Tuple[int, List[Field]]]): The operation codes and fields to send.
+            timeout (float): Seconds to wait for the response.
+
+        Returns:
+            List[List[str]]: The fields of the response to each operation, in order.
+        """
+        if len(calls) == 1:
+            op, fields = calls[0]
+            return [self.call(op, fields, timeout)]
+
+        stats.incr('requests')
+        count_rpc()
+        stats.incr('batches')
+        stats.incr('batched', len(calls))
+        conn = self.acquire_or_record(BATCH)
+        return self.timed(BATCH, timeout, lambda timeout: conn.call_batch(calls, timeout))
+
+    def evict_idle(self, now: float):
+        """
+        Closes the connections that have been idle for longer than the pool allows.
+
+        Args:
+            now (float): The current monotonic time.
+        """
+        with self.lock:
+            idle = [conn for conn in self.connections
+                    if conn.in_flight == 0 and now - conn.last_used > POOL_IDLE_TIMEOUT]
+            self.connections = [conn for conn in self.connections if conn not in idle and not conn.closed]
+
+        for conn in idle:
+            conn.close()
+            stats.incr('evicted')
+
+    def close(self):
+        """
+        Closes every connection in the pool.
+        """
+        with self.lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+
+
+pools: Dict[Tuple[str, int], ConnectionPool] = {}
+pools_lock = threading.Lock()
+reaper_started = False
+
+
+def get_pool(ip: str, port: int) -> ConnectionPool:
+    """
+    Returns the process-wide connection pool for a peer, creating it on first use.
+
+    Args:
+        ip (str): IP address of the peer.
+        port (int): Port of the peer.
+
+    Returns:
+        ConnectionPool: The pool of connections to the peer.
+    """
+    global reaper_started
+    key = (ip, int(port))
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = ConnectionPool(ip, int(port))
+        if not reaper_started:
+            reaper_started = True
+            threading.Thread(target=evict_idle_connections, daemon=True).start()
+            threading.Thread(target=probe_suspect_peers, daemon=True).start()
+    return pool
+
+
+def evict_idle_connections():
+    """
+    Background thread that periodically closes idle pooled connections.
+    """
+    while True:
+        time.sleep(POOL_IDLE_TIMEOUT / 2)
+        try:
+            with pools_lock:
+                current = list(pools.values())
+            now = time.monotonic()
+            for pool in current:
+                pool.evict_idle(now)
+        except Exception as e:
+            logging.error(f'Error en Hilo de desalojo de conexiones: {e}')
+
+
+def probe_suspect_peers():
+    """
+    Background thread that probes the suspect peers whose breakers have been open for long enough.
+    """
+    while True:
+        time.sleep(HEALTH_PROBE_FREQ)
+        try:
+            for peer in health.to_probe():
+                threading.Thread(target=get_pool(peer.ip, peer.port).probe, daemon=True).start()
+        except Exception as e:
+            logging.error(f'Error en Hilo de sondeo de nodos sospechosos: {e}')
+
+
+def peer_timeouts() -> Dict[str, Dict[int, float]]:
+    """
+    Returns the adaptive timeout currently used for every operation sent to every peer.
+    """
+    with pools_lock:
+        current = dict(pools)
+    return {f'{ip}:{port}': pool.timeouts() for (ip, port), pool in current.items()}
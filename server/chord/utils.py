@@ -3,6 +3,18 @@ import logging
 import json
 import struct
 import socket
+from typing import Optional, Tuple
+
+from chord.constants import MAX_FRAME_SIZE
+
+# Frames up to this size are first read with a single plain recv
+SMALL_FRAME_SIZE = 64 * 1024
+
+# Frames of a multiplexed connection start with this byte and the id of their request. It never
+# starts a legacy text frame (an ASCII digit) nor a binary message, so untagged frames stay
+# exactly what peers without multiplexing send.
+FRAME_TAG = 0xC6
+TAG = struct.Struct('!BI')
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s -- %(levelname)s -- %(message)s')
 
@@ -16,7 +28,7 @@ def getShaRepr(data: str) -> int:
     Returns:
         int: Integer representation of the SHA-1 hash.
     """
-    return int(hashlib.sha1(data.encode()).hexdigest(), 16)
+    return int.from_bytes(hashlib.sha1(data.encode()).digest(), 'big')
 
 def is_in_interval(value: int, start: int, end: int) -> bool:
     """
@@ -68,32 +80,64 @@ def decode_dict(json_str: str) -> dict:
         logging.error(f"Fallo al decodificar cadena JSON: {e}")
         return {}
     
-def send_message(sock: socket.socket, message: bytes):
+def send_message(sock: socket.socket, message: bytes, request_id: Optional[int] = None):
     """
-    Sends a message prefixing its length to 4 bytes.
+    Sends a message prefixing its length to 4 bytes. With a request id, the message is tagged
+    with it after the length, which lets several requests share the same connection.
     """
-    msg_length = struct.pack('!I', len(message))
-    sock.sendall(msg_length + message)
+    if request_id is None:
+        sock.sendall(struct.pack('!I', len(message)) + message)
+    else:
+        sock.sendall(struct.pack('!I', len(message) + TAG.size) + TAG.pack(FRAME_TAG, request_id) + message)
 
 def recvall(sock: socket.socket, n: int) -> bytes:
     """
-    Reads exactly n bytes from the socket.
+    Reads exactly n bytes from the socket. Anything that does not arrive in a single
+    read is received into a preallocated buffer, avoiding repeated copies.
+
+    Raises:
+        ConnectionError: If the peer closes the connection before n bytes arrive.
     """
-    data = b''
-    while len(data) < n:
-        packet = sock.recv(n - len(data))
-        if not packet:
-            break  # If nothing more is received, the accumulated data is returned
-        data += packet
-    return data
+    if n <= SMALL_FRAME_SIZE:
+        # Small frames usually arrive whole in a single recv, which is cheaper than a buffer
+        data = sock.recv(n)
+        if len(data) == n:
+            return data
+        if not data:
+            raise ConnectionError('Conexión cerrada a mitad de mensaje')
+    else:
+        data = b''
 
-def recv_message(sock: socket.socket) -> bytes:
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    view[:len(data)] = data
+    received = len(data)
+    while received < n:
+        count = sock.recv_into(view[received:], n - received)
+        if not count:
+            raise ConnectionError('Conexión cerrada a mitad de mensaje')
+        received += count
+    return buffer
+
+def recv_message(sock: socket.socket, max_size: int = MAX_FRAME_SIZE, tagged: bool = True) -> Tuple[Optional[int], bytes]:
     """
     Receives a complete message. First, reads the header (4 bytes), 
     which indicates the size, and then reads that number of bytes.
+    A tagged message is returned without its tag, along with its request id.
+
+    Args:
+        tagged (bool): Whether the message may be tagged; frames of peers that never tag
+            them are read as they are, whatever their first byte.
+
+    Raises:
+        ConnectionError: If the peer closes the connection before a whole message arrives,
+            or announces a message larger than max_size.
     """
-    raw_msglen = recvall(sock, 4)
-    if not raw_msglen:
-        return b''
-    msglen = struct.unpack('!I', raw_msglen)[0]
-    return recvall(sock, msglen)
\ No newline at end of file
+    (msglen,) = struct.unpack('!I', recvall(sock, 4))
+    if msglen > max_size:
+        raise ConnectionError(f'Mensaje de {msglen} bytes excede el máximo de {max_size}')
+    message = recvall(sock, msglen)
+    if tagged and msglen >= TAG.size and message[0] == FRAME_TAG:
+        _, request_id = TAG.unpack_from(message, 0)
+        return request_id, memoryview(message)[TAG.size:]
+    return None, message
\ No newline at end of file
@@ -5,6 +5,7 @@ from proto.auth_pb2_grpc import AuthServiceServicer, add_AuthServiceServicer_to_
 import hashlib 
 import logging
 from repository.auth import AuthRepository
+from services.deadline import DeadlineInterceptor
 import time, jwt, datetime, os
 
 SECRET_KEY = "la llave secreta papu"
@@ -57,7 +58,7 @@ class AuthService(AuthServiceServicer):
         return token
 
 def start_auth(address, auth_repository: AuthRepository):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[DeadlineInterceptor()])
     add_AuthServiceServicer_to_server(AuthService(auth_repository, SECRET_KEY), server)
     server.add_insecure_port(address)
     server.start()
@@ -0,0 +1,30 @@
+import logging
+import grpc
+from chord.deadline import DeadlineExceeded, deadline_scope
+
+class DeadlineInterceptor(grpc.ServerInterceptor):
+    """
+    Runs every unary handler inside a deadline scope built from the gRPC deadline of the call,
+    so the Chord lookups made by the handler give up when the client stops waiting.
+    """
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None:
+            return handler
+
+        behavior = handler.unary_unary
+
+        def with_deadline(request, context):
+            with deadline_scope(context.time_remaining()):
+                try:
+                    return behavior(request, context)
+                except DeadlineExceeded as e:
+                    logging.error(f"Deadline exceeded in {handler_call_details.method}: {e}")
+                    context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, "Request timed out")
+
+        return grpc.unary_unary_rpc_method_handler(
+            with_deadline,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
@@ -8,6 +8,7 @@ from proto.message_pb2 import PostMessageResponse, GetMessagesResponse, RepostMe
 from proto.message_pb2_grpc import MessageServiceServicer, add_MessageServiceServicer_to_server
 from repository.message import MessageRepository
 from repository.auth import AuthRepository
+from services.deadline import DeadlineInterceptor
 
 class MessageService(MessageServiceServicer):
     def __init__(self, message_repository:MessageRepository, auth_repository: AuthRepository):
@@ -102,7 +103,7 @@ class MessageService(MessageServiceServicer):
     # def DeleteMessage(self, request, context):
 
 def start_message_service(address, message_repository: MessageRepository, auth_repository: AuthRepository):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[DeadlineInterceptor()])
     add_MessageServiceServicer_to_server(MessageService(message_repository,auth_repository), server)
     server.add_insecure_port(address)
     server.start()
@@ -5,6 +5,7 @@ from proto.social_graph_pb2_grpc import SocialGraphServiceServicer, add_SocialGr
 from proto.social_graph_pb2 import FollowResponse, UnfollowResponse, GetFollowingResponse, GetFollowersResponse 
 from repository.auth import AuthRepository
 from repository.social_graph import SocialGraphRepository
+from services.deadline import DeadlineInterceptor
 
 class SocialGraphService(SocialGraphServiceServicer):
     def __init__(self, social_graph_repository: SocialGraphRepository, auth_repository: AuthRepository):
@@ -97,7 +98,7 @@ class SocialGraphService(SocialGraphServiceServicer):
 
 
 def start_social_graph_service(address, social_graph_repository:SocialGraphRepository, auth_repository:AuthRepository):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[DeadlineInterceptor()])
     add_SocialGraphServiceServicer_to_server(SocialGraphService(social_graph_repository, auth_repository), server)
     server.add_insecure_port(address)
     server.start()